@@ -0,0 +1,241 @@
+import json
+import os
+import platform
+import random
+import sys
+import time
+from array import array
+
+# Headless benchmarks for the hot paths: PacmanGame.step (Pacman.update,
+# Ghost.update and the collision checks), MazeRenderer.draw, draw_maze and
+# the NumPy batch. Everything runs under SDL's dummy video driver, so no
+# window is needed. Each benchmark times every call on its own and reports
+# the throughput plus percentiles of the per-call time:
+#
+#   python bench.py                      run everything and print a table
+#   python bench.py sim render           only benchmarks whose name contains a word
+#   python bench.py --quick              fewer calls, for a quick check
+#   python bench.py --json out.json      also save the results
+#   python bench.py --baseline out.json [--threshold 20]
+#                                        exit 1 if a throughput dropped more
+#                                        than threshold percent below baseline
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+from maze import Maze
+from mazegen import maze_named
+from navigation import DIRECTIONS
+from options import option
+from pacman_core import GHOST_COLORS, Ghost, PacmanGame
+from pacman_game import MazeRenderer, draw_maze, screen, game_ui, GAME_SPEED, FRAME_RATE
+
+PERCENTILES = (50, 90, 99)
+THRESHOLD = 20  # Percent of baseline throughput a run may lose
+REPEATS = 3  # Runs per benchmark, the fastest one counts
+FRAMES_PER_TICK = max(FRAME_RATE // GAME_SPEED, 1)
+TURN_TICKS = 30  # The benchmark player picks a new arrow this often
+
+
+def summarize(unit, times):
+    # Throughput and per-call percentiles of the seconds in times
+    ordered = sorted(times)
+    count = len(ordered)
+    result = {'unit': unit, 'count': count, 'rate': count / sum(ordered)}
+    for p in PERCENTILES:
+        result[f'p{p}_us'] = ordered[min(count * p // 100, count - 1)] * 1e6
+    result['max_us'] = ordered[-1] * 1e6
+    return result
+
+
+class Player:
+    # Seeded random arrows, and a game that restarts when it ends, with
+    # num_ghosts ghosts on the maze's ghost starts in turn
+    def __init__(self, maze, num_ghosts=None):
+        self.game = PacmanGame(maze, seed=0)
+        self.num_ghosts = num_ghosts
+        self.rng = random.Random(0)
+        self.direction = None
+        self.spawn_ghosts()
+
+    def spawn_ghosts(self):
+        game = self.game
+        if self.num_ghosts is None or len(game.ghosts) == self.num_ghosts:
+            return
+        starts = game.maze.ghost_starts
+        game.ghosts = [Ghost(*starts[i % len(starts)], GHOST_COLORS[i % len(GHOST_COLORS)],
+                             game.maze, game.rng) for i in range(self.num_ghosts)]
+
+    def arrow(self):
+        if self.game.ticks % TURN_TICKS == 0:
+            self.direction = self.rng.choice(DIRECTIONS)
+        return self.direction
+
+    def over(self):
+        # Call when step() returned False
+        self.game.reset(seed=self.game.seed + 1)
+        self.spawn_ghosts()
+
+
+def bench_sim(maze_name, num_ghosts, ticks):
+    # game.step() with seeded random arrows
+    player = Player(maze_named(maze_name), num_ghosts)
+    game = player.game
+    clock = time.perf_counter
+    times = array('d')
+    for _ in range(ticks):
+        direction = player.arrow()
+        start = clock()
+        alive = game.step(direction)
+        times.append(clock() - start)
+        if not alive:
+            player.over()
+        else:
+            # A new level brings back the maze's own ghosts
+            player.spawn_ghosts()
+    return summarize('ticks/s', times)
+
+
+def bench_render(maze_name, frames, mode):
+    # renderer.draw() at the real frames per tick; mode 'full' repaints the
+    # whole view every frame and 'bake' also draws every chunk again
+    player = Player(maze_named(maze_name))
+    game = player.game
+    renderer = MazeRenderer(screen, game_ui, game.maze)
+    renderer.draw(game.pacman, game.ghosts)
+    clock = time.perf_counter
+    times = array('d')
+    for frame in range(frames):
+        if frame % FRAMES_PER_TICK == 0:
+            renderer.remember(game.pacman, game.ghosts)
+            level = game.level
+            if not game.step(player.arrow()):
+                player.over()
+                renderer.rebuild()
+            elif game.level != level:
+                # Cleared: every pellet is back, as in the game loop
+                renderer.rebuild()
+            elif game.pacman.last_eaten:
+                renderer.erase_pellet(game.pacman.last_eaten)
+        if mode == 'full':
+            renderer.invalidate()
+        elif mode == 'bake':
+            renderer.rebuild()
+        alpha = (frame % FRAMES_PER_TICK + 1) / FRAMES_PER_TICK
+        start = clock()
+        renderer.draw(game.pacman, game.ghosts, alpha)
+        times.append(clock() - start)
+    return summarize('frames/s', times)
+
+
+def bench_draw_maze(maze_name, calls):
+    # draw_maze() over the whole maze onto one surface
+    maze = maze_named(maze_name)
+    surface = pygame.Surface((maze.width * 30, maze.height * 30))
+    clock = time.perf_counter
+    times = array('d')
+    for _ in range(calls):
+        start = clock()
+        draw_maze(surface, maze)
+        times.append(clock() - start)
+    return summarize('mazes/s', times)
+
+
+def bench_batch(num_games, ticks):
+    # PacmanBatch.step() for num_games classic games with random arrows
+    import numpy as np
+    from pacman_batch import PacmanBatch
+    batch = PacmanBatch(Maze.load('classic'), num_games, seed=0)
+    rng = np.random.default_rng(0)
+    clock = time.perf_counter
+    times = array('d')
+    for _ in range(ticks):
+        actions = rng.integers(-1, len(DIRECTIONS), num_games)
+        start = clock()
+        batch.step(actions)
+        times.append(clock() - start)
+    return summarize('ticks/s', times)
+
+
+def benchmarks(quick):
+    # (name, function, arguments) for every benchmark
+    scale = 10 if quick else 1
+    yield 'sim classic', bench_sim, ('classic', None, 20000 // scale)
+    yield 'sim 41x41', bench_sim, ('41x41', None, 20000 // scale)
+    yield 'sim 101x101', bench_sim, ('101x101', None, 20000 // scale)
+    for num_ghosts in (16, 64):
+        yield f'sim 41x41 {num_ghosts} ghosts', bench_sim, ('41x41', num_ghosts, 20000 // scale)
+    yield 'render classic', bench_render, ('classic', 5000 // scale, 'dirty')
+    yield 'render 101x101', bench_render, ('101x101', 5000 // scale, 'dirty')
+    yield 'render-full classic', bench_render, ('classic', 1000 // scale, 'full')
+    yield 'render-bake classic', bench_render, ('classic', 200 // scale, 'bake')
+    yield 'draw_maze classic', bench_draw_maze, ('classic', 200 // scale)
+    for num_games in (16, 256):
+        yield f'batch {num_games} games', bench_batch, (num_games, 2000 // scale)
+
+
+def run(quick=False, words=()):
+    # The fastest of REPEATS runs is the one least disturbed by the rest of
+    # the machine; quick runs go once
+    results = {}
+    for name, function, args in benchmarks(quick):
+        if words and not any(word in name for word in words):
+            continue
+        try:
+            runs = [function(*args) for _ in range(1 if quick else REPEATS)]
+            results[name] = max(runs, key=lambda result: result['rate'])
+        except ImportError as e:
+            print(f'{name}: skipped ({e})')
+            continue
+        print_result(name, results[name])
+    return results
+
+
+def print_result(name, result, baseline=None):
+    line = f'{name:<22} {result["rate"]:>12.0f} {result["unit"]:<9}'
+    line += ''.join(f' p{p} {result[f"p{p}_us"]:8.1f}us' for p in PERCENTILES)
+    if baseline is not None:
+        line += f'  {(result["rate"] / baseline["rate"] - 1) * 100:+6.1f}%'
+    print(line)
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    # Names of the benchmarks more than threshold percent slower than baseline
+    slower = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        print_result(name, result, old)
+        if result['rate'] < old['rate'] * (1 - threshold / 100):
+            slower.append(name)
+    return slower
+
+
+def main():
+    json_path, args = option(sys.argv[1:], '--json')
+    baseline_path, args = option(args, '--baseline')
+    threshold, args = option(args, '--threshold')
+    quick = '--quick' in args
+    words = [arg for arg in args if arg != '--quick']
+
+    results = run(quick, words)
+    pygame.quit()
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump({'game': 'pacman', 'quick': quick, 'python': platform.python_version(),
+                       'pygame': pygame.version.ver, 'machine': platform.machine(),
+                       'results': results}, f, indent=2)
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)['results']
+        threshold = float(threshold) if threshold else THRESHOLD
+        print(f'\ncompared with {baseline_path}:')
+        slower = compare(results, baseline, threshold)
+        if slower:
+            print(f'{len(slower)} slower than baseline by more than {threshold}%: {", ".join(slower)}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+import os
+import queue
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+# Frame capture for making videos. grab() copies the surface's pixels
+# straight out of its buffer (no conversion) into one of a fixed pool of
+# buffers and queues it; a background thread hands each queued frame to a
+# sink, which either writes it out as a BMP file or pipes it to ffmpeg.
+# Rendering only waits when the encoder has fallen a whole pool behind,
+# and stalled says for how long it did. Both sinks write the raw pixels
+# as they are: file writes and pipe writes let go of the GIL, PNG
+# encoding in pygame does not. That keeps encoding off the drawing
+# thread, but not the sink's own speed out of it: BMP frames are big and
+# uncompressed, so a sequence of them goes at the speed of the disk, and
+# once the pool is full so does drawing.
+
+QUEUE_FRAMES = 16  # Frames that can wait for the encoder
+FFMPEG = 'ffmpeg'
+
+# BMP file header and BITMAPINFOHEADER followed by the red, green and blue
+# masks (BI_BITFIELDS); a negative height stores the rows top to bottom,
+# in the same order as the surface
+BMP_FILE = struct.Struct('<2sIHHI')
+BMP_INFO = struct.Struct('<IiiHHIIiiII3I')
+BI_BITFIELDS = 3
+
+
+def pixel_format(surface):
+    # ffmpeg's name for the surface's byte order, e.g. 'bgr0'
+    red, green, blue, alpha = surface.get_masks()
+    names = {red: 'r', green: 'g', blue: 'b'}
+    if alpha:
+        names[alpha] = 'a'
+    order = range(4) if sys.byteorder == 'little' else range(3, -1, -1)
+    return ''.join(names.get(0xff << 8 * i, '0') for i in order)
+
+
+class ImageSequence:
+    """Each frame as DIR/frame-000000.bmp and on, for any encoder to pick up."""
+
+    def __init__(self, directory, surface):
+        if surface.get_bytesize() != 4:
+            raise ValueError('only 32 bit surfaces can be written as BMP frames')
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        width, height = surface.get_size()
+        size = 4 * width * height
+        offset = BMP_FILE.size + BMP_INFO.size
+        self.header = (BMP_FILE.pack(b'BM', offset + size, 0, 0, offset)
+                       + BMP_INFO.pack(40, width, -height, 1, 32, BI_BITFIELDS, size, 2835, 2835, 0, 0,
+                                       *surface.get_masks()[:3]))
+        self.frames = 0
+
+    def write(self, pixels):
+        path = os.path.join(self.directory, f'frame-{self.frames:06d}.bmp')
+        with open(path, 'wb') as f:
+            f.write(self.header)
+            f.write(pixels)
+        self.frames += 1
+
+    def close(self):
+        pass
+
+
+class FFmpegPipe:
+    """Raw frames piped into ffmpeg, which encodes them into path."""
+
+    def __init__(self, path, surface, fps):
+        width, height = surface.get_size()
+        self.process = subprocess.Popen(
+            [FFMPEG, '-loglevel', 'error', '-y', '-f', 'rawvideo', '-pix_fmt', pixel_format(surface),
+             '-s', f'{width}x{height}', '-r', str(fps), '-i', '-', '-pix_fmt', 'yuv420p', path],
+            stdin=subprocess.PIPE)
+
+    def write(self, pixels):
+        self.process.stdin.write(pixels)
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait():
+            raise RuntimeError(f'ffmpeg exited with status {self.process.returncode}')
+
+
+def open_sink(out, surface, fps):
+    # A video file for ffmpeg if out has an extension, else a BMP directory
+    if os.path.splitext(out)[1]:
+        return FFmpegPipe(out, surface, fps)
+    return ImageSequence(out, surface)
+
+
+class FrameCapture:
+    def __init__(self, surface, sink, frames=QUEUE_FRAMES):
+        self.surface = surface
+        self.sink = sink
+        self.free = queue.Queue()
+        width, height = surface.get_size()
+        for _ in range(frames):
+            self.free.put(bytearray(surface.get_bytesize() * width * height))
+        self.queue = queue.Queue(frames)
+        self.count = 0
+        self.stalled = 0.0  # Seconds grab() spent waiting for the encoder
+        self.error = None
+        self.thread = threading.Thread(target=self._encode, daemon=True)
+        self.thread.start()
+
+    def grab(self):
+        # Queue what is on the surface now
+        start = time.perf_counter()
+        buffer = self.free.get()
+        self.stalled += time.perf_counter() - start
+        if self.error is not None:
+            raise self.error
+        # The raw pixels, rows without padding; locks the surface while it lives
+        view = self.surface.get_view('0')
+        memoryview(buffer)[:] = view
+        del view
+        self.queue.put(buffer)
+        self.count += 1
+
+    def _encode(self):
+        while True:
+            buffer = self.queue.get()
+            if buffer is None:
+                return
+            if self.error is None:
+                try:
+                    self.sink.write(buffer)
+                except Exception as e:
+                    # Raised from the next grab() or close()
+                    self.error = e
+            self.free.put(buffer)
+
+    def close(self):
+        # Wait for every queued frame to be written
+        self.queue.put(None)
+        self.thread.join()
+        self.sink.close()
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+
+# Renders a replay or a game played by one of the tournament controllers
+# offscreen into a video clip, as fast as it can draw rather than in real
+# time:
+#
+#   python clip.py REPLAY OUT [--fps 30] [--speed 1] [--queue 16]
+#   python clip.py --seed N OUT [--controller pellets|random] [--maze classic]
+#                  [--fps 30] [--speed 1] [--max-ticks 20000]
+#
+# OUT is a directory for BMP frames or a video file (out.mp4) made by
+# piping the frames into ffmpeg. --speed plays the game faster or slower
+# than the 60 ticks a second it runs at when played, --max-ticks cuts long
+# games short. Frames go through capture.FrameCapture, so drawing the next
+# frame overlaps writing the last.
+#
+# Drawing never waits on encoding as such, only on a full queue. ffmpeg
+# usually keeps up; BMP frames are 1.9 MB each at 800x600, so with a
+# directory OUT the disk sets the pace and drawing spends most of its time
+# waiting for it (the summary line says how long). A bigger --queue only
+# absorbs bursts, it cannot make a slow disk faster.
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+from capture import FrameCapture, QUEUE_FRAMES, open_sink
+from mazegen import maze_named
+from pacman_core import PacmanGame
+from pacman_game import MazeRenderer, screen, game_ui, GAME_SPEED
+from replay import Replay
+from options import option
+from tournament import CONTROLLERS
+
+FPS = 30
+END_SECONDS = 2  # How long the game over screen stays in the clip
+MAX_TICKS = 20000
+USAGE = '''usage: clip.py REPLAY OUT | --seed N OUT [--controller pellets|random] [--maze NAME|WxH[:SEED]]
+               [--fps N] [--speed N] [--queue N] [--max-ticks N]
+
+OUT is a directory for BMP frames, or a video file encoded by ffmpeg.
+BMP frames are written as fast as the disk allows; when it is slower than
+drawing, drawing waits for it once --queue frames are pending.'''
+
+
+def render(game, inputs, out, fps=FPS, speed=1.0, max_ticks=MAX_TICKS, frames=QUEUE_FRAMES):
+    # Draw every frame of the game into out, returning the FrameCapture.
+    # inputs gives the arrow for each tick, False once the game is over.
+    renderer = MazeRenderer(screen, game_ui, game.maze)
+    capture = FrameCapture(screen, open_sink(out, screen, fps), frames)
+    ticks_per_frame = GAME_SPEED * speed / fps
+    clock = 0.0  # Game time in ticks
+    alive = True
+    level = game.level
+    try:
+        while True:
+            # Run the ticks due by this frame, then draw between the last two
+            while alive and game.ticks < int(clock):
+                renderer.remember(game.pacman, game.ghosts)
+                direction = next(inputs, False)
+                alive = direction is not False and game.step(direction) and game.ticks < max_ticks
+                if game.pacman.last_eaten:
+                    renderer.erase_pellet(game.pacman.last_eaten)
+                if game.level != level:
+                    level = game.level
+                    renderer.rebuild()
+            if not alive:
+                break
+            renderer.draw(game.pacman, game.ghosts, clock - int(clock))
+            capture.grab()
+            clock += ticks_per_frame
+        game_ui.show_game_over_screen(screen, game.pacman.score)
+        for _ in range(int(END_SECONDS * fps)):
+            capture.grab()
+    finally:
+        capture.close()
+    return capture
+
+
+def controlled(driver):
+    # inputs for render() from a tournament controller
+    while True:
+        yield driver.arrow()
+
+
+def main():
+    fps, args = option(sys.argv[1:], '--fps', str(FPS))
+    speed, args = option(args, '--speed', '1')
+    frames, args = option(args, '--queue', str(QUEUE_FRAMES))
+    seed, args = option(args, '--seed')
+    controller, args = option(args, '--controller', 'pellets')
+    maze, args = option(args, '--maze', 'classic')
+    max_ticks, args = option(args, '--max-ticks', str(MAX_TICKS))
+    if '--help' in args or len(args) != (1 if seed else 2) or controller not in CONTROLLERS:
+        print(USAGE)
+        sys.exit(0 if '--help' in args else 2)
+    if seed:
+        game = PacmanGame(maze_named(maze), seed=int(seed))
+        driver = CONTROLLERS[controller](game)
+        driver.reset()
+        inputs = controlled(driver)
+    else:
+        replay = Replay.load(args.pop(0))
+        game = replay.new_game()
+        inputs = replay.inputs()
+
+    start = time.perf_counter()
+    try:
+        capture = render(game, inputs, args[0], int(fps), float(speed), int(max_ticks), int(frames))
+    except OSError as e:
+        print(f'could not write {args[0]}: {e}')
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    seconds = capture.count / int(fps)
+    print(f'{capture.count} frames ({seconds:.1f}s of video) in {elapsed:.2f}s, '
+          f'{seconds / elapsed:.1f}x real time, {capture.stalled:.2f}s waiting for the encoder')
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+from collections import defaultdict
+
+# Pac-Man and a ghost touch when their positions are less than a block
+# apart. Ghosts are bucketed by tile each tick, so every Pac-Man is only
+# checked against the ghosts in the 3x3 tiles around his own and the cost
+# grows with the number of actors rather than with their product.
+
+
+class TileBuckets:
+    def __init__(self, block_size):
+        self.block_size = block_size
+        self.buckets = defaultdict(list)
+
+    def tile(self, actor):
+        return (int(actor.x // self.block_size), int(actor.y // self.block_size))
+
+    def rebuild(self, actors):
+        self.buckets.clear()
+        for i, actor in enumerate(actors):
+            self.buckets[self.tile(actor)].append(i)
+
+    def near(self, actor):
+        # Indices of the bucketed actors that may touch actor, in order
+        tx, ty = self.tile(actor)
+        found = []
+        for y in (ty - 1, ty, ty + 1):
+            for x in (tx - 1, tx, tx + 1):
+                bucket = self.buckets.get((x, y))
+                if bucket:
+                    found.extend(bucket)
+        found.sort()
+        return found
+
+
+def collide(pacmen, ghosts, block_size, buckets=None):
+    """Find this tick's contacts between Pac-Men and ghosts.
+
+    Returns (caught, eaten): the Pac-Men caught by a ghost that was not
+    scared, and (pacman, ghost) pairs for the scared ghosts they ate. Like
+    checking the ghosts one by one, a Pac-Man stops at the first ghost
+    that catches him, and a ghost is only eaten once.
+    """
+    if buckets is None:
+        buckets = TileBuckets(block_size)
+    buckets.rebuild(ghosts)
+    limit = block_size * block_size
+    caught = []
+    eaten = []
+    gone = set()
+    for pacman in pacmen:
+        for i in buckets.near(pacman):
+            ghost = ghosts[i]
+            dx = pacman.x - ghost.x
+            dy = pacman.y - ghost.y
+            if dx * dx + dy * dy >= limit or i in gone:
+                continue
+            if ghost.scared:
+                gone.add(i)
+                eaten.append((pacman, ghost))
+            else:
+                caught.append(pacman)
+                break
+    return caught, eaten
@@ -0,0 +1,67 @@
+import time
+
+# Fixed-timestep game loop. The simulation advances in whole ticks of
+# 1 / tick_rate seconds, paid for out of an accumulator of real time, so a
+# game plays at the same speed and makes the same moves whatever the frame
+# rate. Frames are drawn up to frame_rate times a second (None for no cap)
+# with alpha, how far real time has got towards the next tick, for
+# interpolating actor positions. A slow machine runs several ticks between
+# frames; past max_ticks per frame the backlog is dropped, which slows the
+# game down instead of letting it fall further and further behind.
+#
+#   loop = FixedStepLoop(tick_rate, frame_rate)
+#   while running:
+#       handle events
+#       for _ in range(loop.advance()):
+#           step the game
+#       draw(loop.alpha)
+#       loop.wait()
+
+
+class FixedStepLoop:
+    def __init__(self, tick_rate, frame_rate=None, max_ticks=5, clock=time.perf_counter):
+        self.tick_rate = tick_rate
+        self.frame_rate = frame_rate
+        self.max_ticks = max_ticks
+        self.clock = clock
+        self.tick_time = 1.0 / tick_rate
+        self.frame_time = 1.0 / frame_rate if frame_rate else 0.0
+        self.ticks = 0
+        self.frames = 0
+        self.dropped = 0  # Ticks given up while behind
+        self.reset()
+
+    def reset(self):
+        # Forget time spent elsewhere, e.g. on a blocking game over screen
+        self.last = self.clock()
+        self.next_frame = self.last
+        self.accumulator = 0.0
+        self.alpha = 0.0
+
+    def advance(self):
+        # Number of ticks to run before drawing the next frame
+        now = self.clock()
+        self.accumulator += now - self.last
+        self.last = now
+        due = int(self.accumulator / self.tick_time)
+        if due > self.max_ticks:
+            self.dropped += due - self.max_ticks
+            self.accumulator -= (due - self.max_ticks) * self.tick_time
+            due = self.max_ticks
+        self.accumulator -= due * self.tick_time
+        self.alpha = min(self.accumulator / self.tick_time, 1.0)
+        self.ticks += due
+        self.frames += 1
+        return due
+
+    def wait(self):
+        # Sleep off the rest of the frame when the frame rate is capped
+        if not self.frame_time:
+            return
+        self.next_frame += self.frame_time
+        delay = self.next_frame - self.clock()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # Behind already, start counting again from now
+            self.next_frame = self.clock()
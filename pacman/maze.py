@@ -0,0 +1,112 @@
+import os
+from navigation import NavGraph
+
+# Mazes are stored as text, one character per tile:
+#   '#' wall, '.' dot, 'o' power pellet, ' ' empty,
+#   'P' Pac-Man start and 'G' ghost start on an empty tile,
+#   'p' and 'g' the same starts on a dot.
+# In memory the tiles are a flat bytearray indexed by y * width + x, with a
+# pristine copy kept for restarts.
+
+EMPTY = 0
+WALL = 1
+DOT = 2
+POWER = 3
+
+TILE_CHARS = {' ': EMPTY, '#': WALL, '.': DOT, 'o': POWER, 'P': EMPTY, 'G': EMPTY,
+              'p': DOT, 'g': DOT}
+
+MAZE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mazes')
+
+
+class Maze:
+    def __init__(self, width, height, tiles, pacman_start, ghost_starts):
+        if len(tiles) != width * height:
+            raise ValueError(f'expected {width * height} tiles, got {len(tiles)}')
+        self.width = width
+        self.height = height
+        self.pristine = bytes(tiles)
+        self.tiles = bytearray(self.pristine)
+        self.pacman_start = pacman_start
+        self.ghost_starts = list(ghost_starts)
+        self.total_pellets = sum(1 for t in self.pristine if t == DOT or t == POWER)
+        self.pellets = self.total_pellets
+        self._nav = None
+
+    @classmethod
+    def from_text(cls, text):
+        lines = [line for line in text.splitlines() if line.strip()]
+        width = max(len(line) for line in lines)
+        tiles = bytearray()
+        pacman_start = None
+        ghost_starts = []
+        for y, line in enumerate(lines):
+            for x, char in enumerate(line.ljust(width)):
+                if char not in TILE_CHARS:
+                    raise ValueError(f'unknown maze tile {char!r} at ({x}, {y})')
+                if char in 'Pp':
+                    pacman_start = (x, y)
+                elif char in 'Gg':
+                    ghost_starts.append((x, y))
+                tiles.append(TILE_CHARS[char])
+        if pacman_start is None:
+            raise ValueError('maze has no Pac-Man start (P)')
+        return cls(width, len(lines), tiles, pacman_start, ghost_starts)
+
+    @classmethod
+    def load(cls, name='classic'):
+        # Either a path or the name of a maze in the mazes directory
+        path = name if os.path.exists(name) else os.path.join(MAZE_DIR, name + '.txt')
+        with open(path, encoding='utf-8') as f:
+            return cls.from_text(f.read())
+
+    def to_text(self):
+        # Inverse of from_text, using the pristine layout
+        chars = {EMPTY: ' ', WALL: '#', DOT: '.', POWER: 'o'}
+        rows = [[chars[t] for t in self.pristine[y * self.width:(y + 1) * self.width]]
+                for y in range(self.height)]
+        # Upper case for a start on an empty tile, lower case on a dot
+        x, y = self.pacman_start
+        rows[y][x] = 'P' if rows[y][x] == ' ' else 'p'
+        for x, y in self.ghost_starts:
+            rows[y][x] = 'G' if rows[y][x] == ' ' else 'g'
+        return ''.join(''.join(row) + '\n' for row in rows)
+
+    def copy(self):
+        # Independent pellets, shared walls and navigation graph
+        maze = Maze.__new__(Maze)
+        maze.__dict__.update(self.__dict__)
+        maze.tiles = bytearray(self.tiles)
+        maze._nav = self.nav
+        return maze
+
+    def reset(self):
+        # Put every pellet back
+        self.tiles[:] = self.pristine
+        self.pellets = self.total_pellets
+
+    @property
+    def cleared(self):
+        return self.pellets == 0
+
+    @property
+    def nav(self):
+        # Built on first use; walls never change so copies can share it
+        if self._nav is None:
+            self._nav = NavGraph(self)
+        return self._nav
+
+    def tile(self, x, y):
+        # Outside the maze counts as wall
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.tiles[y * self.width + x]
+        return WALL
+
+    def eat(self, x, y):
+        # Remove the pellet at (x, y), returning what was there
+        i = y * self.width + x
+        tile = self.tiles[i]
+        if tile == DOT or tile == POWER:
+            self.tiles[i] = EMPTY
+            self.pellets -= 1
+        return tile
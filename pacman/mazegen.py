@@ -0,0 +1,117 @@
+import random
+import sys
+from maze import Maze, EMPTY, WALL, DOT, POWER
+
+# Seeded Pac-Man style maze generator. A random depth-first maze is carved
+# on the odd tiles, then every dead end is knocked through to a neighbour
+# so the corridors loop like a Pac-Man board. Corridors are filled with
+# dots, power pellets go near the corners, Pac-Man starts near the bottom
+# and the ghosts near the middle.
+
+NUM_GHOSTS = 4
+
+
+def generate_maze(width, height, seed=None):
+    if width < 5 or height < 5:
+        raise ValueError('mazes must be at least 5x5 tiles')
+    rng = random.Random(seed)
+    tiles = bytearray([WALL]) * (width * height)
+    # Passage cells sit on odd coordinates inside the outer wall
+    cols = (width - 1) // 2
+    rows = (height - 1) // 2
+
+    def cell_tile(cx, cy):
+        return (2 * cy + 1) * width + 2 * cx + 1
+
+    # Carve a perfect maze with an iterative depth-first search
+    visited = bytearray(cols * rows)
+    stack = [(rng.randrange(cols), rng.randrange(rows))]
+    visited[stack[0][1] * cols + stack[0][0]] = 1
+    tiles[cell_tile(*stack[0])] = DOT
+    while stack:
+        cx, cy = stack[-1]
+        options = [(cx + dx, cy + dy) for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0))
+                   if 0 <= cx + dx < cols and 0 <= cy + dy < rows
+                   and not visited[(cy + dy) * cols + cx + dx]]
+        if not options:
+            stack.pop()
+            continue
+        nx, ny = rng.choice(options)
+        visited[ny * cols + nx] = 1
+        tiles[cell_tile(nx, ny)] = DOT
+        # Open the wall between the two cells
+        tiles[(cy + ny + 1) * width + cx + nx + 1] = DOT
+        stack.append((nx, ny))
+
+    # Braid: knock every dead end through to another cell
+    for cy in range(rows):
+        for cx in range(cols):
+            tile = cell_tile(cx, cy)
+            walls = []
+            for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0)):
+                if not (0 <= cx + dx < cols and 0 <= cy + dy < rows):
+                    continue
+                between = tile + dy * width + dx
+                if tiles[between] == WALL:
+                    walls.append(between)
+            if walls and _open_sides(tiles, tile, width) == 1:
+                tiles[rng.choice(walls)] = DOT
+
+    # Power pellets on the open tile nearest each corner
+    for corner in ((0, 0), (width - 1, 0), (0, height - 1), (width - 1, height - 1)):
+        tiles[_nearest_open(tiles, width, height, *corner)] = POWER
+    # Pac-Man and every ghost need a dot tile of their own to start on
+    if tiles.count(DOT) < 1 + NUM_GHOSTS:
+        raise ValueError(f'a {width}x{height} maze has no room for Pac-Man and {NUM_GHOSTS} ghosts, '
+                         f'try 7x7 or larger')
+
+    # Pac-Man near the bottom middle, ghosts around the center
+    start = _nearest_open(tiles, width, height, width // 2, height - 1)
+    tiles[start] = EMPTY
+    ghost_starts = []
+    for _ in range(NUM_GHOSTS):
+        tile = _nearest_open(tiles, width, height, width // 2, height // 2, skip_empty=True)
+        tiles[tile] = EMPTY
+        ghost_starts.append((tile % width, tile // width))
+    # Row by row, the order from_text reads them back in
+    ghost_starts.sort(key=lambda start: (start[1], start[0]))
+    return Maze(width, height, tiles, (start % width, start // width), ghost_starts)
+
+
+def maze_named(name):
+    # A maze by name or path, or 'WxH' / 'WxH:SEED' for a generated one
+    size, _, seed = name.partition(':')
+    width, x, height = size.partition('x')
+    if x and width.isdigit() and height.isdigit():
+        return generate_maze(int(width), int(height), int(seed) if seed else 0)
+    return Maze.load(name)
+
+
+def _open_sides(tiles, tile, width):
+    return sum(1 for step in (1, -1, width, -width) if tiles[tile + step] != WALL)
+
+
+def _nearest_open(tiles, width, height, x, y, skip_empty=False):
+    # Closest dot (or empty tile, unless skip_empty) searching outwards ring by ring
+    for r in range(max(width, height)):
+        for ty in range(max(y - r, 0), min(y + r, height - 1) + 1):
+            for tx in range(max(x - r, 0), min(x + r, width - 1) + 1):
+                if max(abs(tx - x), abs(ty - y)) != r:
+                    continue
+                tile = tiles[ty * width + tx]
+                if tile == DOT or (tile == EMPTY and not skip_empty):
+                    return ty * width + tx
+    raise ValueError('maze has no open tiles')
+
+
+def main():
+    # Print a generated maze in the text format, e.g.
+    #   python mazegen.py 101 101 7 > mazes/big.txt
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 41
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 41
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    sys.stdout.write(generate_maze(width, height, seed).to_text())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+from array import array
+from collections import deque
+
+# Maze navigation for the ghosts, built once per maze.
+# Every tile gets its list of open neighbours, and shortest-path distance
+# fields are computed by BFS once per target tile and shared by all ghosts.
+# On big mazes the search stops at a fixed radius so its cost does not grow
+# with the maze; tiles further away are left unreachable, and the field only
+# holds the tiles it reached.
+
+DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+WALL = 1
+
+
+class DistanceField(dict):
+    """Steps to the target from each tile a capped search reached; any other
+    tile reads as unreachable. tiles and steps hold the same pairs as
+    arrays, for bulk lookups."""
+
+    def __init__(self, unreachable):
+        super().__init__()
+        self.unreachable = unreachable
+        self.tiles = None
+        self.steps = None
+
+    def __missing__(self, tile):
+        return self.unreachable
+
+
+class NavGraph:
+    def __init__(self, maze, max_cached=None, max_depth=None):
+        # maze needs width, height and flat tiles indexed by y * width + x
+        self.width = maze.width
+        self.height = maze.height
+        width, height = self.width, self.height
+        tiles = maze.tiles
+
+        # (direction, neighbour tile) for every open tile next to each tile,
+        # walls included so a target stuck in a wall still has a way out
+        self.neighbors = []
+        open_tiles = 0
+        for y in range(height):
+            for x in range(width):
+                if tiles[y * width + x] != WALL:
+                    open_tiles += 1
+                options = []
+                for dx, dy in DIRECTIONS:
+                    nx, ny = x + dx, y + dy
+                    if 0 <= nx < width and 0 <= ny < height and tiles[ny * width + nx] != WALL:
+                        options.append(((dx, dy), ny * width + nx))
+                self.neighbors.append(tuple(options))
+
+        # Small mazes keep every field, which ends up as an all-pairs table
+        if max_cached is None:
+            max_cached = open_tiles if open_tiles <= 4096 else 16
+        self.max_cached = max_cached
+        if max_depth is None and open_tiles > 4096:
+            max_depth = 128
+        self.max_depth = max_depth
+        self.unreachable = width * height
+        self.fields = {}
+        # Working space for capped searches, all unreachable between them
+        self.scratch = array('i', [self.unreachable]) * (width * height) if max_depth else None
+
+    def options(self, x, y):
+        # Legal moves from tile (x, y) as (direction, neighbour tile) pairs
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.neighbors[y * self.width + x]
+        return ()
+
+    def distances_to(self, x, y):
+        # Steps from every tile to (x, y), indexed by y * width + x
+        target = y * self.width + x
+        field = self.fields.get(target)
+        if field is None:
+            field = self._bfs(target)
+            if len(self.fields) >= self.max_cached:
+                del self.fields[next(iter(self.fields))]
+            self.fields[target] = field
+        return field
+
+    def _bfs(self, target):
+        if self.max_depth is not None:
+            return self._capped_bfs(target)
+        field = array('i', [self.unreachable]) * (self.width * self.height)
+        field[target] = 0
+        queue = deque([target])
+        neighbors = self.neighbors
+        while queue:
+            tile = queue.popleft()
+            steps = field[tile] + 1
+            for _, nxt in neighbors[tile]:
+                if field[nxt] > steps:
+                    field[nxt] = steps
+                    queue.append(nxt)
+        return field
+
+    def _capped_bfs(self, target):
+        # Searches on one shared scratch array and puts back only the tiles
+        # it reached, so time and memory go with the tiles within
+        # max_depth, not with the maze
+        scratch = self.scratch
+        scratch[target] = 0
+        reached = array('i', [target])
+        steps = array('i', [0])
+        queue = deque(reached)
+        neighbors = self.neighbors
+        max_depth = self.max_depth
+        while queue:
+            tile = queue.popleft()
+            depth = scratch[tile] + 1
+            if depth > max_depth:
+                break
+            for _, nxt in neighbors[tile]:
+                if scratch[nxt] > depth:
+                    scratch[nxt] = depth
+                    reached.append(nxt)
+                    steps.append(depth)
+                    queue.append(nxt)
+        unreachable = self.unreachable
+        for tile in reached:
+            scratch[tile] = unreachable
+        field = DistanceField(unreachable)
+        field.update(zip(reached, steps))
+        field.tiles = reached
+        field.steps = steps
+        return field
@@ -0,0 +1,10 @@
+# Command line helpers for the scripts in this directory
+
+
+def option(args, name, default=None):
+    # Pull "name VALUE" out of the command line: (VALUE or default, other args)
+    if name in args:
+        i = args.index(name)
+        if i + 1 < len(args):
+            return args[i + 1], args[:i] + args[i + 2:]
+    return default, args
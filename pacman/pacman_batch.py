@@ -0,0 +1,266 @@
+import sys
+import time
+import numpy as np
+
+from maze import Maze, EMPTY, WALL, DOT, POWER
+from navigation import DIRECTIONS, DistanceField
+from pacman_core import BLOCK_SIZE
+
+# Many Pac-Man games on one maze stepped together with NumPy, for training
+# and evaluating agents without a window. Each game follows the rules of
+# Pacman.update and Ghost.update in pacman_core and collisions.collide
+# (the mouth animation is left out, it only matters on screen). Clearing
+# the maze starts the next level; a game that ends is reset at the end of
+# the step.
+#
+# Observations live in arrays allocated once and updated in place:
+#   tiles         (games, height, width) maze tiles with the pellets left
+#   pacman        (games, 2) Pac-Man's pixel x, y
+#   ghosts        (games, ghosts, 2) ghost pixel x, y
+#   scared_timer  (games, ghosts) ticks left scared, 0 when not scared
+# Keep references to them rather than copying after every step.
+
+# Same values as the Pacman and Ghost classes
+PACMAN_SPEED = 5
+GHOST_SPEED = 2
+SCARED_TICKS = 300
+CHASE_CHANCE = 0.8
+DOT_POINTS = 10
+POWER_POINTS = 50
+GHOST_POINTS = 200
+
+DX = np.array([d[0] for d in DIRECTIONS], dtype=np.int64)
+DY = np.array([d[1] for d in DIRECTIONS], dtype=np.int64)
+
+
+class PacmanBatch:
+    def __init__(self, maze, num_games, seed=None, max_ticks=None):
+        self.maze = maze
+        self.num_games = num_games
+        self.max_ticks = max_ticks
+        self.width = width = maze.width
+        self.height = height = maze.height
+        cells = width * height
+        num_ghosts = len(maze.ghost_starts)
+        self.num_ghosts = num_ghosts
+        self.rng = np.random.default_rng(seed)
+        self._rows = np.arange(num_games)
+        self._pristine = np.frombuffer(maze.pristine, dtype=np.uint8)
+
+        self.tiles = np.empty((num_games, height, width), dtype=np.uint8)
+        self.pacman = np.empty((num_games, 2), dtype=np.int64)
+        self.ghosts = np.empty((num_games, num_ghosts, 2), dtype=np.int64)
+        self.scared_timer = np.zeros((num_games, num_ghosts), dtype=np.int64)
+        # Flat views so per-game tile lookups are a single 1-D gather/scatter
+        self._boards = self.tiles.reshape(num_games, cells)
+        self._tiles = self.tiles.reshape(-1)
+
+        self.direction = np.zeros((num_games, 2), dtype=np.int64)
+        self.next_direction = np.zeros((num_games, 2), dtype=np.int64)
+        # Index into DIRECTIONS for every ghost
+        self.ghost_direction = np.zeros((num_games, num_ghosts), dtype=np.int64)
+        self.pellets = np.zeros(num_games, dtype=np.int64)
+        self.score = np.zeros(num_games, dtype=np.int64)
+        self.level = np.zeros(num_games, dtype=np.int64)
+        self.ticks = np.zeros(num_games, dtype=np.int64)
+        # Filled in for the games that finished on the last step
+        self.final_score = np.zeros(num_games, dtype=np.int64)
+
+        self._start = np.array(maze.pacman_start, dtype=np.int64) * BLOCK_SIZE
+        self._homes = np.array(maze.ghost_starts, dtype=np.int64).reshape(-1, 2) * BLOCK_SIZE
+
+        # Open neighbour of every tile in each direction, -1 where there is none
+        nav = maze.nav
+        self._nav = nav
+        self._neighbors = np.full((cells, len(DIRECTIONS)), -1, dtype=np.int64)
+        for tile, options in enumerate(nav.neighbors):
+            for direction, nxt in options:
+                self._neighbors[tile, DIRECTIONS.index(direction)] = nxt
+        # Small mazes get the whole distance table up front; big ones look up
+        # the navigation graph's fields for the targets in play
+        self._distances = None
+        self._scratch = np.full(cells, nav.unreachable, dtype=np.int64)
+        if cells <= 2048:
+            self._distances = np.array(
+                [nav.distances_to(t % width, t // width) for t in range(cells)],
+                dtype=np.int16)
+
+        self.reset()
+
+    def reset(self, rows=None):
+        if rows is None:
+            rows = self._rows
+        if not len(rows):
+            return
+        self.score[rows] = 0
+        self.level[rows] = 1
+        self.ticks[rows] = 0
+        self._start_level(rows)
+
+    def _start_level(self, rows):
+        # Pellets back and everyone to their starts, as for a new level
+        self._boards[rows] = self._pristine
+        self.pellets[rows] = self.maze.total_pellets
+        self.pacman[rows] = self._start
+        self.direction[rows] = 0
+        self.next_direction[rows] = 0
+        self.ghosts[rows] = self._homes
+        self.ghost_direction[rows] = self.rng.integers(
+            0, len(DIRECTIONS), (len(rows), self.num_ghosts))
+        self.scared_timer[rows] = 0
+
+    def _tile_at(self, px, py):
+        # Tile under pixel (px, py) in every game, WALL outside the maze
+        gx = (px / BLOCK_SIZE).astype(np.int64)  # Truncates like int()
+        gy = (py / BLOCK_SIZE).astype(np.int64)
+        inside = (gx >= 0) & (gx < self.width) & (gy >= 0) & (gy < self.height)
+        flat = self._rows * (self.width * self.height) + gy * self.width + gx
+        tile = np.full(self.num_games, WALL, dtype=np.uint8)
+        tile[inside] = self._tiles[flat[inside]]
+        return flat, tile
+
+    def _ghost_distances(self, targets, nbr):
+        # Steps from each neighbour tile to the matching target tile
+        nbr = np.maximum(nbr, 0)  # Missing neighbours are masked by the caller
+        if self._distances is not None:
+            return self._distances[targets[:, None], nbr].astype(np.int64)
+        width = self.width
+        unique, inverse = np.unique(targets, return_inverse=True)
+        out = np.empty(nbr.shape, dtype=np.int64)
+        scratch = self._scratch
+        for i, target in enumerate(unique):
+            field = self._nav.distances_to(target % width, target // width)
+            rows = inverse == i
+            if isinstance(field, DistanceField):
+                # Fill in only the tiles the capped search reached, then
+                # put them back to unreachable for the next target
+                tiles = np.frombuffer(field.tiles, dtype=np.intc)
+                scratch[tiles] = np.frombuffer(field.steps, dtype=np.intc)
+                out[rows] = scratch[nbr[rows]]
+                scratch[tiles] = field.unreachable
+            else:
+                out[rows] = np.frombuffer(field, dtype=np.intc)[nbr[rows]]
+        return out
+
+    def step(self, actions=None):
+        """Advance every game one tick.
+
+        actions holds an index into DIRECTIONS per game, like a key press
+        queueing Pac-Man's next turn, or -1 for no key. Returns (reward,
+        done) arrays; the score of games that finished is in final_score.
+        """
+        rows = self._rows
+        width = self.width
+        if actions is not None:
+            actions = np.asarray(actions)
+            press = actions >= 0
+            self.next_direction[press, 0] = DX[actions[press]]
+            self.next_direction[press, 1] = DY[actions[press]]
+
+        # Pac-Man takes the queued turn as soon as it leads somewhere open
+        x, y = self.pacman[:, 0], self.pacman[:, 1]
+        nd = self.next_direction
+        _, tile = self._tile_at(x + nd[:, 0] * PACMAN_SPEED, y + nd[:, 1] * PACMAN_SPEED)
+        turn = nd.any(axis=1) & (tile != WALL)
+        self.direction[turn] = nd[turn]
+        nd[turn] = 0
+
+        # Move on unless that runs into a wall, eating whatever is there
+        d = self.direction
+        nx = x + d[:, 0] * PACMAN_SPEED
+        ny = y + d[:, 1] * PACMAN_SPEED
+        flat, tile = self._tile_at(nx, ny)
+        move = d.any(axis=1) & (tile != WALL)
+        x[move] = nx[move]
+        y[move] = ny[move]
+        dot = move & (tile == DOT)
+        power = move & (tile == POWER)
+        self._tiles[flat[dot | power]] = EMPTY
+        self.pellets -= dot | power
+        reward = dot * DOT_POINTS + power * POWER_POINTS
+        self.scared_timer[power] = SCARED_TICKS
+
+        # Ghosts choose a direction at tile centers: mostly towards Pac-Man
+        # along the maze, now and then at random, away from him when scared
+        gx, gy = self.ghosts[..., 0], self.ghosts[..., 1]
+        games, ids = np.nonzero((gx % BLOCK_SIZE == 0) & (gy % BLOCK_SIZE == 0))
+        if len(games):
+            tx = (gx[games, ids] / BLOCK_SIZE).astype(np.int64)
+            ty = (gy[games, ids] / BLOCK_SIZE).astype(np.int64)
+            inside = (tx >= 0) & (tx < width) & (ty >= 0) & (ty < self.height)
+            games, ids = games[inside], ids[inside]
+            nbr = self._neighbors[ty[inside] * width + tx[inside]]
+            valid = nbr >= 0
+            px = (x[games] / BLOCK_SIZE).astype(np.int64)
+            py = (y[games] / BLOCK_SIZE).astype(np.int64)
+            dist = self._ghost_distances(py * width + px, nbr)
+            # Past the search radius of a big maze, go by straight-line distance
+            far = dist >= self._nav.unreachable
+            dist[far] += (np.abs(nbr % width - px[:, None])
+                          + np.abs(nbr // width - py[:, None]))[far]
+
+            chase = np.argmin(np.where(valid, dist, np.iinfo(np.int64).max), axis=1)
+            flee = np.argmax(np.where(valid, dist, -1), axis=1)
+            pick = (self.rng.random(len(games)) * valid.sum(axis=1)).astype(np.int64)
+            wander = np.argmax(np.cumsum(valid, axis=1) > pick[:, None], axis=1)
+            roll = self.rng.random(len(games))
+            choice = np.where(self.scared_timer[games, ids] > 0, flee,
+                              np.where(roll < CHASE_CHANCE, chase, wander))
+            decide = valid.any(axis=1)
+            self.ghost_direction[games[decide], ids[decide]] = choice[decide]
+
+        gx += DX[self.ghost_direction] * GHOST_SPEED
+        gy += DY[self.ghost_direction] * GHOST_SPEED
+        timer = self.scared_timer
+        timer[timer > 0] -= 1
+
+        # Touching a ghost ends the game unless it is scared, which sends it
+        # home for points; ghosts after the one that caught him do not count
+        dx = gx - x[:, None]
+        dy = gy - y[:, None]
+        hit = dx * dx + dy * dy < BLOCK_SIZE * BLOCK_SIZE
+        caught = hit & (timer == 0)
+        eaten = hit & (timer > 0) & (np.cumsum(caught, axis=1) == 0)
+        games, ids = np.nonzero(eaten)
+        self.ghosts[games, ids] = self._homes[ids]
+        reward += eaten.sum(axis=1) * GHOST_POINTS
+        self.score += reward
+        self.ticks += 1
+
+        done = caught.any(axis=1)
+        if self.max_ticks is not None:
+            done |= self.ticks >= self.max_ticks
+        cleared = rows[~done & (self.pellets == 0)]
+        self.level[cleared] += 1
+        self._start_level(cleared)
+        finished = rows[done]
+        self.final_score[finished] = self.score[finished]
+        self.reset(finished)
+        return reward, done
+
+
+def main():
+    # Throughput check with random key presses:
+    #   python pacman_batch.py [games] [steps] [maze]
+    num_games = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    maze = Maze.load(sys.argv[3] if len(sys.argv) > 3 else 'classic')
+    batch = PacmanBatch(maze, num_games, seed=0)
+    rng = np.random.default_rng(1)
+    actions = rng.integers(-1, len(DIRECTIONS), (steps, num_games))
+    finished = 0
+    total_score = 0
+    start = time.perf_counter()
+    for i in range(steps):
+        _, done = batch.step(actions[i])
+        finished += int(done.sum())
+        total_score += int(batch.final_score[done].sum())
+    elapsed = time.perf_counter() - start
+    print(f'{num_games * steps / elapsed:.0f} game steps/s '
+          f'({steps / elapsed:.0f} batch steps/s of {num_games} games)')
+    if finished:
+        print(f'{finished} games finished, average score {total_score / finished:.0f}')
+
+
+if __name__ == '__main__':
+    main()
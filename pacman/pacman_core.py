@@ -0,0 +1,204 @@
+import random
+from maze import DOT, POWER, WALL
+from collisions import TileBuckets, collide
+
+# Headless Pac-Man rules. Nothing in here touches pygame, so games can be
+# stepped and replayed in tests or worker processes without a display.
+
+RED = (255, 0, 0)
+PINK = (255, 182, 255)
+CYAN = (0, 255, 255)
+ORANGE = (255, 182, 85)
+# Ghost colors in the order of the maze's ghost starts (Blinky, Inky, Pinky, Clyde)
+GHOST_COLORS = [RED, CYAN, PINK, ORANGE]
+
+BLOCK_SIZE = 30
+MOUTH_MAX = 45  # 嘴巴最大张开角度
+
+class Ghost:
+    __slots__ = ('x', 'y', 'home', 'color', 'maze', 'rng', 'direction', 'speed', 'scared', 'scared_timer')
+
+    def __init__(self, x, y, color, maze, rng=None):
+        self.x = x * BLOCK_SIZE
+        self.y = y * BLOCK_SIZE
+        self.home = (x, y)
+        self.color = color
+        self.maze = maze
+        self.rng = rng or random.Random()
+        self.direction = self.rng.choice([(0, 1), (0, -1), (1, 0), (-1, 0)])
+        self.speed = 2  # 确保幽灵速度比Pacman慢
+        self.scared = False
+        self.scared_timer = 0
+        
+    def update(self, pacman):
+        # If at grid center, maybe change direction
+        if self.x % BLOCK_SIZE == 0 and self.y % BLOCK_SIZE == 0:
+            x, y = int(self.x / BLOCK_SIZE), int(self.y / BLOCK_SIZE)
+            nav = self.maze.nav
+            possible_directions = nav.options(x, y)
+
+            if possible_directions:
+                # Shortest-path distances to Pacman's tile, shared by all ghosts
+                tx, ty = int(pacman.x / BLOCK_SIZE), int(pacman.y / BLOCK_SIZE)
+                distances = nav.distances_to(tx, ty)
+
+                def rank(option):
+                    # Past the search radius of a big maze, go by straight-line distance
+                    tile = option[1]
+                    steps = distances[tile]
+                    if steps >= nav.unreachable:
+                        steps += abs(tile % nav.width - tx) + abs(tile // nav.width - ty)
+                    return steps
+
+                if not self.scared:
+                    # Choose direction closest to Pacman
+                    best_direction = min(possible_directions, key=rank)[0]
+
+                    # 80% chance to choose best direction, 20% random
+                    if self.rng.random() < 0.8:
+                        self.direction = best_direction
+                    else:
+                        self.direction = self.rng.choice(possible_directions)[0]
+                else:
+                    # Run away from Pacman, choose direction furthest from Pacman
+                    self.direction = max(possible_directions, key=rank)[0]
+
+        # Move in current direction
+        self.x += self.direction[0] * self.speed
+        self.y += self.direction[1] * self.speed
+        
+        # Update scared state
+        if self.scared:
+            self.scared_timer -= 1
+            if self.scared_timer <= 0:
+                self.scared = False
+
+class Pacman:
+    __slots__ = ('maze', 'speed', 'x', 'y', 'direction', 'next_direction', 'mouth_angle', 'mouth_change',
+                 'last_eaten', 'score')
+
+    def __init__(self, maze):
+        self.maze = maze
+        self.speed = 5  # 增加速度
+        self.reset()
+
+    def reset(self):
+        # Reset all attributes to initial values
+        self.respawn()
+        self.score = 0
+
+    def respawn(self):
+        # Back to the start tile, keeping the score (new life or level)
+        self.x = BLOCK_SIZE * self.maze.pacman_start[0]
+        self.y = BLOCK_SIZE * self.maze.pacman_start[1]
+        self.direction = (0, 0)
+        self.next_direction = (0, 0)
+        self.mouth_angle = 0
+        self.mouth_change = 5
+        self.last_eaten = None  # Tile of the pellet eaten on the last update
+
+    def update(self):
+        self.last_eaten = None
+
+        # 检查下一个方向是否可行
+        if self.next_direction != (0, 0):
+            next_x = self.x + self.next_direction[0] * self.speed
+            next_y = self.y + self.next_direction[1] * self.speed
+            grid_x = int(next_x / BLOCK_SIZE)
+            grid_y = int(next_y / BLOCK_SIZE)
+            
+            # 如果下一个方向可行，立即改变方向
+            if self.maze.tile(grid_x, grid_y) != WALL:
+                self.direction = self.next_direction
+                self.next_direction = (0, 0)  # 清除下一个方向
+
+        # 在当前方向上移动
+        if self.direction != (0, 0):
+            next_x = self.x + self.direction[0] * self.speed
+            next_y = self.y + self.direction[1] * self.speed
+            grid_x = int(next_x / BLOCK_SIZE)
+            grid_y = int(next_y / BLOCK_SIZE)
+
+            if self.maze.tile(grid_x, grid_y) != WALL:
+                self.x = next_x
+                self.y = next_y
+
+                # 嘴巴开合动画
+                self.mouth_angle += self.mouth_change
+                if self.mouth_angle <= 0 or self.mouth_angle >= MOUTH_MAX:
+                    self.mouth_change = -self.mouth_change
+
+                # 收集豆子
+                eaten = self.maze.eat(grid_x, grid_y)
+                if eaten == DOT:
+                    self.score += 10
+                    self.last_eaten = (grid_x, grid_y)
+                elif eaten == POWER:
+                    self.score += 50
+                    self.last_eaten = (grid_x, grid_y)
+                    return True  # 返回是否吃到能量豆
+        return False
+
+    def eat_ghost(self, ghost):
+        ghost.x = BLOCK_SIZE * ghost.home[0]  # Reset ghost position
+        ghost.y = BLOCK_SIZE * ghost.home[1]
+        self.score += 200  # Bonus points for eating ghost
+
+def make_ghosts(maze, rng=None):
+    return [Ghost(x, y, GHOST_COLORS[i % len(GHOST_COLORS)], maze, rng)
+            for i, (x, y) in enumerate(maze.ghost_starts)]
+
+class PacmanGame:
+    """Pac-Man and the ghosts on one maze, advanced one tick at a time.
+
+    All randomness comes from one seeded generator, so the same seed and
+    the same inputs always play out the same way.
+    """
+
+    def __init__(self, maze, seed=None):
+        self.maze = maze
+        self.rng = random.Random()
+        self.pacman = Pacman(maze)
+        self.buckets = TileBuckets(BLOCK_SIZE)
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        # A new game, on a fresh seed unless one is given
+        self.seed = seed if seed is not None else random.randrange(1 << 32)
+        self.rng.seed(self.seed)
+        self.maze.reset()
+        self.pacman.reset()
+        self.ghosts = make_ghosts(self.maze, self.rng)
+        self.level = 1
+        self.ticks = 0
+
+    def step(self, direction=None):
+        # direction is the arrow held down this tick, if any. Returns False
+        # when a ghost catches Pac-Man.
+        pacman = self.pacman
+        if direction is not None:
+            pacman.next_direction = direction
+
+        # 更新游戏状态
+        if pacman.update():  # 检查是否吃到能量豆
+            for ghost in self.ghosts:
+                ghost.scared = True
+                ghost.scared_timer = 300
+
+        # 更新和检查幽灵
+        for ghost in self.ghosts:
+            ghost.update(pacman)
+        caught, eaten = collide([pacman], self.ghosts, BLOCK_SIZE, self.buckets)
+        for eater, ghost in eaten:
+            eater.eat_ghost(ghost)
+        self.ticks += 1
+        if caught:
+            return False
+
+        # 吃完所有豆子，进入下一关
+        if self.maze.cleared:
+            self.level += 1
+            self.maze.reset()
+            pacman.respawn()
+            self.ghosts = make_ghosts(self.maze, self.rng)
+        return True
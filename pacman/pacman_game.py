@@ -1,7 +1,15 @@
 import pygame
 import sys
-import random
-import math
+from collections import OrderedDict, deque
+from maze import Maze
+from mazegen import generate_maze
+import pacman_core
+from pacman_core import BLOCK_SIZE, Ghost, Pacman, PacmanGame
+from sprites import SpriteCache
+from loop import FixedStepLoop
+from replay import Recorder, record_option
+from snapshot import Snapshots
+from profiler import Profiler, ProfileOverlay, profile_option
 from ui import GameUI
 
 # Initialize Pygame
@@ -12,345 +20,334 @@ BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
 BLUE = (0, 0, 255)
 YELLOW = (255, 255, 0)
-RED = (255, 0, 0)
-PINK = (255, 182, 255)
-CYAN = (0, 255, 255)
-ORANGE = (255, 182, 85)
 
 # Set up game window
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 600
-BLOCK_SIZE = 30
-GAME_SPEED = 60  # 保持60FPS
+GAME_SPEED = 60  # Simulation ticks per second
+FRAME_RATE = 60  # Frames drawn per second, None for no cap
+REWIND_SECONDS = 10  # How far back holding Backspace can go
+CHUNK_TILES = 16  # Maze tiles per side of a cached background chunk
+MAX_CHUNKS = 64
 
 # Create game window
 screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
 pygame.display.set_caption('Pac-Man')
-clock = pygame.time.Clock()
 
 # Initialize UI
 game_ui = GameUI(WINDOW_WIDTH, WINDOW_HEIGHT)
 
-# Define maze layout (0: empty, 1: wall, 2: dot, 3: power pellet)
-MAZE = [
-    [1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1],
-    [1,2,2,2,2,2,2,2,2,1,1,2,2,2,2,2,2,2,2,1],
-    [1,2,1,1,2,1,1,1,2,1,1,2,1,1,1,2,1,1,2,1],
-    [1,3,1,1,2,1,1,1,2,1,1,2,1,1,1,2,1,1,3,1],
-    [1,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,1],
-    [1,2,1,1,2,1,2,1,1,1,1,1,1,2,1,2,1,1,2,1],
-    [1,2,2,2,2,1,2,2,2,1,1,2,2,2,1,2,2,2,2,1],
-    [1,1,1,1,2,1,1,1,2,1,1,2,1,1,1,2,1,1,1,1],
-    [1,2,2,2,2,1,2,2,2,2,2,2,2,2,1,2,2,2,2,1],
-    [1,2,1,1,2,1,2,1,1,0,0,1,1,2,1,2,1,1,2,1],
-    [1,2,2,2,2,2,2,1,0,0,0,0,1,2,2,2,2,2,2,1],
-    [1,2,1,1,2,1,2,1,1,1,1,1,1,2,1,2,1,1,2,1],
-    [1,2,2,2,2,1,2,2,2,2,2,2,2,2,1,2,2,2,2,1],
-    [1,1,1,1,2,1,2,1,1,1,1,1,1,2,1,2,1,1,1,1],
-    [1,2,2,2,2,2,2,2,2,1,1,2,2,2,2,2,2,2,2,1],
-    [1,2,1,1,2,1,1,1,2,1,1,2,1,1,1,2,1,1,2,1],
-    [1,3,2,1,2,2,2,2,2,2,2,2,2,2,2,2,1,2,3,1],
-    [1,1,2,1,2,1,2,1,1,1,1,1,1,2,1,2,1,2,1,1],
-    [1,2,2,2,2,1,2,2,2,1,1,2,2,2,1,2,2,2,2,1],
-    [1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1]
-]
-
-class Ghost:
-    def __init__(self, x, y, color):
-        self.x = x * BLOCK_SIZE
-        self.y = y * BLOCK_SIZE
-        self.color = color
-        self.direction = random.choice([(0, 1), (0, -1), (1, 0), (-1, 0)])
-        self.speed = 2  # 确保幽灵速度比Pacman慢
-        self.scared = False
-        self.scared_timer = 0
-        
-    def update(self, pacman):
-        # If at grid center, maybe change direction
-        if self.x % BLOCK_SIZE == 0 and self.y % BLOCK_SIZE == 0:
-            possible_directions = []
-            x, y = int(self.x / BLOCK_SIZE), int(self.y / BLOCK_SIZE)
-            
-            # Check all possible directions
-            for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-                new_x, new_y = x + dx, y + dy
-                if (0 <= new_x < len(MAZE[0]) and 
-                    0 <= new_y < len(MAZE) and 
-                    MAZE[new_y][new_x] != 1):
-                    possible_directions.append((dx, dy))
-            
-            if possible_directions:
-                if not self.scared:
-                    # Target Pacman
-                    target_x = int(pacman.x / BLOCK_SIZE)
-                    target_y = int(pacman.y / BLOCK_SIZE)
-                    
-                    # Choose direction closest to Pacman
-                    best_direction = min(possible_directions, 
-                        key=lambda d: ((x + d[0] - target_x) ** 2 + 
-                                     (y + d[1] - target_y) ** 2))
-                    
-                    # 80% chance to choose best direction, 20% random
-                    if random.random() < 0.8:
-                        self.direction = best_direction
-                    else:
-                        self.direction = random.choice(possible_directions)
-                else:
-                    # Run away from Pacman
-                    target_x = int(pacman.x / BLOCK_SIZE)
-                    target_y = int(pacman.y / BLOCK_SIZE)
-                    
-                    # Choose direction furthest from Pacman
-                    best_direction = max(possible_directions, 
-                        key=lambda d: ((x + d[0] - target_x) ** 2 + 
-                                     (y + d[1] - target_y) ** 2))
-                    self.direction = best_direction
-        
-        # Move in current direction
-        self.x += self.direction[0] * self.speed
-        self.y += self.direction[1] * self.speed
-        
-        # Update scared state
-        if self.scared:
-            self.scared_timer -= 1
-            if self.scared_timer <= 0:
-                self.scared = False
-    
-    def render(self):
-        color = (0, 0, 255) if self.scared else self.color  # Blue when scared
-        
-        # Draw ghost body
-        pygame.draw.circle(screen, color, 
-                         (int(self.x + BLOCK_SIZE/2), 
-                          int(self.y + BLOCK_SIZE/2)), 
-                         int(BLOCK_SIZE/2))
-        
-        # Draw ghost skirt
-        points = [
-            (self.x, self.y + BLOCK_SIZE/2),
-            (self.x + BLOCK_SIZE, self.y + BLOCK_SIZE/2),
-            (self.x + BLOCK_SIZE, self.y + BLOCK_SIZE),
-            (self.x + BLOCK_SIZE*3/4, self.y + BLOCK_SIZE*3/4),
-            (self.x + BLOCK_SIZE/2, self.y + BLOCK_SIZE),
-            (self.x + BLOCK_SIZE/4, self.y + BLOCK_SIZE*3/4),
-            (self.x, self.y + BLOCK_SIZE)
-        ]
-        pygame.draw.polygon(screen, color, points)
-        
-        # Draw eyes
-        eye_color = WHITE
-        pupil_color = BLACK
-        eye_radius = BLOCK_SIZE/6
-        pupil_radius = BLOCK_SIZE/8
-        
-        # Left eye
-        pygame.draw.circle(screen, eye_color,
-                         (int(self.x + BLOCK_SIZE/3),
-                          int(self.y + BLOCK_SIZE/3)), 
-                         int(eye_radius))
-        # Right eye
-        pygame.draw.circle(screen, eye_color,
-                         (int(self.x + BLOCK_SIZE*2/3),
-                          int(self.y + BLOCK_SIZE/3)), 
-                         int(eye_radius))
-        
-        if not self.scared:
-            # Pupils follow Pacman
-            dx = self.direction[0]
-            dy = self.direction[1]
-            
-            # Left pupil
-            pygame.draw.circle(screen, pupil_color,
-                             (int(self.x + BLOCK_SIZE/3 + dx*2),
-                              int(self.y + BLOCK_SIZE/3 + dy*2)), 
-                             int(pupil_radius))
-            # Right pupil
-            pygame.draw.circle(screen, pupil_color,
-                             (int(self.x + BLOCK_SIZE*2/3 + dx*2),
-                              int(self.y + BLOCK_SIZE/3 + dy*2)), 
-                             int(pupil_radius))
-
-class Pacman:
-    def __init__(self):
-        self.x = BLOCK_SIZE * 10
-        self.y = BLOCK_SIZE * 15
-        self.direction = (0, 0)
-        self.next_direction = (0, 0)
-        self.speed = 5  # 增加速度
-        self.score = 0
-        self.mouth_angle = 0
-        self.mouth_change = 5
-
-    def reset(self):
-        # Reset all attributes to initial values
-        self.x = BLOCK_SIZE * 10
-        self.y = BLOCK_SIZE * 15
-        self.direction = (0, 0)
-        self.next_direction = (0, 0)
-        self.score = 0
-        self.mouth_angle = 0
-        self.mouth_change = 5
-
-    def update(self):
-        # 检查下一个方向是否可行
-        if self.next_direction != (0, 0):
-            next_x = self.x + self.next_direction[0] * self.speed
-            next_y = self.y + self.next_direction[1] * self.speed
-            grid_x = int(next_x / BLOCK_SIZE)
-            grid_y = int(next_y / BLOCK_SIZE)
-            
-            # 如果下一个方向可行，立即改变方向
-            if (0 <= grid_x < len(MAZE[0]) and 0 <= grid_y < len(MAZE) and 
-                MAZE[grid_y][grid_x] != 1):
-                self.direction = self.next_direction
-                self.next_direction = (0, 0)  # 清除下一个方向
-
-        # 在当前方向上移动
-        if self.direction != (0, 0):
-            next_x = self.x + self.direction[0] * self.speed
-            next_y = self.y + self.direction[1] * self.speed
-            grid_x = int(next_x / BLOCK_SIZE)
-            grid_y = int(next_y / BLOCK_SIZE)
-
-            if (0 <= grid_x < len(MAZE[0]) and 0 <= grid_y < len(MAZE) and 
-                MAZE[grid_y][grid_x] != 1):
-                self.x = next_x
-                self.y = next_y
-                
-                # 收集豆子
-                if MAZE[grid_y][grid_x] == 2:
-                    MAZE[grid_y][grid_x] = 0
-                    self.score += 10
-                elif MAZE[grid_y][grid_x] == 3:
-                    MAZE[grid_y][grid_x] = 0
-                    self.score += 50
-                    return True  # 返回是否吃到能量豆
-        return False
-
-    def render(self):
-        # Draw Pac-Man as a circle with a mouth
-        # First draw the full circle
-        pygame.draw.circle(screen, YELLOW, 
-                         (int(self.x + BLOCK_SIZE/2), int(self.y + BLOCK_SIZE/2)), 
-                         int(BLOCK_SIZE/2 - 2))
-        
-        # Then draw the mouth
-        if self.direction != (0, 0):  # Only show mouth when moving
-            # Calculate mouth points
-            center = (int(self.x + BLOCK_SIZE/2), int(self.y + BLOCK_SIZE/2))
-            radius = BLOCK_SIZE/2 - 2
-            
-            # Calculate mouth direction
-            angle = 0
-            if self.direction == (1, 0):    # Right
-                angle = 0
-            elif self.direction == (-1, 0):  # Left
-                angle = 180
-            elif self.direction == (0, -1):  # Up
-                angle = 90
-            elif self.direction == (0, 1):   # Down
-                angle = 270
-            
-            # Draw mouth triangle
-            mouth_angle = self.mouth_angle * 3.14159 / 180  # Convert to radians
-            point1 = (center[0], center[1])
-            point2 = (center[0] + radius * math.cos(angle - mouth_angle),
-                     center[1] - radius * math.sin(angle - mouth_angle))
-            point3 = (center[0] + radius * math.cos(angle + mouth_angle),
-                     center[1] - radius * math.sin(angle + mouth_angle))
-            
-            pygame.draw.polygon(screen, BLACK, [point1, point2, point3])
-
-    def check_ghost_collision(self, ghost):
-        # Calculate distance between Pacman and ghost
-        dx = self.x - ghost.x
-        dy = self.y - ghost.y
-        distance = (dx ** 2 + dy ** 2) ** 0.5
-        
-        if distance < BLOCK_SIZE:
-            if ghost.scared:
-                ghost.x = BLOCK_SIZE * 10  # Reset ghost position
-                ghost.y = BLOCK_SIZE * 10
-                self.score += 200  # Bonus points for eating ghost
-                return False
-            else:
-                return True  # Game over
-        return False
-
-def draw_maze():
-    for y, row in enumerate(MAZE):
-        for x, cell in enumerate(row):
-            rect = (x * BLOCK_SIZE, y * BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE)
+def draw_maze(surface, maze, left=0, top=0, right=None, bottom=None):
+    # Draw tiles [left, right) x [top, bottom) with (left, top) at the origin
+    right = maze.width if right is None else min(right, maze.width)
+    bottom = maze.height if bottom is None else min(bottom, maze.height)
+    for y in range(top, bottom):
+        for x in range(left, right):
+            cell = maze.tile(x, y)
+            px = (x - left) * BLOCK_SIZE
+            py = (y - top) * BLOCK_SIZE
+            rect = (px, py, BLOCK_SIZE, BLOCK_SIZE)
             if cell == 1:  # Wall
-                pygame.draw.rect(screen, BLUE, rect)
+                pygame.draw.rect(surface, BLUE, rect)
             elif cell == 2:  # Dot
-                pygame.draw.circle(screen, WHITE,
-                                 (x * BLOCK_SIZE + BLOCK_SIZE//2,
-                                  y * BLOCK_SIZE + BLOCK_SIZE//2), 3)
+                pygame.draw.circle(surface, WHITE,
+                                 (px + BLOCK_SIZE//2,
+                                  py + BLOCK_SIZE//2), 3)
             elif cell == 3:  # Power pellet
-                pygame.draw.circle(screen, WHITE,
-                                 (x * BLOCK_SIZE + BLOCK_SIZE//2,
-                                  y * BLOCK_SIZE + BLOCK_SIZE//2), 8)
-
-def main():
-    pacman = Pacman()
-    ghosts = [
-        Ghost(10, 8, RED),     # Blinky
-        Ghost(10, 10, PINK),   # Pinky
-        Ghost(9, 10, CYAN),    # Inky
-        Ghost(11, 10, ORANGE)  # Clyde
-    ]
-    game_active = True
+                pygame.draw.circle(surface, WHITE,
+                                 (px + BLOCK_SIZE//2,
+                                  py + BLOCK_SIZE//2), 8)
+
+class MazeRenderer:
+    """Draws the part of the maze under a camera that follows Pac-Man.
+
+    The maze is baked lazily into square chunks of tiles, kept in a small
+    LRU cache, so huge mazes never need one giant surface. Walls never
+    change and pellets only disappear, so an eaten pellet is erased from
+    its chunk in place. While the camera holds still each frame repaints
+    only the areas around the actors, the erased tiles and the score;
+    when it scrolls, only the chunks and actors inside the view are drawn.
+    Frames between ticks draw the actors part way along their last move.
+    """
+
+    def __init__(self, screen, game_ui, maze):
+        self.screen = screen
+        self.game_ui = game_ui
+        self.maze = maze
+        self.sprites = SpriteCache(BLOCK_SIZE)
+        self.view = screen.get_rect()
+        self.chunks = OrderedDict()
+        self.camera = (0, 0)
+        self.rebuild()
+
+    def rebuild(self):
+        # Bake the maze again, e.g. after the pellets were restored
+        self.chunks.clear()
+        self.full_redraw = True
+        self.actors = []
+        self.actor_rects = []
+        self.dirty = []
+        self.previous = {}
+
+    def invalidate(self):
+        # Repaint the whole window on the next frame
+        self.full_redraw = True
+
+    def _chunk(self, cx, cy):
+        chunk = self.chunks.get((cx, cy))
+        if chunk is None:
+            size = CHUNK_TILES * BLOCK_SIZE
+            chunk = pygame.Surface((size, size))
+            chunk.fill(BLACK)
+            draw_maze(chunk, self.maze, cx * CHUNK_TILES, cy * CHUNK_TILES,
+                      (cx + 1) * CHUNK_TILES, (cy + 1) * CHUNK_TILES)
+            self.chunks[(cx, cy)] = chunk
+            if len(self.chunks) > MAX_CHUNKS:
+                self.chunks.popitem(last=False)
+        else:
+            self.chunks.move_to_end((cx, cy))
+        return chunk
+
+    def erase_pellet(self, tile):
+        # Chunks not in the cache are baked from the maze, which is already up to date
+        cx, cy = tile[0] // CHUNK_TILES, tile[1] // CHUNK_TILES
+        chunk = self.chunks.get((cx, cy))
+        if chunk is not None:
+            chunk.fill(BLACK, ((tile[0] - cx * CHUNK_TILES) * BLOCK_SIZE,
+                               (tile[1] - cy * CHUNK_TILES) * BLOCK_SIZE,
+                               BLOCK_SIZE, BLOCK_SIZE))
+        self.dirty.append(pygame.Rect(tile[0] * BLOCK_SIZE, tile[1] * BLOCK_SIZE,
+                                      BLOCK_SIZE, BLOCK_SIZE))
+
+    def remember(self, pacman, ghosts):
+        # Call before every tick so frames in between can interpolate
+        self.previous = {actor: (actor.x, actor.y) for actor in ghosts + [pacman]}
+
+    def _position(self, actor, alpha):
+        # Where actor is alpha of the way through its last move
+        old = self.previous.get(actor)
+        if old is None or alpha >= 1:
+            return actor.x, actor.y
+        dx = actor.x - old[0]
+        dy = actor.y - old[1]
+        if abs(dx) > BLOCK_SIZE or abs(dy) > BLOCK_SIZE:
+            return actor.x, actor.y  # Sent home or respawned, no sliding
+        return round(old[0] + dx * alpha), round(old[1] + dy * alpha)
+
+    def _follow(self, pacman_x, pacman_y):
+        # Center on Pac-Man without scrolling past the edges of the maze
+        maze_width = self.maze.width * BLOCK_SIZE
+        maze_height = self.maze.height * BLOCK_SIZE
+        x = pacman_x + BLOCK_SIZE // 2 - self.view.width // 2
+        y = pacman_y + BLOCK_SIZE // 2 - self.view.height // 2
+        x = max(0, min(x, maze_width - self.view.width))
+        y = max(0, min(y, maze_height - self.view.height))
+        return (int(x), int(y))
+
+    def _blit_actor(self, actor, x, y):
+        if isinstance(actor, Ghost):
+            sprite = self.sprites.ghost(actor.color, actor.scared, actor.direction)
+        else:
+            sprite = self.sprites.pacman(actor.direction, actor.mouth_angle)
+        pad = self.sprites.pad
+        self.screen.blit(sprite, (x - pad - self.camera[0], y - pad - self.camera[1]))
+
+    def _actor_rect(self, x, y):
+        # Actors draw within their block, give the outlines a little slack
+        return pygame.Rect(x, y, BLOCK_SIZE, BLOCK_SIZE).inflate(4, 4)
+
+    def _paint(self, rect, score):
+        # Repaint one screen rectangle: maze chunks, then actors, then score
+        screen = self.screen
+        camera_x, camera_y = self.camera
+        screen.set_clip(rect)
+        screen.fill(BLACK, rect)
+        chunk_size = CHUNK_TILES * BLOCK_SIZE
+        left = max((rect.left + camera_x) // chunk_size, 0)
+        right = min((rect.right - 1 + camera_x) // chunk_size, (self.maze.width - 1) // CHUNK_TILES)
+        top = max((rect.top + camera_y) // chunk_size, 0)
+        bottom = min((rect.bottom - 1 + camera_y) // chunk_size, (self.maze.height - 1) // CHUNK_TILES)
+        for cy in range(top, bottom + 1):
+            for cx in range(left, right + 1):
+                screen.blit(self._chunk(cx, cy),
+                            (cx * chunk_size - camera_x, cy * chunk_size - camera_y))
+        for (actor, x, y), actor_rect in zip(self.actors, self.actor_rects):
+            if actor_rect.colliderect(rect):
+                self._blit_actor(actor, x, y)
+        if self.score_rect.colliderect(rect):
+            self.game_ui.draw_score(screen, score)
+        screen.set_clip(None)
+
+    def draw(self, pacman, ghosts, alpha=1.0):
+        # alpha is how far real time has got from the last tick to the next
+        camera = self._follow(*self._position(pacman, alpha))
+        if camera != self.camera:
+            self.camera = camera
+            self.full_redraw = True
+
+        # Only actors inside the view are drawn. Ghosts first so Pac-Man
+        # is drawn on top, as in a full frame.
+        old_rects = self.actor_rects
+        self.actors = []
+        self.actor_rects = []
+        for actor in ghosts + [pacman]:
+            x, y = self._position(actor, alpha)
+            rect = self._actor_rect(x, y).move(-camera[0], -camera[1])
+            if rect.colliderect(self.view):
+                self.actors.append((actor, x, y))
+                self.actor_rects.append(rect)
+
+        if self.full_redraw:
+            self.full_redraw = False
+            self.score_rect = self.game_ui.score_rect(pacman.score)
+            self.score = pacman.score
+            self._paint(self.view, pacman.score)
+            self.dirty = []
+            pygame.display.update()
+            return
+
+        dirty = [rect.move(-camera[0], -camera[1]) for rect in self.dirty]
+        dirty += old_rects + self.actor_rects
+        if pacman.score != self.score:
+            dirty.append(self.score_rect)
+            self.score_rect = self.game_ui.score_rect(pacman.score)
+            dirty.append(self.score_rect)
+            self.score = pacman.score
+        for rect in dirty:
+            self._paint(rect, pacman.score)
+        self.dirty = []
+        pygame.display.update(dirty)
+
+def load_maze(args):
+    # pacman_game.py [maze name or file]
+    # pacman_game.py random WIDTH HEIGHT [SEED]
+    if args and args[0] == 'random':
+        width = int(args[1]) if len(args) > 1 else 101
+        height = int(args[2]) if len(args) > 2 else 101
+        seed = int(args[3]) if len(args) > 3 else None
+        return generate_maze(width, height, seed)
+    return Maze.load(args[0] if args else 'classic')
+
+def main(tick_rate=GAME_SPEED, frame_rate=FRAME_RATE):
+    # pacman_game.py [maze args] [--record DIR] saves a replay of every game into DIR
+    # pacman_game.py [maze args] [--profile FILE] profiles from the start,
+    # writing a Chrome trace to FILE on F4 and on quitting
+    replay_dir, args = record_option(sys.argv[1:])
+    profile_path, args = profile_option(args)
+    try:
+        maze = load_maze(args)
+    except ValueError as e:
+        print(e)
+        sys.exit(2)
+    game = PacmanGame(maze)
+    renderer = MazeRenderer(screen, game_ui, game.maze)
+    loop = FixedStepLoop(tick_rate, frame_rate)
+    recorder = Recorder(game)
+    snapshots = Snapshots(game, int(tick_rate * REWIND_SECONDS))
+    checkpoints = deque(maxlen=snapshots.capacity)  # Recorder position per snapshot
+    level = 1
+
+    # F3 shows the profiler overlay and turns profiling on, F4 saves a trace
+    profiler = Profiler()
+    profiler.watch(Snapshots, 'push', 'snapshot')
+    profiler.watch(Pacman, 'update', 'pacman.update')
+    profiler.watch(Ghost, 'update', 'ghosts')
+    profiler.watch(pacman_core, 'collide', 'collide')
+    profiler.watch(sys.modules[__name__], 'draw_maze', 'draw_maze')
+    profiler.watch(MazeRenderer, '_blit_actor', 'actors')
+    profiler.watch(pygame.display, 'update', 'display.update')
+    overlay = ProfileOverlay(profiler)
+    if profile_path:
+        profiler.enable()
 
     while True:
         # 处理输入
-        for event in pygame.event.get():
+        # Nothing moves on the game over screen, sleep until an event comes
+        events = [pygame.event.wait()] if game_ui.game_over else pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
+                if profile_path:
+                    profiler.export(profile_path)
                 pygame.quit()
                 sys.exit()
+            elif event.type == pygame.VIDEOEXPOSE:
+                if game_ui.game_over:
+                    game_ui.draw_game_over(screen)
+                renderer.invalidate()
+            elif game_ui.game_over and game_ui.handle_event(event):
+                game.reset()
+                renderer.rebuild()
+                level = 1
+                pygame.display.set_caption('Pac-Man')
+                loop.reset()
+                profiler.skip()
+                recorder = Recorder(game)
+                snapshots.clear()
+                checkpoints.clear()
+            elif event.type == pygame.KEYDOWN and not game_ui.game_over:
+                if event.key == pygame.K_F3:
+                    if not profiler.toggle():
+                        renderer.invalidate()
+                elif event.key == pygame.K_F4:
+                    print('wrote', profiler.export(profile_path or 'pacman-trace.json'))
+        if game_ui.game_over:
+            continue
 
         # 持续检查按键状态
-        if game_active:
-            keys = pygame.key.get_pressed()
-            if keys[pygame.K_UP]:
-                pacman.next_direction = (0, -1)
-            elif keys[pygame.K_DOWN]:
-                pacman.next_direction = (0, 1)
-            elif keys[pygame.K_LEFT]:
-                pacman.next_direction = (-1, 0)
-            elif keys[pygame.K_RIGHT]:
-                pacman.next_direction = (1, 0)
-
-            # 更新游戏状态
-            power_pellet = pacman.update()  # 检查是否吃到能量豆
-            
-            if power_pellet:
-                for ghost in ghosts:
-                    ghost.scared = True
-                    ghost.scared_timer = 300
-
-            # 更新和检查幽灵
-            for ghost in ghosts:
-                ghost.update(pacman)
-                if pacman.check_ghost_collision(ghost):
-                    game_active = False
-                    game_ui.show_game_over_screen(screen, pacman.score)
-                    pacman.reset()
-                    for g in ghosts:
-                        g.__init__(g.x // BLOCK_SIZE, g.y // BLOCK_SIZE, g.color)
-                    game_active = True
-                    break
-
-            # 绘制游戏画面
-            screen.fill(BLACK)
-            draw_maze()
-            for ghost in ghosts:
-                ghost.render()
-            pacman.render()
-            game_ui.draw_score(screen, pacman.score)
-            
-            pygame.display.update()
-            clock.tick(GAME_SPEED)
+        keys = pygame.key.get_pressed()
+        direction = None
+        if keys[pygame.K_UP]:
+            direction = (0, -1)
+        elif keys[pygame.K_DOWN]:
+            direction = (0, 1)
+        elif keys[pygame.K_LEFT]:
+            direction = (-1, 0)
+        elif keys[pygame.K_RIGHT]:
+            direction = (1, 0)
+        profiler.lap('input')
+
+        # Run the ticks that are due, however long the last frame took.
+        # Holding Backspace runs time backwards instead.
+        rewinding = keys[pygame.K_BACKSPACE]
+        for _ in range(loop.advance()):
+            if rewinding:
+                if snapshots.rewind():
+                    recorder.rollback(checkpoints.pop())
+                    renderer.rebuild()
+                    if game.level != level:
+                        level = game.level
+                        pygame.display.set_caption(f'Pac-Man - Level {level}' if level > 1 else 'Pac-Man')
+                continue
+            renderer.remember(game.pacman, game.ghosts)
+            snapshots.push()
+            checkpoints.append(recorder.checkpoint())
+            recorder.record(direction)
+            if not game.step(direction):
+                if replay_dir:
+                    recorder.save(replay_dir)
+                game_ui.show_game_over_screen(screen, game.pacman.score)
+                break
+            if game.pacman.last_eaten:
+                renderer.erase_pellet(game.pacman.last_eaten)
+
+            # 吃完所有豆子，进入下一关
+            if game.level != level:
+                level = game.level
+                pygame.display.set_caption(f'Pac-Man - Level {level}')
+                renderer.rebuild()
+
+        if game_ui.game_over:
+            continue
+        profiler.lap('tick')
+
+        # 绘制游戏画面，只刷新变化的区域
+        renderer.draw(game.pacman, game.ghosts, loop.alpha)
+        if profiler.enabled:
+            overlay.draw(screen)
+        profiler.lap('draw')
+        loop.wait()
+        profiler.lap('wait')
+        profiler.frame()
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
@@ -0,0 +1,194 @@
+import json
+import os
+import sys
+import time
+from array import array
+from collections import deque
+import pygame
+from options import option
+
+# Per-frame profiling for the main loop. The loop marks the end of each of
+# its phases with lap(phase) and the end of the frame with frame(); the
+# time since the previous mark goes to that phase. Deeper phases come from
+# watch(owner, name, phase), which swaps owner.name (a method on a class,
+# or a function on a module) for a timed wrapper while profiling is on and
+# puts the original back when it is turned off. Turned off, a profiler is a
+# few early returns per frame and nothing is wrapped.
+#
+# The last FRAMES frames of every phase are kept in ring buffers for
+# percentiles, along with the frame time and the change in allocated memory
+# blocks. Every timed call also goes into a bounded event log that export()
+# writes as a Chrome trace (chrome://tracing or ui.perfetto.dev).
+
+FRAMES = 600  # Frames kept for percentiles
+TRACE_EVENTS = 200000  # Timed calls kept for export
+OVERLAY_REFRESH = 0.5  # Seconds between overlay updates
+OVERLAY_COLOR = (255, 255, 0)
+OVERLAY_BACKGROUND = (0, 0, 0)
+
+
+class Profiler:
+    def __init__(self, frames=FRAMES, clock=time.perf_counter):
+        self.frames = frames
+        self.clock = clock
+        self.enabled = False
+        self.watches = []  # (owner, name, phase)
+        self.originals = []  # (owner, name, original) while enabled
+        self.phases = {}  # Phase -> ring of seconds per frame
+        self.frame_times = array('d', bytes(8 * frames))
+        self.blocks = array('q', bytes(8 * frames))  # Net allocated blocks per frame
+        self.current = {}  # Phase -> seconds so far this frame
+        self.events = deque(maxlen=TRACE_EVENTS)  # (phase, start, seconds)
+        self.count = 0  # Frames recorded
+        self.origin = clock()
+
+    def watch(self, owner, name, phase=None):
+        # Time every call to owner.name as phase while enabled
+        self.watches.append((owner, name, phase or name))
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+        return self.enabled
+
+    def enable(self):
+        if self.enabled:
+            return
+        for owner, name, phase in self.watches:
+            original = getattr(owner, name)
+            self.originals.append((owner, name, original))
+            setattr(owner, name, self._timed(original, phase))
+        self.enabled = True
+        self.skip()
+
+    def disable(self):
+        if not self.enabled:
+            return
+        for owner, name, original in reversed(self.originals):
+            setattr(owner, name, original)
+        self.originals = []
+        self.enabled = False
+
+    def _timed(self, function, phase):
+        clock = self.clock
+        current = self.current
+        events = self.events
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds = clock() - start
+                current[phase] = current.get(phase, 0.0) + seconds
+                events.append((phase, start, seconds))
+        return timed
+
+    def skip(self):
+        # Forget the frame so far, e.g. after blocking on the game over screen
+        self.current.clear()
+        self.frame_start = self.mark = self.clock()
+        self.frame_blocks = sys.getallocatedblocks()
+
+    def lap(self, phase):
+        # Time since the last lap (or the frame start) was spent on phase
+        if not self.enabled:
+            return
+        now = self.clock()
+        seconds = now - self.mark
+        self.current[phase] = self.current.get(phase, 0.0) + seconds
+        self.events.append((phase, self.mark, seconds))
+        self.mark = now
+
+    def frame(self):
+        # End of the frame: move this frame's totals into the rings
+        if not self.enabled:
+            return
+        now = self.clock()
+        blocks = sys.getallocatedblocks()
+        i = self.count % self.frames
+        self.frame_times[i] = now - self.frame_start
+        self.blocks[i] = blocks - self.frame_blocks
+        self.events.append(('frame', self.frame_start, now - self.frame_start))
+        for phase in self.current:
+            if phase not in self.phases:
+                self.phases[phase] = array('d', bytes(8 * self.frames))
+        for phase, ring in self.phases.items():
+            ring[i] = self.current.get(phase, 0.0)
+        self.count += 1
+        self.current.clear()
+        self.frame_start = self.mark = now
+        self.frame_blocks = blocks
+
+    def percentiles(self, ring, ps=(50, 99)):
+        ordered = sorted(ring[:min(self.count, self.frames)])
+        if not ordered:
+            return [0] * len(ps)
+        return [ordered[min(len(ordered) * p // 100, len(ordered) - 1)] for p in ps]
+
+    def fps(self):
+        n = min(self.count, self.frames)
+        total = sum(self.frame_times[:n])
+        return n / total if total else 0.0
+
+    def report(self):
+        # Lines of text summing up the recorded frames
+        lines = [f'{self.fps():5.1f} fps  frame p50/p99 '
+                 + ' '.join(f'{t * 1000:.2f}' for t in self.percentiles(self.frame_times)) + ' ms']
+        for phase, ring in self.phases.items():
+            p50, p99 = self.percentiles(ring)
+            lines.append(f'{phase:<14} {p50 * 1000:6.2f} {p99 * 1000:6.2f} ms')
+        p50, p99 = self.percentiles(self.blocks)
+        lines.append(f'{"blocks/frame":<14} {p50:+6d} {p99:+6d}')
+        return lines
+
+    def export(self, path):
+        # Write the event log as a Chrome trace, returning the path
+        pid = os.getpid()
+        events = [{'name': phase, 'ph': 'X', 'pid': pid, 'tid': 0,
+                   'ts': (start - self.origin) * 1e6, 'dur': seconds * 1e6}
+                  for phase, start, seconds in self.events]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return path
+
+
+class ProfileOverlay:
+    # The profiler's report in the top right corner, re-rendered now and
+    # then rather than every frame. Its box is opaque and never shrinks, so
+    # blitting it on top of each finished frame covers whatever the
+    # renderer painted there; invalidate the renderer once it is hidden.
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.font = pygame.font.Font(None, 20)
+        self.surface = None
+        self.rect = None
+        self.updated = 0.0
+
+    def draw(self, screen):
+        now = time.perf_counter()
+        if self.surface is None or now - self.updated >= OVERLAY_REFRESH:
+            lines = [self.font.render(line, True, OVERLAY_COLOR, OVERLAY_BACKGROUND)
+                     for line in self.profiler.report()]
+            width = max(line.get_width() for line in lines) + 8
+            height = sum(line.get_height() for line in lines) + 8
+            if self.surface is not None:
+                width = max(width, self.surface.get_width())
+                height = max(height, self.surface.get_height())
+            self.surface = pygame.Surface((width, height))
+            self.surface.fill(OVERLAY_BACKGROUND)
+            y = 4
+            for line in lines:
+                self.surface.blit(line, (4, y))
+                y += line.get_height()
+            self.updated = now
+        self.rect = self.surface.get_rect(topright=(screen.get_width() - 4, 4))
+        screen.blit(self.surface, self.rect)
+        pygame.display.update(self.rect)
+
+
+def profile_option(args):
+    # Pull "--profile FILE" out of the command line: (FILE or None, other args)
+    return option(args, '--profile')
@@ -0,0 +1,238 @@
+import os
+import sys
+import time
+import zlib
+from maze import Maze
+from navigation import DIRECTIONS
+from options import option
+from pacman_core import PacmanGame
+
+# Replays: a game's seed, its maze and the ticks where the arrow held down
+# changed. Everything else follows from the seeded rules, so a whole game
+# fits in a few hundred bytes. All numbers are unsigned LEB128 varints:
+#
+#   b'PACR' version seed maze-length maze ticks score count
+#   count x (ticks since the previous change << 3 | input)
+#
+# The maze is its text form, zlib-compressed. input is 0 for no arrow or
+# 1 + its index in DIRECTIONS. ticks and score are how the recorded game
+# ended, so playing a replay back also checks that the rules still behave
+# the same.
+
+MAGIC = b'PACR'
+VERSION = 1
+
+
+def write_varint(out, n):
+    while n > 0x7f:
+        out.append(n & 0x7f | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def read_varint(data, pos):
+    n = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+
+class Recorder:
+    def __init__(self, game):
+        # Start right after the game is created or reset
+        self.game = game
+        self.seed = game.seed
+        self.input = 0
+        self.events = bytearray()
+        self.count = 0
+        self.ticks = 0
+        self.last_change = 0
+
+    def record(self, direction):
+        # Call with the arrow held (or None) just before every game.step()
+        code = 0 if direction is None else DIRECTIONS.index(direction) + 1
+        if code != self.input:
+            write_varint(self.events, (self.ticks - self.last_change) << 3 | code)
+            self.input = code
+            self.last_change = self.ticks
+            self.count += 1
+        self.ticks += 1
+
+    def checkpoint(self):
+        # Where the log is now, to go back to after a rewind
+        return (self.ticks, self.last_change, self.count, len(self.events), self.input)
+
+    def rollback(self, checkpoint):
+        self.ticks, self.last_change, self.count, size, self.input = checkpoint
+        del self.events[size:]
+
+    def to_bytes(self):
+        out = bytearray(MAGIC)
+        maze = zlib.compress(self.game.maze.to_text().encode('utf-8'))
+        for n in (VERSION, self.seed, len(maze)):
+            write_varint(out, n)
+        out += maze
+        for n in (self.ticks, self.game.pacman.score, self.count):
+            write_varint(out, n)
+        return bytes(out + self.events)
+
+    def save(self, directory):
+        # Write pacman-<seed>.rpl into directory, returning its path
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'pacman-{self.seed}.rpl')
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+        return path
+
+
+class Replay:
+    def __init__(self, seed, maze, ticks, score, changes):
+        self.seed = seed
+        self.maze = maze
+        self.ticks = ticks
+        self.score = score
+        self.changes = changes  # (tick, direction or None) pairs
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:4] != MAGIC:
+            raise ValueError('not a Pac-Man replay')
+        version, pos = read_varint(data, 4)
+        if version != VERSION:
+            raise ValueError(f'unsupported replay version {version}')
+        seed, pos = read_varint(data, pos)
+        size, pos = read_varint(data, pos)
+        maze = Maze.from_text(zlib.decompress(data[pos:pos + size]).decode('utf-8'))
+        pos += size
+        ticks, pos = read_varint(data, pos)
+        score, pos = read_varint(data, pos)
+        count, pos = read_varint(data, pos)
+        changes = []
+        tick = 0
+        for _ in range(count):
+            n, pos = read_varint(data, pos)
+            tick += n >> 3
+            code = n & 7
+            changes.append((tick, DIRECTIONS[code - 1] if code else None))
+        return cls(seed, maze, ticks, score, changes)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+    def new_game(self):
+        return PacmanGame(self.maze, seed=self.seed)
+
+    def inputs(self):
+        # The arrow held on every tick of the recorded game
+        direction = None
+        changes = iter(self.changes)
+        change = next(changes, None)
+        for tick in range(self.ticks):
+            while change is not None and change[0] == tick:
+                direction = change[1]
+                change = next(changes, None)
+            yield direction
+
+    def play(self):
+        # Run the whole game headless, as fast as possible
+        game = self.new_game()
+        for direction in self.inputs():
+            if not game.step(direction):
+                break
+        return game
+
+    def matches(self, game):
+        # Did a played back game end like the recorded one?
+        return game.ticks == self.ticks and game.pacman.score == self.score
+
+
+def watch(replay, tick_rate):
+    # Show a replay in a window at tick_rate ticks per second
+    import pygame
+    from loop import FixedStepLoop
+    from pacman_game import MazeRenderer, screen, game_ui, FRAME_RATE
+
+    pygame.display.set_caption(f'Pac-Man Replay - seed {replay.seed}')
+    game = replay.new_game()
+    renderer = MazeRenderer(screen, game_ui, game.maze)
+    loop = FixedStepLoop(tick_rate, FRAME_RATE)
+    inputs = replay.inputs()
+    level = game.level
+    while True:
+        events = [pygame.event.wait()] if game_ui.game_over else pygame.event.get()
+        for event in events:
+            if event.type == pygame.QUIT or game_ui.game_over and game_ui.handle_event(event):
+                pygame.quit()
+                return game
+            elif event.type == pygame.VIDEOEXPOSE:
+                if game_ui.game_over:
+                    game_ui.draw_game_over(screen)
+                renderer.invalidate()
+        if game_ui.game_over:
+            continue
+        for _ in range(loop.advance()):
+            renderer.remember(game.pacman, game.ghosts)
+            direction = next(inputs, False)
+            if direction is False or not game.step(direction):
+                game_ui.show_game_over_screen(screen, game.pacman.score)
+                break
+            if game.pacman.last_eaten:
+                renderer.erase_pellet(game.pacman.last_eaten)
+            if game.level != level:
+                level = game.level
+                renderer.rebuild()
+        if not game_ui.game_over:
+            renderer.draw(game.pacman, game.ghosts, loop.alpha)
+            loop.wait()
+
+
+def record_option(args):
+    # Pull "--record DIR" out of the command line: (DIR or None, other args)
+    return option(args, '--record')
+
+
+def replay_paths(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith('.rpl'):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def main():
+    # python replay.py check FILE_OR_DIR...   re-run replays headless
+    # python replay.py watch FILE [TICKS_PER_SECOND]
+    if len(sys.argv) < 3 or sys.argv[1] not in ('check', 'watch'):
+        print('usage: replay.py check FILE_OR_DIR... | watch FILE [TICKS_PER_SECOND]')
+        sys.exit(2)
+    if sys.argv[1] == 'watch':
+        rate = float(sys.argv[3]) if len(sys.argv) > 3 else 60
+        watch(Replay.load(sys.argv[2]), rate)
+        return
+
+    games = ticks = failed = 0
+    start = time.perf_counter()
+    for path in replay_paths(sys.argv[2:]):
+        replay = Replay.load(path)
+        game = replay.play()
+        games += 1
+        ticks += replay.ticks
+        if not replay.matches(game):
+            failed += 1
+            print(f'{path}: expected score {replay.score} after {replay.ticks} ticks, '
+                  f'got {game.pacman.score} after {game.ticks}')
+    elapsed = time.perf_counter() - start
+    print(f'{games} replays, {failed} failed, {ticks} ticks in {elapsed:.2f}s')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import struct
+from maze import EMPTY, WALL, DOT, POWER
+from navigation import DIRECTIONS
+
+# Whole-game snapshots as fixed-size binary records in a ring buffer that
+# is allocated once. A record is the header below, one GHOST entry per
+# ghost, the random generator's state and one bit per maze tile saying
+# whether its pellet is still there. Walls never change, so the pellet bits
+# and the pristine maze are enough to put the tiles back. Used for
+# rewinding in the UI, rolling back and trying moves out from the same
+# position.
+
+# ticks, level, score, Pac-Man x and y, direction and next direction
+# (0 for none, else 1 + index in DIRECTIONS), mouth angle and change,
+# tile of the last pellet eaten (-1 for none)
+HEADER = struct.Struct('<IIIiiBBbbi')
+# x, y, direction index, scared, scared timer
+GHOST = struct.Struct('<iiB?i')
+RNG_STATE = struct.Struct('<625I')
+
+# Tile bytes to '1' where a pellet is, tile bytes to a mask of everything
+# but pellets, and '0'/'1' digits to whole-byte masks
+PELLET_DIGITS = bytes.maketrans(bytes([EMPTY, WALL, DOT, POWER]), b'0011')
+NOT_PELLETS = bytes.maketrans(bytes([EMPTY, WALL, DOT, POWER]), b'\xff\xff\x00\x00')
+DIGIT_MASKS = bytes.maketrans(b'01', b'\x00\xff')
+
+
+def direction_code(direction):
+    return 0 if direction == (0, 0) else DIRECTIONS.index(direction) + 1
+
+
+class Snapshots:
+    def __init__(self, game, capacity):
+        self.game = game
+        self.capacity = capacity
+        maze = game.maze
+        self.tile_count = maze.width * maze.height
+        self.ghosts_at = HEADER.size
+        self.rng_at = self.ghosts_at + GHOST.size * len(game.ghosts)
+        self.pellets_at = self.rng_at + RNG_STATE.size
+        self.record_size = self.pellets_at + (self.tile_count + 7) // 8
+        # The pristine tiles as one big integer, and a mask keeping all but
+        # their pellets, for rebuilding the tiles with two big-int operations
+        self.pristine = int.from_bytes(maze.pristine, 'big')
+        self.keep = int.from_bytes(maze.pristine.translate(NOT_PELLETS), 'big')
+        self.buffer = bytearray(self.record_size * capacity)
+        self.view = memoryview(self.buffer)
+        self.clear()
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.newest = -1
+        self.count = 0
+
+    def _record(self, i):
+        start = i * self.record_size
+        return self.view[start:start + self.record_size]
+
+    def push(self):
+        # Save the game as it is now, over the oldest record when full
+        self.newest = (self.newest + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.save(self._record(self.newest))
+
+    def rewind(self, ticks=1):
+        # Go back to the record pushed ticks pushes ago, dropping it and
+        # everything newer; returns how far back it went
+        ticks = min(ticks, self.count)
+        if ticks:
+            self.newest = (self.newest - ticks + 1) % self.capacity
+            self.load(self._record(self.newest))
+            self.newest = (self.newest - 1) % self.capacity
+            self.count -= ticks
+        return ticks
+
+    def save(self, record):
+        game = self.game
+        pacman = game.pacman
+        maze = game.maze
+        eaten = pacman.last_eaten
+        HEADER.pack_into(record, 0, game.ticks, game.level, pacman.score, pacman.x, pacman.y,
+                         direction_code(pacman.direction), direction_code(pacman.next_direction),
+                         pacman.mouth_angle, pacman.mouth_change,
+                         -1 if eaten is None else eaten[1] * maze.width + eaten[0])
+        at = self.ghosts_at
+        for ghost in game.ghosts:
+            GHOST.pack_into(record, at, ghost.x, ghost.y, DIRECTIONS.index(ghost.direction),
+                            ghost.scared, ghost.scared_timer)
+            at += GHOST.size
+        RNG_STATE.pack_into(record, self.rng_at, *game.rng.getstate()[1])
+        pellets = int(maze.tiles.translate(PELLET_DIGITS), 2)
+        record[self.pellets_at:] = pellets.to_bytes(self.record_size - self.pellets_at, 'big')
+
+    def load(self, record):
+        game = self.game
+        pacman = game.pacman
+        maze = game.maze
+        (game.ticks, game.level, pacman.score, pacman.x, pacman.y, direction, next_direction,
+         pacman.mouth_angle, pacman.mouth_change, eaten) = HEADER.unpack_from(record, 0)
+        pacman.direction = DIRECTIONS[direction - 1] if direction else (0, 0)
+        pacman.next_direction = DIRECTIONS[next_direction - 1] if next_direction else (0, 0)
+        pacman.last_eaten = None if eaten < 0 else (eaten % maze.width, eaten // maze.width)
+
+        # Into the ghosts the game has now; each level makes new ones, but
+        # with the same homes and colors
+        at = self.ghosts_at
+        for ghost in game.ghosts:
+            ghost.x, ghost.y, direction, ghost.scared, ghost.scared_timer = GHOST.unpack_from(record, at)
+            ghost.direction = DIRECTIONS[direction]
+            at += GHOST.size
+        game.rng.setstate((3, RNG_STATE.unpack_from(record, self.rng_at), None))
+
+        pellets = int.from_bytes(record[self.pellets_at:], 'big')
+        mask = format(pellets, f'0{self.tile_count}b').encode().translate(DIGIT_MASKS)
+        tiles = self.pristine & (int.from_bytes(mask, 'big') | self.keep)
+        maze.tiles[:] = tiles.to_bytes(self.tile_count, 'big')
+        maze.pellets = bin(pellets).count('1')
@@ -0,0 +1,117 @@
+import math
+import pygame
+
+# Every look an actor can have is drawn once onto a small transparent
+# sprite and reused, so drawing an actor is a single blit.
+
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+YELLOW = (255, 255, 0)
+SCARED_BLUE = (0, 0, 255)
+CLEAR = (0, 0, 0, 0)
+
+# Screen angle of the mouth for each direction, in degrees
+MOUTH_ANGLES = {(1, 0): 0, (-1, 0): 180, (0, -1): 90, (0, 1): 270}
+
+
+class SpriteCache:
+    def __init__(self, block_size):
+        self.block_size = block_size
+        # Sprites are a little larger than a block so outlines are not cut off
+        self.pad = 2
+        self.sprites = {}
+
+    def _surface(self):
+        size = self.block_size + 2 * self.pad
+        return pygame.Surface((size, size), pygame.SRCALPHA)
+
+    def ghost(self, color, scared, direction):
+        # Scared ghosts all look the same, whatever their color or heading
+        key = ('scared',) if scared else ('ghost', color, direction)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.sprites[key] = self._draw_ghost(color, scared, direction)
+        return sprite
+
+    def pacman(self, direction, mouth_angle):
+        key = ('pacman', direction, mouth_angle if direction != (0, 0) else 0)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.sprites[key] = self._draw_pacman(direction, mouth_angle)
+        return sprite
+
+    def _draw_ghost(self, color, scared, direction):
+        surface = self._surface()
+        size = self.block_size
+        x = y = self.pad
+        color = SCARED_BLUE if scared else color  # Blue when scared
+
+        # Draw ghost body
+        pygame.draw.circle(surface, color,
+                         (int(x + size/2),
+                          int(y + size/2)),
+                         int(size/2))
+
+        # Draw ghost skirt
+        points = [
+            (x, y + size/2),
+            (x + size, y + size/2),
+            (x + size, y + size),
+            (x + size*3/4, y + size*3/4),
+            (x + size/2, y + size),
+            (x + size/4, y + size*3/4),
+            (x, y + size)
+        ]
+        pygame.draw.polygon(surface, color, points)
+
+        # Draw eyes
+        eye_radius = size/6
+        pupil_radius = size/8
+
+        # Left eye
+        pygame.draw.circle(surface, WHITE,
+                         (int(x + size/3),
+                          int(y + size/3)),
+                         int(eye_radius))
+        # Right eye
+        pygame.draw.circle(surface, WHITE,
+                         (int(x + size*2/3),
+                          int(y + size/3)),
+                         int(eye_radius))
+
+        if not scared:
+            # Pupils look where the ghost is heading
+            dx, dy = direction
+
+            # Left pupil
+            pygame.draw.circle(surface, BLACK,
+                             (int(x + size/3 + dx*2),
+                              int(y + size/3 + dy*2)),
+                             int(pupil_radius))
+            # Right pupil
+            pygame.draw.circle(surface, BLACK,
+                             (int(x + size*2/3 + dx*2),
+                              int(y + size/3 + dy*2)),
+                             int(pupil_radius))
+        return surface
+
+    def _draw_pacman(self, direction, mouth_angle):
+        surface = self._surface()
+        size = self.block_size
+        center = (self.pad + size//2, self.pad + size//2)
+        radius = size/2 - 2
+
+        # Draw Pac-Man as a circle with a mouth
+        pygame.draw.circle(surface, YELLOW, center, int(radius))
+
+        # Only show the mouth when moving and open
+        if direction != (0, 0) and mouth_angle > 0:
+            angle = math.radians(MOUTH_ANGLES[direction])
+            half = math.radians(mouth_angle)
+            point2 = (center[0] + radius * math.cos(angle - half),
+                      center[1] - radius * math.sin(angle - half))
+            point3 = (center[0] + radius * math.cos(angle + half),
+                      center[1] - radius * math.sin(angle + half))
+            # Cut the mouth out so the maze shows through
+            pygame.draw.polygon(surface, CLEAR, [center, point2, point3])
+        return surface
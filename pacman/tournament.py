@@ -0,0 +1,251 @@
+import json
+import os
+import random
+import struct
+import sys
+import time
+from collections import Counter, deque
+from multiprocessing import Pool
+from maze import DOT, POWER
+from mazegen import maze_named
+from navigation import DIRECTIONS
+from options import option
+from pacman_core import BLOCK_SIZE, PacmanGame
+
+# Plays many seeded headless games across a process pool, one worker per
+# core, for tournaments between controllers and for soak tests:
+#
+#   python tournament.py GAMES [--controller pellets|random] [--maze classic]
+#                        [--out DIR] [--workers N] [--batch 64] [--max-ticks N]
+#                        [--first-seed 0]
+#
+# --maze takes a maze name or file, or WxH[:SEED] for a generated maze.
+# Each task plays a batch of seeds on one reused game and sends back its
+# results as packed RESULT records, so IPC is a few bytes per game. The
+# main process appends every batch to DIR/results.bin as it arrives and
+# rewrites DIR/stats.json now and then. Running the same command again
+# resumes: seeds already in results.bin are skipped, and the statistics are
+# rebuilt from it. DIR/run.json holds the settings, which must match.
+
+# seed, score, ticks, level, cause
+RESULT = struct.Struct('<IIIHB')
+CAUSES = ['ghost', 'timeout']
+GHOST, TIMEOUT = range(len(CAUSES))
+STATS_INTERVAL = 1.0  # Seconds between stats.json rewrites
+TURN_TICKS = 30  # The random controller picks a new arrow this often
+
+
+class RandomController:
+    # A new random arrow every TURN_TICKS ticks
+    def __init__(self, game):
+        self.game = game
+        self.rng = random.Random()
+        self.direction = None
+
+    def reset(self):
+        self.rng.seed(self.game.seed)
+
+    def arrow(self):
+        if self.game.ticks % TURN_TICKS == 0:
+            self.direction = self.rng.choice(DIRECTIONS)
+        return self.direction
+
+
+class PelletController:
+    # At every tile center, heads along the shortest path to the nearest
+    # pellet that keeps off the tiles next to a ghost that is not scared
+    def __init__(self, game):
+        self.game = game
+
+    def reset(self):
+        pass
+
+    def arrow(self):
+        pacman = self.game.pacman
+        if pacman.x % BLOCK_SIZE or pacman.y % BLOCK_SIZE:
+            return None
+        maze = self.game.maze
+        nav = maze.nav
+        width = nav.width
+        danger = set()
+        for ghost in self.game.ghosts:
+            if not ghost.scared:
+                tile = (ghost.y + BLOCK_SIZE // 2) // BLOCK_SIZE * width + (ghost.x + BLOCK_SIZE // 2) // BLOCK_SIZE
+                danger.add(tile)
+                danger.update(neighbor for _, neighbor in nav.neighbors[tile])
+
+        # Breadth-first search remembering the first move of each path. A
+        # pellet under Pac-Man (his start tile can have one) is only eaten by
+        # coming back to it, so the search looks past it.
+        start = pacman.y // BLOCK_SIZE * width + pacman.x // BLOCK_SIZE
+        first = {start: None}
+        queue = deque([start])
+        tiles = maze.tiles
+        while queue:
+            tile = queue.popleft()
+            if (tiles[tile] == DOT or tiles[tile] == POWER) and tile != start:
+                return first[tile]
+            for direction, neighbor in nav.neighbors[tile]:
+                if neighbor not in first and neighbor not in danger:
+                    first[neighbor] = first[tile] or direction
+                    queue.append(neighbor)
+        return None
+
+
+CONTROLLERS = {'pellets': PelletController, 'random': RandomController}
+_mazes = {}  # Per worker, so each maze and its navigation are built once
+
+
+def play_batch(task):
+    # Worker: play every seed in the batch, returning their packed results
+    (maze_name, controller, max_ticks), seeds = task
+    if maze_name not in _mazes:
+        _mazes[maze_name] = maze_named(maze_name)
+    game = PacmanGame(_mazes[maze_name], seed=seeds[0])
+    driver = CONTROLLERS[controller](game)
+    out = bytearray()
+    for seed in seeds:
+        game.reset(seed)
+        driver.reset()
+        cause = TIMEOUT
+        while game.ticks < max_ticks:
+            if not game.step(driver.arrow()):
+                cause = GHOST
+                break
+        out += RESULT.pack(seed, game.pacman.score, game.ticks, game.level, cause)
+    return bytes(out)
+
+
+class Stats:
+    """Totals over every game played so far, for stats.json."""
+
+    def __init__(self):
+        self.games = 0
+        self.ticks = 0
+        self.causes = Counter()
+        self.scores = Counter()
+        self.levels = Counter()
+
+    def add(self, records):
+        # records: packed RESULT records
+        for seed, score, ticks, level, cause in RESULT.iter_unpack(records):
+            self.games += 1
+            self.ticks += ticks
+            self.causes[CAUSES[cause]] += 1
+            self.scores[score] += 1
+            self.levels[level] += 1
+
+    def to_dict(self):
+        return {'games': self.games, 'ticks': self.ticks, 'causes': dict(self.causes),
+                'score': summarize(self.scores), 'level': summarize(self.levels)}
+
+
+def summarize(counts):
+    # Mean, extremes and percentiles of values given as value -> count
+    total = sum(counts.values())
+    if not total:
+        return {}
+    values = sorted(counts)
+    result = {'mean': sum(v * n for v, n in counts.items()) / total,
+              'min': values[0], 'max': values[-1]}
+    for p in (50, 90, 99):
+        rank = min(total * p // 100, total - 1)
+        seen = 0
+        for value in values:
+            seen += counts[value]
+            if seen > rank:
+                result[f'p{p}'] = value
+                break
+    return result
+
+
+def write_json(path, data):
+    # Replace path in one step so a crash never leaves half a file
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def load_results(path):
+    # Whole records from an earlier run, dropping any half-written tail
+    if not os.path.exists(path):
+        return b''
+    with open(path, 'rb') as f:
+        data = f.read()
+    whole = len(data) - len(data) % RESULT.size
+    if whole != len(data):
+        with open(path, 'r+b') as f:
+            f.truncate(whole)
+    return data[:whole]
+
+
+def run(games, settings, out, first_seed=0, workers=None, batch=64):
+    # Play seeds first_seed .. first_seed + games - 1 not already in out
+    os.makedirs(out, exist_ok=True)
+    run_path = os.path.join(out, 'run.json')
+    config = dict(zip(('maze', 'controller', 'max_ticks'), settings))
+    if os.path.exists(run_path):
+        with open(run_path) as f:
+            if json.load(f) != config:
+                raise ValueError(f'{out} holds a run with other settings')
+    else:
+        write_json(run_path, config)
+
+    results_path = os.path.join(out, 'results.bin')
+    stats_path = os.path.join(out, 'stats.json')
+    done = load_results(results_path)
+    stats = Stats()
+    stats.add(done)
+    finished = {record[0] for record in RESULT.iter_unpack(done)}
+    seeds = [seed for seed in range(first_seed, first_seed + games) if seed not in finished]
+    tasks = [(settings, seeds[i:i + batch]) for i in range(0, len(seeds), batch)]
+    if finished:
+        print(f'resuming: {len(finished)} games already played, {len(seeds)} to go')
+
+    start = last_write = time.perf_counter()
+    played = ticks = 0
+    with open(results_path, 'ab') as results, Pool(workers) as pool:
+        for records in pool.imap_unordered(play_batch, tasks):
+            results.write(records)
+            results.flush()
+            stats.add(records)
+            played += len(records) // RESULT.size
+            ticks += sum(record[2] for record in RESULT.iter_unpack(records))
+            now = time.perf_counter()
+            if now - last_write >= STATS_INTERVAL:
+                write_json(stats_path, stats.to_dict())
+                last_write = now
+                print(f'{played}/{len(seeds)} games, {played / (now - start):.0f} games/s, '
+                      f'{ticks / (now - start):.0f} ticks/s')
+    write_json(stats_path, stats.to_dict())
+    elapsed = time.perf_counter() - start
+    if played:
+        print(f'{played} games, {ticks} ticks in {elapsed:.2f}s '
+              f'({played / elapsed:.0f} games/s, {ticks / elapsed:.0f} ticks/s)')
+    return stats
+
+
+def main():
+    controller, args = option(sys.argv[1:], '--controller', 'pellets')
+    maze, args = option(args, '--maze', 'classic')
+    out, args = option(args, '--out', 'tournament')
+    workers, args = option(args, '--workers')
+    batch, args = option(args, '--batch', '64')
+    max_ticks, args = option(args, '--max-ticks', '100000')
+    first_seed, args = option(args, '--first-seed', '0')
+    if len(args) != 1 or controller not in CONTROLLERS:
+        print('usage: tournament.py GAMES [--controller pellets|random] [--maze NAME|WxH[:SEED]]\n'
+              '                     [--out DIR] [--workers N] [--batch N] [--max-ticks N] [--first-seed N]')
+        sys.exit(2)
+    settings = (maze, controller, int(max_ticks))
+    try:
+        stats = run(int(args[0]), settings, out, int(first_seed),
+                    int(workers) if workers else None, int(batch))
+    except ValueError as e:
+        print(e)
+        sys.exit(2)
+    print(json.dumps(stats.to_dict(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
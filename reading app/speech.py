@@ -0,0 +1,262 @@
+import hashlib
+import io
+import math
+import os
+import re
+import struct
+import tempfile
+import time
+import wave
+from array import array
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import chain
+
+# Text to speech with an on-disk cache. Audio is stored under a hash of
+# (backend, lang, text), so any text is synthesized once per backend and
+# language, however many times and in however many documents it comes up.
+# A Synthesizer looks every text of a batch up in the cache and sends only
+# the misses to the backend, several at a time on a bounded thread pool
+# (the backends spend their time waiting on the network, not the CPU).
+#
+# Synthesizer.stream is the same for documents too long to wait for: it
+# yields the pieces' audio in order as each is ready while the next few are
+# synthesized, reading the text as it goes, so the first audio comes after
+# one short piece however long the document is, and memory stays flat.
+#
+# Backends have a name, a file extension, synthesize(text, lang) returning
+# the encoded audio, and chunk(data, first) giving the bytes to append for
+# it to a file streamed piece by piece:
+#   gtts     Google Translate's TTS through gTTS (needs network access)
+#   offline  a tone per character, written as WAV; no network, no extra
+#            packages, for tests and benchmarks
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'reading-app', 'tts')
+WORKERS = 8
+MAX_CHUNK = 200  # Characters per piece when splitting a document
+FIRST_CHUNK = 40  # The first piece of a stream only grows to this, to start sooner
+
+# A sentence up to its end mark and any closing quotes and spaces after it.
+# Western marks only count before a space, so "3.14" stays in one piece.
+SENTENCE = re.compile(r'.+?(?:[。！？…]+[”’"\')）]*|[.!?]+[”’"\')）]*(?=\s|$)|$)\s*')
+BREAKS = '，,；;、：: '  # Where a sentence too long for one piece is cut
+
+
+class GTTSBackend:
+    name = 'gtts'
+    extension = 'mp3'
+
+    def __init__(self):
+        from gtts import gTTS
+        self.gTTS = gTTS
+
+    def synthesize(self, text, lang):
+        out = io.BytesIO()
+        self.gTTS(text, lang=lang).write_to_fp(out)
+        return out.getvalue()
+
+    def chunk(self, data, first):
+        # MP3 frames can simply follow one another
+        return data
+
+
+class OfflineBackend:
+    """Stand-in that needs nothing but the standard library.
+
+    Each character becomes a short tone whose pitch comes from the
+    character, so different texts give different audio of a length that
+    grows with the text. latency seconds of sleep per call mimic a network
+    round trip when benchmarking.
+    """
+
+    name = 'offline'
+    extension = 'wav'
+    rate = 16000
+    char_seconds = 0.06
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.tones = {}  # Pitch -> samples of one character
+
+    def tone(self, freq):
+        if freq not in self.tones:
+            step = int(self.rate * self.char_seconds)
+            self.tones[freq] = array('h', (int(8000 * math.sin(2 * math.pi * freq * i / self.rate))
+                                           for i in range(step))).tobytes()
+        return self.tones[freq]
+
+    def synthesize(self, text, lang):
+        if self.latency:
+            time.sleep(self.latency)
+        samples = b''.join(self.tone(0 if char.isspace() else 200 + ord(char) % 600) for char in text)
+        out = io.BytesIO()
+        with wave.open(out, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(self.rate)
+            f.writeframes(samples)
+        return out.getvalue()
+
+    def chunk(self, data, first):
+        # One header for the whole stream, its sizes left at the maximum as
+        # they are not known yet, then only samples
+        if not first:
+            return data[44:]
+        header = bytearray(data[:44])
+        struct.pack_into('<I', header, 4, 0xFFFFFFFF)
+        struct.pack_into('<I', header, 40, 0xFFFFFFFF)
+        return bytes(header) + data[44:]
+
+
+BACKENDS = {'gtts': GTTSBackend, 'offline': OfflineBackend}
+
+
+class AudioCache:
+    """Content-addressed audio files under directory, two levels deep."""
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+
+    def key(self, text, lang, backend):
+        return hashlib.sha256(f'{backend.name}\0{lang}\0{text}'.encode('utf-8')).hexdigest()
+
+    def path(self, key, backend):
+        return os.path.join(self.directory, key[:2], f'{key}.{backend.extension}')
+
+    def get(self, key, backend):
+        # The cached file's path, or None
+        path = self.path(key, backend)
+        return path if os.path.exists(path) else None
+
+    def put(self, key, backend, data):
+        # Write to a temporary file first so readers never see half a file
+        path = self.path(key, backend)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return path
+
+
+class Synthesizer:
+    def __init__(self, backend=None, cache=None, workers=WORKERS):
+        self.backend = backend or GTTSBackend()
+        self.cache = cache or AudioCache()
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        self.pool.shutdown()
+
+    def _synthesize(self, key, text, lang):
+        return self.cache.put(key, self.backend, self.backend.synthesize(text, lang))
+
+    def _request(self, text, lang):
+        # A future for text's audio file, done already when it is cached
+        key = self.cache.key(text, lang, self.backend)
+        path = self.cache.get(key, self.backend)
+        if path is None:
+            self.misses += 1
+            return self.pool.submit(self._synthesize, key, text, lang)
+        self.hits += 1
+        future = Future()
+        future.set_result(path)
+        return future
+
+    def batch(self, texts, lang='zh-cn'):
+        # Audio file paths for texts, in order. Texts already cached cost a
+        # file lookup; the rest are synthesized concurrently, each distinct
+        # text only once.
+        backend = self.backend
+        keys = [self.cache.key(text, lang, backend) for text in texts]
+        paths = {}
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key in paths or key in pending:
+                continue
+            path = self.cache.get(key, backend)
+            if path is not None:
+                paths[key] = path
+                self.hits += 1
+            else:
+                pending[key] = self.pool.submit(self._synthesize, key, text, lang)
+                self.misses += 1
+        for key, future in pending.items():
+            paths[key] = future.result()
+        return [paths[key] for key in keys]
+
+    def document(self, text, lang='zh-cn'):
+        # Audio file paths for a whole document, piece by piece
+        return self.batch(split_document(text), lang)
+
+    def stream(self, pieces, lang='zh-cn', ahead=None):
+        # Audio file paths for pieces in order, each yielded as soon as it is
+        # ready, with up to ahead (default: one per worker) later pieces
+        # being synthesized meanwhile. pieces is only read that far ahead.
+        ahead = ahead or self.workers
+        pending = deque()
+        try:
+            for text in pieces:
+                pending.append(self._request(text, lang))
+                if len(pending) > ahead:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def iter_pieces(lines, max_chars=MAX_CHUNK, first_chars=None):
+    # Pieces of text from lines, never more than max_chars long: sentences
+    # of a paragraph (paragraphs end at blank lines) put together while they
+    # fit, the first piece only up to first_chars. Short pieces repeat
+    # across documents more often, which is what makes the cache pay. Only
+    # about a piece's worth of lines is held at a time.
+    limit = first_chars or max_chars
+    buffer = piece = ''
+    for line in chain(lines, ['']):
+        line = ' '.join(line.split())
+        if line:
+            buffer = f'{buffer} {line}' if buffer else line
+            if len(buffer) < 2 * max_chars:
+                continue
+        parts = [part for sentence in split_sentences(buffer) for part in cut(sentence, max_chars)]
+        # Within a paragraph the last sentence may go on in the next line
+        buffer = parts.pop().strip() if line and parts else ''
+        for part in parts:
+            # A long sentence would make a long first piece however few
+            # sentences it holds, so cut to the first piece's limit too
+            for part in cut(part, limit):
+                if piece and len(piece) + len(part) > limit:
+                    yield piece.strip()
+                    piece = ''
+                    limit = max_chars
+                piece += part
+        if not line and piece:
+            yield piece.strip()
+            piece = ''
+            limit = max_chars
+
+
+def split_document(text, max_chars=MAX_CHUNK):
+    return list(iter_pieces(text.splitlines(), max_chars))
+
+
+def split_sentences(text):
+    return SENTENCE.findall(text)
+
+
+def cut(sentence, max_chars):
+    # sentence in parts of at most max_chars, cut after a comma or the like
+    # where there is one
+    parts = []
+    while len(sentence) > max_chars:
+        i = max(sentence.rfind(mark, 0, max_chars) for mark in BREAKS) + 1 or max_chars
+        parts.append(sentence[:i])
+        sentence = sentence[i:]
+    parts.append(sentence)
+    return parts
@@ -0,0 +1,21 @@
+import unittest
+from speech import MAX_CHUNK, iter_pieces
+
+# python -m unittest test_speech
+
+
+class IterPiecesTest(unittest.TestCase):
+    def test_first_piece_stays_short_after_a_long_sentence(self):
+        lines = ['这是一个很长的句子，' * 40 + '结束。', '第二句。']
+        pieces = list(iter_pieces(lines, first_chars=40))
+        self.assertLessEqual(len(pieces[0]), 40)
+        self.assertTrue(all(len(piece) <= MAX_CHUNK for piece in pieces))
+        self.assertEqual(''.join(pieces).replace(' ', ''), ''.join(lines))
+
+    def test_first_piece_stays_short_without_breaks(self):
+        pieces = list(iter_pieces(['x' * 300], first_chars=40))
+        self.assertEqual([len(piece) for piece in pieces], [40, 160, 100])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,22 +1,94 @@
-from gtts import gTTS
 import os
+import shutil
+import sys
+import time
+from speech import BACKENDS, CACHE_DIR, FIRST_CHUNK, WORKERS, AudioCache, Synthesizer, iter_pieces
 
-try:
-    # 打印当前工作目录
-    print(f"当前工作目录: {os.getcwd()}")
-    
-    text = "你好，这是文字转语音的示例"
-    tts = gTTS(text, lang='zh-cn')
-    
-    # 尝试保存文件
-    output_path = "output.mp3"
-    tts.save(output_path)
-    
-    # 检查文件是否成功创建
-    if os.path.exists(output_path):
-        print(f"文件成功保存在: {os.path.abspath(output_path)}")
-    else:
-        print("文件未能成功创建")
-        
-except Exception as e:
-    print(f"发生错误: {str(e)}")
\ No newline at end of file
+# 不带参数时合成示例文字并保存为 output.mp3；带文件时批量合成整篇文档：
+#
+#   python text_to_speech.py [FILE...] [--backend gtts|offline] [--lang zh-cn]
+#                            [--workers 8] [--cache DIR] [--latency SECONDS]
+#                            [--stream OUT]
+#
+# 已经合成过的文字直接从缓存取，只合成缓存里没有的部分。--latency 给离线
+# 后端的每次请求加上延迟，用来模拟网络做基准测试。--stream 把文档逐句合成
+# 并按顺序追加到 OUT，第一句好了就能开始播放，不用等整篇合成完。
+
+
+def read_lines(paths):
+    # The lines of every file, one after the other, each file its own paragraph
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            yield from f
+        yield ''
+
+
+def stream(synthesizer, paths, out_path, lang):
+    # Append each piece's audio to out_path as soon as it is ready
+    backend = synthesizer.backend
+    start = time.perf_counter()
+    pieces = 0
+    with open(out_path, 'wb') as out:
+        for cached in synthesizer.stream(iter_pieces(read_lines(paths), first_chars=FIRST_CHUNK), lang):
+            with open(cached, 'rb') as audio:
+                out.write(backend.chunk(audio.read(), not pieces))
+            out.flush()
+            if not pieces:
+                print(f"首段音频用时 {time.perf_counter() - start:.2f}s")
+            pieces += 1
+    print(f"{pieces} 段，已写入 {os.path.abspath(out_path)}")
+
+
+def option(args, name, default=None):
+    # Pull "name VALUE" out of the command line: (VALUE or default, other args)
+    if name in args:
+        i = args.index(name)
+        if i + 1 < len(args):
+            return args[i + 1], args[:i] + args[i + 2:]
+    return default, args
+
+
+def main():
+    backend, args = option(sys.argv[1:], '--backend', 'gtts')
+    lang, args = option(args, '--lang', 'zh-cn')
+    workers, args = option(args, '--workers', str(WORKERS))
+    cache, args = option(args, '--cache', CACHE_DIR)
+    latency, args = option(args, '--latency')
+    out_path, args = option(args, '--stream')
+    if backend not in BACKENDS:
+        print(f'未知的后端: {backend}（可选: {", ".join(BACKENDS)}）')
+        sys.exit(2)
+
+    try:
+        # 打印当前工作目录
+        print(f"当前工作目录: {os.getcwd()}")
+        tts = BACKENDS[backend](float(latency)) if latency else BACKENDS[backend]()
+        synthesizer = Synthesizer(tts, AudioCache(cache), int(workers))
+        start = time.perf_counter()
+        if not args:
+            text = "你好，这是文字转语音的示例"
+            output_path = f"output.{tts.extension}"
+            shutil.copyfile(synthesizer.batch([text], lang)[0], output_path)
+            # 检查文件是否成功创建
+            if os.path.exists(output_path):
+                print(f"文件成功保存在: {os.path.abspath(output_path)}")
+            else:
+                print("文件未能成功创建")
+        elif out_path:
+            stream(synthesizer, args, out_path, lang)
+        else:
+            for path in args:
+                with open(path, encoding='utf-8') as f:
+                    pieces = synthesizer.document(f.read(), lang)
+                print(f"{path}: {len(pieces)} 段")
+                for piece in pieces:
+                    print(f"  {piece}")
+        synthesizer.close()
+        elapsed = time.perf_counter() - start
+        print(f"缓存命中 {synthesizer.hits}，新合成 {synthesizer.misses}，用时 {elapsed:.2f}s")
+    except Exception as e:
+        print(f"发生错误: {str(e)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+import heapq
+import sys
+import time
+from snake_core import SnakeGame
+
+# Drives a SnakeGame without keyboard input. On boards with a Hamiltonian
+# cycle the snake follows the cycle and takes shortcuts towards the food
+# while it is short; if the body is out of cycle order (or there is no
+# cycle) it falls back to A*, reusing the planned path until the food
+# moves or the path stops being safe.
+
+
+def hamiltonian_cycle(width, height):
+    # Cells (y * width + x) in cycle order, or None when both sides are odd
+    if width < 2 or height < 2:
+        return None
+    if height % 2 == 0:
+        cycle = list(range(width))
+        for y in range(1, height):
+            xs = range(width - 1, 0, -1) if y % 2 else range(1, width)
+            cycle.extend(y * width + x for x in xs)
+        cycle.extend(y * width for y in range(height - 1, 0, -1))
+        return cycle
+    if width % 2 == 0:
+        # Same walk on the transposed board
+        return [(c % height) * width + c // height
+                for c in hamiltonian_cycle(height, width)]
+    return None
+
+
+class Autopilot:
+    def __init__(self, game):
+        self.game = game
+        self.width = game.width
+        self.height = game.height
+        self.size = game.width * game.height
+        self.cycle = hamiltonian_cycle(game.width, game.height)
+        self.order = None
+        if self.cycle:
+            self.order = [0] * self.size
+            for i, cell in enumerate(self.cycle):
+                self.order[cell] = i
+        self.reset()
+
+    def reset(self):
+        # Call after the game is reset or steered by hand
+        self.expected = None
+        self.aligned = False
+        self.path = []
+        self.path_food = None
+
+    def drive(self):
+        direction = self.next_direction()
+        if direction is not None:
+            self.game.snake.direction = direction
+
+    def next_direction(self):
+        snake = self.game.snake
+        hx, hy = snake.get_head_position()
+        head = hy * self.width + hx
+        if head != self.expected:
+            # First move, a reset or someone else steered: check again
+            # whether the body can follow the cycle
+            self.aligned = self._in_cycle_order()
+            self.path = []
+        if self.game.food.position is None:
+            return None
+
+        nxt = self._cycle_move(head) if self.aligned else None
+        if nxt is None:
+            nxt = self._path_move(head)
+        if nxt is None:
+            nxt = self._safe_move(head)
+        if nxt is None:
+            self.expected = None
+            return None
+        self.expected = nxt
+        return (nxt % self.width - hx, nxt // self.width - hy)
+
+    def _dist(self, a, b):
+        # Steps from cell a forward along the cycle to cell b
+        return (self.order[b] - self.order[a]) % self.size
+
+    def _in_cycle_order(self):
+        if self.order is None:
+            return False
+        positions = self.game.snake.positions
+        span = 0
+        prev = None
+        for x, y in positions:
+            cell = y * self.width + x
+            if prev is not None:
+                step = self._dist(cell, prev)
+                if step == 0:
+                    return False
+                span += step
+            prev = cell
+        return span < self.size
+
+    def _neighbors(self, cell):
+        x, y = cell % self.width, cell // self.width
+        if x > 0:
+            yield cell - 1
+        if x < self.width - 1:
+            yield cell + 1
+        if y > 0:
+            yield cell - self.width
+        if y < self.height - 1:
+            yield cell + self.width
+
+    def _cycle_move(self, head):
+        snake = self.game.snake
+        occupied = snake.occupied
+        best = self.cycle[(self.order[head] + 1) % self.size]
+        if occupied[best]:
+            return None
+
+        # Shortcut towards the food while the snake is short. The target
+        # must stay in the free stretch ahead of the head, leaving room for
+        # the growth still to come, so the body keeps its cycle order.
+        if snake.length < self.size // 2:
+            fx, fy = self.game.food.position
+            food = fy * self.width + fx
+            tx, ty = snake.positions[-1]
+            to_tail = self._dist(head, ty * self.width + tx)
+            to_food = self._dist(head, food)
+            room = to_tail - snake.length // 4 - 3
+            best_dist = 1
+            for cell in self._neighbors(head):
+                d = self._dist(head, cell)
+                if best_dist < d <= to_food and d < room and not occupied[cell]:
+                    best, best_dist = cell, d
+        return best
+
+    def _path_move(self, head):
+        fx, fy = self.game.food.position
+        food = fy * self.width + fx
+        occupied = self.game.snake.occupied
+        # Reuse the last plan while it still leads to the same food
+        if self.path_food == food and self.path:
+            nxt = self.path[-1]
+            if not occupied[nxt] and nxt in self._neighbors(head):
+                return self.path.pop()
+        self.path = self._astar(head, food)
+        self.path_food = food
+        return self.path.pop() if self.path else None
+
+    def _astar(self, start, goal):
+        # Shortest path avoiding the body; returns cells goal-first so the
+        # next step can be popped off the end
+        occupied = self.game.snake.occupied
+        gx, gy = goal % self.width, goal // self.width
+        came_from = {start: None}
+        cost = {start: 0}
+        frontier = [(0, start)]
+        while frontier:
+            _, cell = heapq.heappop(frontier)
+            if cell == goal:
+                path = []
+                while cell != start:
+                    path.append(cell)
+                    cell = came_from[cell]
+                return path
+            for nxt in self._neighbors(cell):
+                if occupied[nxt] or nxt in cost and cost[nxt] <= cost[cell] + 1:
+                    continue
+                cost[nxt] = cost[cell] + 1
+                came_from[nxt] = cell
+                h = abs(nxt % self.width - gx) + abs(nxt // self.width - gy)
+                heapq.heappush(frontier, (cost[nxt] + h, nxt))
+        return []
+
+    def _safe_move(self, head):
+        # No route to the food: step where there is the most room around
+        occupied = self.game.snake.occupied
+        best, best_room = None, -1
+        for cell in self._neighbors(head):
+            if occupied[cell]:
+                continue
+            room = sum(1 for n in self._neighbors(cell) if not occupied[n])
+            if room > best_room:
+                best, best_room = cell, room
+        return best
+
+
+def main():
+    # Soak test: play seeded games to the end and report how they went
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    height = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    total_ticks = 0
+    total_time = 0.0
+    for seed in range(games):
+        game = SnakeGame(width, height, seed=seed)
+        autopilot = Autopilot(game)
+        start = time.perf_counter()
+        while True:
+            autopilot.drive()
+            if not game.step():
+                break
+        total_time += time.perf_counter() - start
+        total_ticks += game.ticks
+        result = 'won' if game.won else 'died'
+        print(f'seed {seed}: {result}, score {game.snake.score}, {game.ticks} ticks')
+    print(f'{total_ticks / total_time:.0f} ticks/s, '
+          f'{total_time / total_ticks * 1e6:.1f} us per tick')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+import json
+import os
+import platform
+import sys
+import time
+from array import array
+
+# Headless benchmarks for the hot paths: SnakeGame.step, SnakeRenderer.draw
+# and the many-snake arena. Everything runs under SDL's dummy video driver,
+# so no window is needed. Each benchmark times every call on its own and
+# reports the throughput plus percentiles of the per-call time:
+#
+#   python bench.py                      run everything and print a table
+#   python bench.py sim render           only benchmarks whose name contains a word
+#   python bench.py --quick              fewer calls, for a quick check
+#   python bench.py --json out.json      also save the results
+#   python bench.py --baseline out.json [--threshold 20]
+#                                        exit 1 if a throughput dropped more
+#                                        than threshold percent below baseline
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+from snake_core import SnakeGame
+from autopilot import Autopilot
+from options import option
+from snake_game import SnakeRenderer, WINDOW_WIDTH, WINDOW_HEIGHT, GAME_SPEED, FRAME_RATE
+from ui import GameUI
+
+PERCENTILES = (50, 90, 99)
+THRESHOLD = 20  # Percent of baseline throughput a run may lose
+REPEATS = 3  # Runs per benchmark, the fastest one counts
+FRAMES_PER_TICK = FRAME_RATE // GAME_SPEED
+
+
+def summarize(unit, times):
+    # Throughput and per-call percentiles of the seconds in times
+    ordered = sorted(times)
+    count = len(ordered)
+    result = {'unit': unit, 'count': count, 'rate': count / sum(ordered)}
+    for p in PERCENTILES:
+        result[f'p{p}_us'] = ordered[min(count * p // 100, count - 1)] * 1e6
+    result['max_us'] = ordered[-1] * 1e6
+    return result
+
+
+def bench_sim(width, height, ticks):
+    # game.step() with the autopilot steering (not timed), over and over
+    game = SnakeGame(width, height, seed=0)
+    autopilot = Autopilot(game)
+    clock = time.perf_counter
+    times = array('d')
+    for _ in range(ticks):
+        autopilot.drive()
+        start = clock()
+        alive = game.step()
+        times.append(clock() - start)
+        if not alive:
+            game.reset(seed=game.seed + 1)
+            autopilot.reset()
+    return summarize('ticks/s', times)
+
+
+def bench_render(width, height, frames, full):
+    # renderer.draw() at the real frames per tick, or repainting every frame
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    game = SnakeGame(width, height, seed=0)
+    autopilot = Autopilot(game)
+    renderer = SnakeRenderer(screen, game, GameUI(WINDOW_WIDTH, WINDOW_HEIGHT))
+    renderer.draw()
+    clock = time.perf_counter
+    times = array('d')
+    for frame in range(frames):
+        if frame % FRAMES_PER_TICK == 0:
+            autopilot.drive()
+            if not game.step():
+                game.reset(seed=game.seed + 1)
+                autopilot.reset()
+        if full:
+            renderer.invalidate()
+        alpha = (frame % FRAMES_PER_TICK + 1) / FRAMES_PER_TICK
+        start = clock()
+        renderer.draw(alpha)
+        times.append(clock() - start)
+    return summarize('frames/s', times)
+
+
+def bench_arena(num_snakes, ticks):
+    # SnakeArena.step() going straight, snakes respawning as they die
+    from snake_arena import SnakeArena
+    arena = SnakeArena(num_snakes, 256, 256, seed=0)
+    clock = time.perf_counter
+    times = array('d')
+    for _ in range(ticks):
+        start = clock()
+        arena.step()
+        times.append(clock() - start)
+    return summarize('ticks/s', times)
+
+
+def benchmarks(quick):
+    # (name, function, arguments) for every benchmark
+    scale = 10 if quick else 1
+    yield 'sim 20x15', bench_sim, (20, 15, 50000 // scale)
+    yield 'sim 40x30', bench_sim, (40, 30, 50000 // scale)
+    yield 'sim 200x150', bench_sim, (200, 150, 50000 // scale)
+    yield 'render 20x15', bench_render, (20, 15, 5000 // scale, False)
+    yield 'render 40x30', bench_render, (40, 30, 5000 // scale, False)
+    yield 'render-full 40x30', bench_render, (40, 30, 1000 // scale, True)
+    for num_snakes in (10, 100, 1000):
+        yield f'arena {num_snakes} snakes', bench_arena, (num_snakes, 2000 // scale)
+
+
+def run(quick=False, words=()):
+    # The fastest of REPEATS runs is the one least disturbed by the rest of
+    # the machine; quick runs go once
+    results = {}
+    for name, function, args in benchmarks(quick):
+        if words and not any(word in name for word in words):
+            continue
+        try:
+            runs = [function(*args) for _ in range(1 if quick else REPEATS)]
+            results[name] = max(runs, key=lambda result: result['rate'])
+        except ImportError as e:
+            print(f'{name}: skipped ({e})')
+            continue
+        print_result(name, results[name])
+    return results
+
+
+def print_result(name, result, baseline=None):
+    line = f'{name:<20} {result["rate"]:>12.0f} {result["unit"]:<9}'
+    line += ''.join(f' p{p} {result[f"p{p}_us"]:8.1f}us' for p in PERCENTILES)
+    if baseline is not None:
+        line += f'  {(result["rate"] / baseline["rate"] - 1) * 100:+6.1f}%'
+    print(line)
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    # Names of the benchmarks more than threshold percent slower than baseline
+    slower = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        print_result(name, result, old)
+        if result['rate'] < old['rate'] * (1 - threshold / 100):
+            slower.append(name)
+    return slower
+
+
+def main():
+    json_path, args = option(sys.argv[1:], '--json')
+    baseline_path, args = option(args, '--baseline')
+    threshold, args = option(args, '--threshold')
+    quick = '--quick' in args
+    words = [arg for arg in args if arg != '--quick']
+
+    pygame.init()
+    results = run(quick, words)
+    pygame.quit()
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump({'game': 'snake', 'quick': quick, 'python': platform.python_version(),
+                       'pygame': pygame.version.ver, 'machine': platform.machine(),
+                       'results': results}, f, indent=2)
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)['results']
+        threshold = float(threshold) if threshold else THRESHOLD
+        print(f'\ncompared with {baseline_path}:')
+        slower = compare(results, baseline, threshold)
+        if slower:
+            print(f'{len(slower)} slower than baseline by more than {threshold}%: {", ".join(slower)}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
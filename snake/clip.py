@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+
+# Renders a replay or an autopilot game offscreen into a video clip, as fast
+# as it can draw rather than in real time:
+#
+#   python clip.py REPLAY OUT [--fps 30] [--speed 1] [--queue 16]
+#   python clip.py --seed N OUT [--fps 30] [--speed 1] [--max-ticks 10000]
+#
+# OUT is a directory for BMP frames or a video file (out.mp4) made by
+# piping the frames into ffmpeg. --speed plays the game faster or slower
+# than the 15 ticks a second it runs at when played. Frames go through
+# capture.FrameCapture, so drawing the next frame overlaps writing the last.
+#
+# Drawing never waits on encoding as such, only on a full queue. ffmpeg
+# usually keeps up; BMP frames are 1.9 MB each at 800x600, so with a
+# directory OUT the disk sets the pace and drawing spends most of its time
+# waiting for it (the summary line says how long). A bigger --queue only
+# absorbs bursts, it cannot make a slow disk faster.
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+from snake_core import SnakeGame
+from autopilot import Autopilot
+from capture import FrameCapture, QUEUE_FRAMES, open_sink
+from replay import Replay
+from snake_game import SnakeRenderer, WINDOW_WIDTH, WINDOW_HEIGHT, BLOCK_SIZE, GAME_SPEED
+from options import option
+from ui import GameUI
+
+FPS = 30
+END_SECONDS = 2  # How long the game over screen stays in the clip
+MAX_TICKS = 10000  # Autopilot games can go on for a very long time
+USAGE = '''usage: clip.py REPLAY OUT | --seed N OUT  [--fps N] [--speed N] [--queue N] [--max-ticks N]
+
+OUT is a directory for BMP frames, or a video file encoded by ffmpeg.
+BMP frames are written as fast as the disk allows; when it is slower than
+drawing, drawing waits for it once --queue frames are pending.'''
+
+
+def render(game, replay, out, fps=FPS, speed=1.0, max_ticks=MAX_TICKS, frames=QUEUE_FRAMES):
+    # Draw every frame of the game into out, returning the FrameCapture
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    game_ui = GameUI(WINDOW_WIDTH, WINDOW_HEIGHT)
+    renderer = SnakeRenderer(screen, game, game_ui)
+    capture = FrameCapture(screen, open_sink(out, screen, fps), frames)
+    autopilot = None if replay else Autopilot(game)
+    if replay:
+        max_ticks = min(max_ticks, replay.ticks)
+    ticks_per_frame = GAME_SPEED * speed / fps
+    clock = 0.0  # Game time in ticks
+    alive = True
+    i = 0
+    try:
+        while True:
+            # Run the ticks due by this frame, then draw between the last two
+            while alive and game.ticks < int(clock):
+                if replay:
+                    i = replay.steer(game, game.ticks, i)
+                else:
+                    autopilot.drive()
+                alive = game.step() and game.ticks < max_ticks
+            if not alive:
+                break
+            renderer.draw(clock - int(clock))
+            capture.grab()
+            clock += ticks_per_frame
+        game_ui.show_game_over_screen(screen, game.snake.score)
+        for _ in range(int(END_SECONDS * fps)):
+            capture.grab()
+    finally:
+        capture.close()
+    return capture
+
+
+def main():
+    fps, args = option(sys.argv[1:], '--fps', str(FPS))
+    speed, args = option(args, '--speed', '1')
+    frames, args = option(args, '--queue', str(QUEUE_FRAMES))
+    seed, args = option(args, '--seed')
+    max_ticks, args = option(args, '--max-ticks', str(MAX_TICKS))
+    if '--help' in args or len(args) != (1 if seed else 2):
+        print(USAGE)
+        sys.exit(0 if '--help' in args else 2)
+    if seed:
+        replay = None
+        game = SnakeGame(WINDOW_WIDTH // BLOCK_SIZE, WINDOW_HEIGHT // BLOCK_SIZE, seed=int(seed))
+    else:
+        replay = Replay.load(args.pop(0))
+        game = replay.new_game()
+
+    pygame.init()
+    start = time.perf_counter()
+    try:
+        capture = render(game, replay, args[0], int(fps), float(speed), int(max_ticks), int(frames))
+    except OSError as e:
+        print(f'could not write {args[0]}: {e}')
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    seconds = capture.count / int(fps)
+    print(f'{capture.count} frames ({seconds:.1f}s of video) in {elapsed:.2f}s, '
+          f'{seconds / elapsed:.1f}x real time, {capture.stalled:.2f}s waiting for the encoder')
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+import os
+import sys
+import time
+from snake_core import SnakeGame, DIRECTIONS
+from options import option
+
+# Replays: a game's seed plus the ticks where the snake's direction changed.
+# Everything else follows from the seeded rules, so a whole game fits in a
+# few hundred bytes. All numbers are unsigned LEB128 varints:
+#
+#   b'SNKR' version seed width height ticks score count
+#   count x (ticks since the previous change << 2 | direction index)
+#
+# ticks and score are how the recorded game ended, so playing a replay
+# back also checks that the rules still behave the same.
+
+MAGIC = b'SNKR'
+VERSION = 1
+
+
+def write_varint(out, n):
+    while n > 0x7f:
+        out.append(n & 0x7f | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def read_varint(data, pos):
+    n = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+
+class Recorder:
+    def __init__(self, game):
+        # Start right after the game is created or reset
+        self.game = game
+        self.seed = game.seed
+        self.direction = game.snake.direction
+        self.events = bytearray()
+        self.count = 0
+        self.ticks = 0
+        self.last_change = 0
+
+    def record(self):
+        # Call just before every game.step()
+        direction = self.game.snake.direction
+        if direction != self.direction:
+            write_varint(self.events, (self.ticks - self.last_change) << 2 | DIRECTIONS.index(direction))
+            self.direction = direction
+            self.last_change = self.ticks
+            self.count += 1
+        self.ticks += 1
+
+    def checkpoint(self):
+        # Where the log is now, to go back to after a rewind
+        return (self.ticks, self.last_change, self.count, len(self.events), self.direction)
+
+    def rollback(self, checkpoint):
+        self.ticks, self.last_change, self.count, size, self.direction = checkpoint
+        del self.events[size:]
+
+    def to_bytes(self):
+        out = bytearray(MAGIC)
+        game = self.game
+        for n in (VERSION, self.seed, game.width, game.height, self.ticks, game.snake.score, self.count):
+            write_varint(out, n)
+        return bytes(out + self.events)
+
+    def save(self, directory):
+        # Write snake-<seed>.rpl into directory, returning its path
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'snake-{self.seed}.rpl')
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+        return path
+
+
+class Replay:
+    def __init__(self, seed, width, height, ticks, score, changes):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.ticks = ticks
+        self.score = score
+        self.changes = changes  # (tick, direction) pairs
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:4] != MAGIC:
+            raise ValueError('not a snake replay')
+        pos = 4
+        header = []
+        for _ in range(7):
+            n, pos = read_varint(data, pos)
+            header.append(n)
+        version, seed, width, height, ticks, score, count = header
+        if version != VERSION:
+            raise ValueError(f'unsupported replay version {version}')
+        changes = []
+        tick = 0
+        for _ in range(count):
+            n, pos = read_varint(data, pos)
+            tick += n >> 2
+            changes.append((tick, DIRECTIONS[n & 3]))
+        return cls(seed, width, height, ticks, score, changes)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+    def new_game(self):
+        return SnakeGame(self.width, self.height, seed=self.seed)
+
+    def steer(self, game, tick, i):
+        # Apply the direction change due at tick; returns the next change index
+        changes = self.changes
+        while i < len(changes) and changes[i][0] == tick:
+            game.snake.direction = changes[i][1]
+            i += 1
+        return i
+
+    def play(self):
+        # Run the whole game headless, as fast as possible
+        game = self.new_game()
+        i = 0
+        for tick in range(self.ticks):
+            i = self.steer(game, tick, i)
+            if not game.step():
+                break
+        return game
+
+    def matches(self, game):
+        # Did a played back game end like the recorded one?
+        return game.ticks + (0 if game.won else 1) == self.ticks and game.snake.score == self.score
+
+
+def watch(replay, tick_rate):
+    # Show a replay in a window at tick_rate ticks per second
+    import pygame
+    from loop import FixedStepLoop
+    from snake_game import SnakeRenderer, WINDOW_WIDTH, WINDOW_HEIGHT, FRAME_RATE
+    from ui import GameUI
+
+    pygame.init()
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    pygame.display.set_caption(f'Snake Replay - seed {replay.seed}')
+    game_ui = GameUI(WINDOW_WIDTH, WINDOW_HEIGHT)
+    game = replay.new_game()
+    renderer = SnakeRenderer(screen, game, game_ui)
+    loop = FixedStepLoop(tick_rate, FRAME_RATE)
+    tick = i = 0
+    while True:
+        events = [pygame.event.wait()] if game_ui.game_over else pygame.event.get()
+        for event in events:
+            if event.type == pygame.QUIT or game_ui.game_over and game_ui.handle_event(event):
+                pygame.quit()
+                return game
+            elif event.type == pygame.VIDEOEXPOSE:
+                if game_ui.game_over:
+                    game_ui.draw_game_over(screen)
+                renderer.invalidate()
+        if game_ui.game_over:
+            continue
+        for _ in range(loop.advance()):
+            i = replay.steer(game, tick, i)
+            tick += 1
+            if not game.step() or tick >= replay.ticks:
+                game_ui.show_game_over_screen(screen, game.snake.score)
+                break
+        if not game_ui.game_over:
+            renderer.draw(loop.alpha)
+            loop.wait()
+
+
+def record_option(args):
+    # Pull "--record DIR" out of the command line: (DIR or None, other args)
+    return option(args, '--record')
+
+
+def replay_paths(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith('.rpl'):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def main():
+    # python replay.py check FILE_OR_DIR...   re-run replays headless
+    # python replay.py watch FILE [TICKS_PER_SECOND]
+    if len(sys.argv) < 3 or sys.argv[1] not in ('check', 'watch'):
+        print('usage: replay.py check FILE_OR_DIR... | watch FILE [TICKS_PER_SECOND]')
+        sys.exit(2)
+    if sys.argv[1] == 'watch':
+        rate = float(sys.argv[3]) if len(sys.argv) > 3 else 15
+        watch(Replay.load(sys.argv[2]), rate)
+        return
+
+    games = ticks = failed = 0
+    start = time.perf_counter()
+    for path in replay_paths(sys.argv[2:]):
+        replay = Replay.load(path)
+        game = replay.play()
+        games += 1
+        ticks += replay.ticks
+        if not replay.matches(game):
+            failed += 1
+            print(f'{path}: expected score {replay.score} after {replay.ticks} ticks, '
+                  f'got {game.snake.score} after {game.ticks}')
+    elapsed = time.perf_counter() - start
+    print(f'{games} replays, {failed} failed, {ticks} ticks in {elapsed:.2f}s')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
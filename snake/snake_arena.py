@@ -0,0 +1,146 @@
+import numpy as np
+
+from snake_core import DIRECTIONS
+from snake_batch import DX, DY, OPPOSITE
+
+# Many snakes and many food items on one big board. Every cell lives in a
+# single uint16 grid holding 0 when empty, FOOD for food, or the snake's
+# id + 1, so all collisions in a tick are resolved with a few array lookups
+# and the per-tick cost grows with the number of snakes, not the board.
+
+FOOD = np.iinfo(np.uint16).max
+MAX_SNAKES = FOOD - 1
+
+
+class SnakeArena:
+    def __init__(self, num_snakes, width=1000, height=1000, num_food=None,
+                 max_length=1024, seed=None):
+        if not 0 < num_snakes <= MAX_SNAKES:
+            raise ValueError(f'num_snakes must be between 1 and {MAX_SNAKES}')
+        self.num_snakes = num_snakes
+        self.width = width
+        self.height = height
+        self.num_food = num_snakes if num_food is None else num_food
+        # Snakes stop growing at max_length; the ring buffer has one spare
+        # slot for the new head before the tail is dropped
+        self.max_length = max_length
+        self._cap = max_length + 1
+        self.rng = np.random.default_rng(seed)
+        self._ids = np.arange(num_snakes)
+
+        self.grid = np.zeros(width * height, dtype=np.uint16)
+        # Ring buffer of body cells per snake; tail at tail_ptr, head at head_ptr
+        self.body = np.zeros((num_snakes, self._cap), dtype=np.int64)
+        self.head_ptr = np.zeros(num_snakes, dtype=np.int64)
+        self.tail_ptr = np.zeros(num_snakes, dtype=np.int64)
+        self.count = np.zeros(num_snakes, dtype=np.int64)
+
+        self.head = np.zeros(num_snakes, dtype=np.int64)
+        self.direction = np.zeros(num_snakes, dtype=np.int64)
+        self.length = np.zeros(num_snakes, dtype=np.int64)
+        self.score = np.zeros(num_snakes, dtype=np.int64)
+        self.deaths = np.zeros(num_snakes, dtype=np.int64)
+        self.ticks = 0
+
+        self._spawn(self._ids)
+        self.grid[self._empty_cells(self.num_food)] = FOOD
+
+    def _empty_cells(self, k):
+        # k distinct empty cells, found by sampling; the arena is expected
+        # to stay mostly empty so this rarely needs more than one round
+        cells = np.empty(0, dtype=np.int64)
+        for _ in range(64):
+            if len(cells) == k:
+                return cells
+            pick = self.rng.integers(0, len(self.grid), k - len(cells))
+            pick = pick[self.grid[pick] == 0]
+            cells = np.unique(np.concatenate([cells, pick]))
+            cells = self.rng.permutation(cells)[:k]
+        if len(cells) < k:
+            raise RuntimeError('arena is too full to place new cells')
+        return cells
+
+    def _spawn(self, ids):
+        if not len(ids):
+            return
+        cells = self._empty_cells(len(ids))
+        self.grid[cells] = ids + 1
+        self.body[ids, 0] = cells
+        self.head_ptr[ids] = 0
+        self.tail_ptr[ids] = 0
+        self.count[ids] = 1
+        self.head[ids] = cells
+        self.direction[ids] = self.rng.integers(0, len(DIRECTIONS), len(ids))
+        self.length[ids] = 1
+        self.score[ids] = 0
+
+    def _clear(self, ids):
+        # Remove whole bodies from the grid
+        if not len(ids):
+            return
+        offset = np.arange(self.count[ids].max())
+        inside = offset[None, :] < self.count[ids, None]
+        slots = (self.tail_ptr[ids, None] + offset[None, :]) % self._cap
+        cells = self.body[ids[:, None], slots][inside]
+        self.grid[cells] = 0
+
+    def step(self, actions=None):
+        """Advance every snake one tick.
+
+        actions holds an index into DIRECTIONS per snake, or -1 to keep
+        going straight. Every collision is judged against the board as it
+        was at the start of the tick: walls, any body (tails included) and
+        other heads entering the same cell kill. Dead snakes are cleared
+        and respawn on a random empty cell. Returns a mask of the snakes
+        that died this tick.
+        """
+        ids = self._ids
+        width, height = self.width, self.height
+        if actions is not None:
+            actions = np.asarray(actions)
+            turn = (actions >= 0) & (actions != OPPOSITE[self.direction])
+            self.direction = np.where(turn, actions, self.direction)
+
+        x = self.head % width + DX[self.direction]
+        y = self.head // width + DY[self.direction]
+        dead = (x < 0) | (x >= width) | (y < 0) | (y >= height)
+        new = np.where(dead, 0, y * width + x)
+        target = self.grid[new]
+        dead |= (target != 0) & (target != FOOD)
+
+        # Head-to-head: every snake entering a shared cell dies
+        moving = ids[~dead]
+        _, inverse, counts = np.unique(new[moving], return_inverse=True,
+                                       return_counts=True)
+        dead[moving[counts[inverse] > 1]] = True
+
+        self._clear(ids[dead])
+
+        # Move the survivors
+        alive = ids[~dead]
+        cell = new[alive]
+        ate = self.grid[cell] == FOOD
+        ptr = (self.head_ptr[alive] + 1) % self._cap
+        self.head_ptr[alive] = ptr
+        self.body[alive, ptr] = cell
+        self.grid[cell] = alive + 1
+        self.count[alive] += 1
+        self.head[alive] = cell
+
+        # Drop the tail where the snake did not grow
+        shrink = alive[self.count[alive] > self.length[alive]]
+        self.grid[self.body[shrink, self.tail_ptr[shrink]]] = 0
+        self.tail_ptr[shrink] = (self.tail_ptr[shrink] + 1) % self._cap
+        self.count[shrink] -= 1
+
+        # Eat and put the same number of food items back
+        eaters = alive[ate]
+        self.length[eaters] = np.minimum(self.length[eaters] + 1, self.max_length)
+        self.score[eaters] += 1
+        self.grid[self._empty_cells(len(eaters))] = FOOD
+
+        died = ids[dead]
+        self.deaths[died] += 1
+        self._spawn(died)
+        self.ticks += 1
+        return dead
@@ -0,0 +1,150 @@
+import numpy as np
+
+from snake_core import DIRECTIONS, BOARD_WIDTH, BOARD_HEIGHT
+
+# Many snake games stepped together with NumPy. Each board follows the same
+# rules as SnakeGame in snake_core: turns straight back are ignored, walls
+# and the body (tail included) kill, and eating grows the snake by one on
+# the next tick. Boards that finish are reset at the end of the step.
+
+DX = np.array([d[0] for d in DIRECTIONS], dtype=np.int64)
+DY = np.array([d[1] for d in DIRECTIONS], dtype=np.int64)
+# Index of the opposite direction for each entry of DIRECTIONS
+OPPOSITE = np.array([DIRECTIONS.index((-d[0], -d[1])) for d in DIRECTIONS])
+
+
+class SnakeBatch:
+    def __init__(self, num_boards, width=BOARD_WIDTH, height=BOARD_HEIGHT, seed=None):
+        self.num_boards = num_boards
+        self.width = width
+        self.height = height
+        self.rng = np.random.default_rng(seed)
+        cells = width * height
+        cell_type = np.int16 if cells <= np.iinfo(np.int16).max else np.int32
+        self._rows = np.arange(num_boards)
+
+        # Occupancy of each cell, 1 where a body segment sits
+        self.grid = np.zeros((num_boards, cells), dtype=np.uint8)
+        # Ring buffer of body cells; the tail is at tail_ptr, the head at head_ptr
+        self.body = np.zeros((num_boards, cells), dtype=cell_type)
+        self.head_ptr = np.zeros(num_boards, dtype=np.int64)
+        self.tail_ptr = np.zeros(num_boards, dtype=np.int64)
+        self.count = np.zeros(num_boards, dtype=np.int64)
+        # Flat views so per-board lookups are a single 1-D gather/scatter
+        self._grid = self.grid.reshape(-1)
+        self._body = self.body.reshape(-1)
+
+        self.head = np.zeros(num_boards, dtype=np.int64)
+        self.direction = np.zeros(num_boards, dtype=np.int64)
+        self.length = np.zeros(num_boards, dtype=np.int64)
+        self.food = np.zeros(num_boards, dtype=np.int64)
+        self.score = np.zeros(num_boards, dtype=np.int64)
+        self.ticks = np.zeros(num_boards, dtype=np.int64)
+        # Filled in for the boards that finished on the last step
+        self.final_score = np.zeros(num_boards, dtype=np.int64)
+        self.won = np.zeros(num_boards, dtype=bool)
+
+        self.reset()
+
+    def reset(self, rows=None):
+        if rows is None:
+            rows = self._rows
+        if not len(rows):
+            return
+        self.grid[rows] = 0
+        center = (self.height // 2) * self.width + self.width // 2
+        self.body[rows, 0] = center
+        self.head_ptr[rows] = 0
+        self.tail_ptr[rows] = 0
+        self.count[rows] = 1
+        self.grid[rows, center] = 1
+
+        self.head[rows] = center
+        self.direction[rows] = self.rng.integers(0, len(DIRECTIONS), len(rows))
+        self.length[rows] = 1
+        self.score[rows] = 0
+        self.ticks[rows] = 0
+        self._place_food(rows)
+
+    def _place_food(self, rows, tries=4):
+        # Uniform pick among the free cells of each board. Keeping a free
+        # cell index per board costs two scatters every tick, so sample
+        # blindly a few times and only fall back to counting the free cells
+        # on the (nearly full) boards that keep missing.
+        cap = self.grid.shape[1]
+        for _ in range(tries):
+            if not len(rows):
+                return
+            pick = self.rng.integers(0, cap, len(rows))
+            hit = self._grid[rows * cap + pick] == 0
+            self.food[rows[hit]] = pick[hit]
+            rows = rows[~hit]
+        if len(rows):
+            empty = self.grid[rows] == 0
+            nth = (self.rng.random(len(rows)) * (cap - self.count[rows])).astype(np.int64)
+            self.food[rows] = np.argmax(np.cumsum(empty, axis=1) > nth[:, None], axis=1)
+
+    def step(self, actions=None):
+        """Advance every board one tick.
+
+        actions holds an index into DIRECTIONS per board, or -1 to keep
+        going straight. Returns (eaten, done) boolean arrays; score and
+        won for boards that finished are in final_score and won.
+        """
+        rows = self._rows
+        width, height = self.width, self.height
+        cap = self.grid.shape[1]
+        if actions is not None:
+            actions = np.asarray(actions)
+            turn = (actions >= 0) & (actions != OPPOSITE[self.direction])
+            self.direction = np.where(turn, actions, self.direction)
+
+        x = self.head % width + DX[self.direction]
+        y = self.head // width + DY[self.direction]
+        wall = (x < 0) | (x >= width) | (y < 0) | (y >= height)
+        new = np.where(wall, 0, y * width + x)
+        done = wall | (self._grid[rows * cap + new] != 0)
+
+        # Move the head of every surviving snake
+        alive = rows[~done]
+        cell = new[alive]
+        base = alive * cap
+        ptr = (self.head_ptr[alive] + 1) % cap
+        self.head_ptr[alive] = ptr
+        self._body[base + ptr] = cell
+        self._grid[base + cell] = 1
+        self.count[alive] += 1
+        self.head[alive] = cell
+        self.ticks[alive] += 1
+
+        # Drop the tail where the snake did not grow
+        shrink = alive[self.count[alive] > self.length[alive]]
+        base = shrink * cap
+        tail = self._body[base + self.tail_ptr[shrink]].astype(np.int64)
+        self._grid[base + tail] = 0
+        self.tail_ptr[shrink] = (self.tail_ptr[shrink] + 1) % cap
+        self.count[shrink] -= 1
+
+        # Check if food is eaten
+        eaten = np.zeros(self.num_boards, dtype=bool)
+        eaten[alive] = cell == self.food[alive]
+        ate = rows[eaten]
+        self.length[ate] += 1
+        self.score[ate] += 1
+        full = self.count[ate] == cap
+        self._place_food(ate[~full])
+
+        self.won[:] = False
+        self.won[ate[full]] = True
+        done |= self.won
+        finished = rows[done]
+        self.final_score[finished] = self.score[finished]
+        self.reset(finished)
+        return eaten, done
+
+    def positions(self, board):
+        # Body cells of one board as (x, y), head first like Snake.positions
+        cap = self.body.shape[1]
+        ptr = self.head_ptr[board]
+        cells = self.body[board, (ptr - np.arange(self.count[board])) % cap]
+        return [(int(c) % self.width, int(c) // self.width) for c in cells]
@@ -0,0 +1,201 @@
+import random
+from array import array
+from collections import deque
+
+# Headless snake rules. Nothing in here touches pygame, so the game can be
+# stepped in tests, worker processes or servers without a display.
+
+# Define directions
+UP = (0, -1)
+DOWN = (0, 1)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+DIRECTIONS = [UP, DOWN, LEFT, RIGHT]
+
+# Default board size in cells (800x600 window with 20px blocks)
+BOARD_WIDTH = 40
+BOARD_HEIGHT = 30
+
+
+class FreeCells:
+    # Every empty cell in a swap-remove array, plus the slot each cell sits
+    # at (-1 when taken), so add, remove and a uniform pick are all O(1)
+    __slots__ = ('cells', 'slot')
+
+    def __init__(self, size):
+        self.cells = array('i', range(size))
+        self.slot = array('i', range(size))
+
+    def __len__(self):
+        return len(self.cells)
+
+    def remove(self, cell):
+        i = self.slot[cell]
+        last = self.cells.pop()
+        if last != cell:
+            self.cells[i] = last
+            self.slot[last] = i
+        self.slot[cell] = -1
+
+    def add(self, cell):
+        self.slot[cell] = len(self.cells)
+        self.cells.append(cell)
+
+    def choice(self, rng):
+        return self.cells[rng.randrange(len(self.cells))]
+
+
+class Snake:
+    __slots__ = ('width', 'height', 'rng', 'occupied', 'free', 'positions', 'length', 'direction', 'score')
+
+    def __init__(self, width=BOARD_WIDTH, height=BOARD_HEIGHT, rng=None, occupied=None, free=None,
+                 head=None, direction=None):
+        # Snakes sharing a board share its occupied grid and FreeCells, so
+        # they collide with each other like with themselves
+        self.width = width
+        self.height = height
+        self.rng = rng or random.Random()
+        self.occupied = occupied
+        self.free = free
+        self.positions = deque()
+        self.reset(head, direction)
+
+    def get_head_position(self):
+        return self.positions[0]
+
+    def turn(self, direction):
+        # Ignore turns straight back into the neck. With a neck, check
+        # against the way the head last moved rather than a turn still
+        # pending, or two quick presses add up to a reversal.
+        if len(self.positions) > 1:
+            (hx, hy), (nx, ny) = self.positions[0], self.positions[1]
+            back = (nx - hx, ny - hy)
+        else:
+            back = (-self.direction[0], -self.direction[1])
+        if direction != back:
+            self.direction = direction
+
+    def update(self):
+        cur = self.get_head_position()
+        x, y = self.direction
+        new = (cur[0] + x, cur[1] + y)
+
+        # Check if hit wall
+        if not (0 <= new[0] < self.width and 0 <= new[1] < self.height):
+            return False
+
+        # Check if hit itself. Of the first three segments only the neck can
+        # sit next to the head, so discounting it keeps the old rule of
+        # ignoring positions[:3] with a single grid lookup.
+        cell = new[1] * self.width + new[0]
+        hits = self.occupied[cell]
+        if hits and len(self.positions) > 1 and self.positions[1] == new:
+            hits -= 1
+        if hits:
+            return False
+
+        self.positions.appendleft(new)
+        if not self.occupied[cell]:
+            self.free.remove(cell)
+        self.occupied[cell] += 1
+        if len(self.positions) > self.length:
+            tx, ty = self.positions.pop()
+            tail = ty * self.width + tx
+            self.occupied[tail] -= 1
+            if not self.occupied[tail]:
+                self.free.add(tail)
+        return True
+
+    def reset(self, head=None, direction=None):
+        # Back to length 1 on head (the middle of the board by default)
+        self.length = 1
+        if head is None:
+            head = (self.width // 2, self.height // 2)
+        # Number of body segments on each cell, indexed by y * width + x.
+        # Clear only the old body so resets stay cheap on huge boards.
+        if self.occupied is None:
+            self.occupied = bytearray(self.width * self.height)
+            self.free = FreeCells(self.width * self.height)
+        else:
+            self.remove()
+        self.positions = deque([head])
+        cell = head[1] * self.width + head[0]
+        self.occupied[cell] = 1
+        self.free.remove(cell)
+        self.direction = direction or self.rng.choice(DIRECTIONS)
+        self.score = 0
+
+    def remove(self):
+        # Take the body off the board
+        for x, y in self.positions:
+            cell = y * self.width + x
+            if self.occupied[cell]:
+                self.occupied[cell] = 0
+                self.free.add(cell)
+        self.positions = deque()
+
+
+class Food:
+    __slots__ = ('width', 'height', 'rng', 'free', 'position')
+
+    def __init__(self, width=BOARD_WIDTH, height=BOARD_HEIGHT, rng=None, free=None):
+        self.width = width
+        self.height = height
+        self.rng = rng or random.Random()
+        # Optional FreeCells index; without one food may land on the snake
+        self.free = free
+        self.position = (0, 0)
+        self.randomize_position()
+
+    def randomize_position(self):
+        # Returns False when there is no empty cell left for the food
+        if self.free is None:
+            self.position = (self.rng.randint(0, self.width - 1),
+                             self.rng.randint(0, self.height - 1))
+            return True
+        if not self.free:
+            self.position = None
+            return False
+        cell = self.free.choice(self.rng)
+        self.position = (cell % self.width, cell // self.width)
+        return True
+
+
+class SnakeGame:
+    """One snake and one food item on a width x height board of cells."""
+
+    def __init__(self, width=BOARD_WIDTH, height=BOARD_HEIGHT, seed=None):
+        self.width = width
+        self.height = height
+        # Every game gets a seed, so any game can be replayed
+        self.seed = seed if seed is not None else random.randrange(1 << 32)
+        self.rng = random.Random(self.seed)
+        self.snake = Snake(width, height, self.rng)
+        self.food = Food(width, height, self.rng, self.snake.free)
+        self.ticks = 0
+        self.won = False
+
+    def step(self):
+        # Returns False when the game is over: the snake died this tick, or
+        # it filled the whole board and won
+        if not self.snake.update():
+            return False
+        self.ticks += 1
+
+        # Check if food is eaten
+        if self.snake.get_head_position() == self.food.position:
+            self.snake.length += 1
+            self.snake.score += 1
+            if not self.food.randomize_position():
+                self.won = True
+                return False
+        return True
+
+    def reset(self, seed=None):
+        # A new game, on a fresh seed unless one is given
+        self.seed = seed if seed is not None else random.randrange(1 << 32)
+        self.rng.seed(self.seed)
+        self.snake.reset()
+        self.food.randomize_position()
+        self.ticks = 0
+        self.won = False
@@ -1,222 +1,384 @@
 import pygame
-import random
 import sys
+from collections import deque
+from itertools import islice
+from snake_core import SnakeGame, Snake, Food, UP, DOWN, LEFT, RIGHT
+from autopilot import Autopilot
+from loop import FixedStepLoop
+from replay import Recorder, record_option
+from snapshot import Snapshots
+from profiler import Profiler, ProfileOverlay, profile_option
 from ui import GameUI
 
-# Initialize Pygame
-pygame.init()
-
 # Define colors
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
 RED = (255, 0, 0)
 GREEN = (0, 255, 0)
+SNAKE_COLOR = GREEN
+HEAD_COLOR = (0, 180, 0)  # 更深的绿色
+FOOD_COLOR = RED
 
 # Set up game window
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 600
 BLOCK_SIZE = 20
-GAME_SPEED = 15
-
-# Create game window
-screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-pygame.display.set_caption('Snake Game')
-clock = pygame.time.Clock()
-
-# Initialize UI
-game_ui = GameUI(WINDOW_WIDTH, WINDOW_HEIGHT)
-
-class Snake:
-    def __init__(self):
-        self.length = 1
-        self.positions = [(WINDOW_WIDTH//2, WINDOW_HEIGHT//2)]
-        self.direction = random.choice([UP, DOWN, LEFT, RIGHT])
-        self.color = GREEN
-        self.head_color = (0, 180, 0)  # 更深的绿色
-        self.score = 0
-
-    def get_head_position(self):
-        return self.positions[0]
-
-    def update(self):
-        cur = self.get_head_position()
-        x, y = self.direction
-        new = (cur[0] + (x*BLOCK_SIZE), cur[1] + (y*BLOCK_SIZE))
-        
-        # Check if hit wall
-        if (new[0] < 0 or new[0] >= WINDOW_WIDTH or 
-            new[1] < 0 or new[1] >= WINDOW_HEIGHT):
-            return False
-        
-        # Check if hit itself
-        if new in self.positions[3:]:
-            return False
-            
-        self.positions.insert(0, new)
-        if len(self.positions) > self.length:
-            self.positions.pop()
-        return True
-
-    def reset(self):
-        self.length = 1
-        self.positions = [(WINDOW_WIDTH//2, WINDOW_HEIGHT//2)]
-        self.direction = random.choice([UP, DOWN, LEFT, RIGHT])
-        self.score = 0
-
-    def render(self):
+GAME_SPEED = 15  # Simulation ticks per second
+FRAME_RATE = 60  # Frames drawn per second, None for no cap
+REWIND_SECONDS = 10  # How far back holding Backspace can go
+
+# Head sprites reach past their cell (bigger square and tongue)
+HEAD_MARGIN = 13
+
+def bake_head(direction):
+    # Pre-render the head facing one direction onto a transparent sprite
+    size = BLOCK_SIZE + 2 * HEAD_MARGIN
+    sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+    x, y = HEAD_MARGIN, HEAD_MARGIN
+
+    # Draw base head square (slightly larger than body)
+    head_size = BLOCK_SIZE + 2
+    head_offset = 1
+    pygame.draw.rect(sprite, HEAD_COLOR, 
+                    (x - head_offset, y - head_offset, head_size, head_size))
+
+    # Draw eyes based on direction (larger and more visible)
+    eye_color = WHITE  # 白色眼睛
+    eye_size = 6
+    pupil_color = (0, 0, 0)  # 黑色瞳孔
+    pupil_size = 3
+
+    if direction == RIGHT:
+        # Right facing eyes
+        pygame.draw.circle(sprite, eye_color, (x + BLOCK_SIZE - 6, y + 6), eye_size)
+        pygame.draw.circle(sprite, eye_color, (x + BLOCK_SIZE - 6, y + BLOCK_SIZE - 6), eye_size)
+        pygame.draw.circle(sprite, pupil_color, (x + BLOCK_SIZE - 4, y + 6), pupil_size)
+        pygame.draw.circle(sprite, pupil_color, (x + BLOCK_SIZE - 4, y + BLOCK_SIZE - 6), pupil_size)
+    elif direction == LEFT:
+        # Left facing eyes
+        pygame.draw.circle(sprite, eye_color, (x + 6, y + 6), eye_size)
+        pygame.draw.circle(sprite, eye_color, (x + 6, y + BLOCK_SIZE - 6), eye_size)
+        pygame.draw.circle(sprite, pupil_color, (x + 4, y + 6), pupil_size)
+        pygame.draw.circle(sprite, pupil_color, (x + 4, y + BLOCK_SIZE - 6), pupil_size)
+    elif direction == UP:
+        # Up facing eyes
+        pygame.draw.circle(sprite, eye_color, (x + 6, y + 6), eye_size)
+        pygame.draw.circle(sprite, eye_color, (x + BLOCK_SIZE - 6, y + 6), eye_size)
+        pygame.draw.circle(sprite, pupil_color, (x + 6, y + 4), pupil_size)
+        pygame.draw.circle(sprite, pupil_color, (x + BLOCK_SIZE - 6, y + 4), pupil_size)
+    elif direction == DOWN:
+        # Down facing eyes
+        pygame.draw.circle(sprite, eye_color, (x + 6, y + BLOCK_SIZE - 6), eye_size)
+        pygame.draw.circle(sprite, eye_color, (x + BLOCK_SIZE - 6, y + BLOCK_SIZE - 6), eye_size)
+        pygame.draw.circle(sprite, pupil_color, (x + 6, y + BLOCK_SIZE - 4), pupil_size)
+        pygame.draw.circle(sprite, pupil_color, (x + BLOCK_SIZE - 6, y + BLOCK_SIZE - 4), pupil_size)
+
+    # Draw tongue (longer and forked)
+    tongue_color = (255, 0, 0)  # 更鲜艳的红色
+    tongue_length = 8
+    fork_size = 3
+
+    if direction == RIGHT:
+        base_x = x + BLOCK_SIZE
+        base_y = y + BLOCK_SIZE//2
+        pygame.draw.line(sprite, tongue_color, (base_x, base_y), 
+                       (base_x + tongue_length, base_y), 3)
+        pygame.draw.line(sprite, tongue_color, (base_x + tongue_length, base_y),
+                       (base_x + tongue_length + fork_size, base_y - fork_size), 2)
+        pygame.draw.line(sprite, tongue_color, (base_x + tongue_length, base_y),
+                       (base_x + tongue_length + fork_size, base_y + fork_size), 2)
+    elif direction == LEFT:
+        base_x = x
+        base_y = y + BLOCK_SIZE//2
+        pygame.draw.line(sprite, tongue_color, (base_x, base_y), 
+                       (base_x - tongue_length, base_y), 3)
+        pygame.draw.line(sprite, tongue_color, (base_x - tongue_length, base_y),
+                       (base_x - tongue_length - fork_size, base_y - fork_size), 2)
+        pygame.draw.line(sprite, tongue_color, (base_x - tongue_length, base_y),
+                       (base_x - tongue_length - fork_size, base_y + fork_size), 2)
+    elif direction == UP:
+        base_x = x + BLOCK_SIZE//2
+        base_y = y
+        pygame.draw.line(sprite, tongue_color, (base_x, base_y), 
+                       (base_x, base_y - tongue_length), 3)
+        pygame.draw.line(sprite, tongue_color, (base_x, base_y - tongue_length),
+                       (base_x - fork_size, base_y - tongue_length - fork_size), 2)
+        pygame.draw.line(sprite, tongue_color, (base_x, base_y - tongue_length),
+                       (base_x + fork_size, base_y - tongue_length - fork_size), 2)
+    elif direction == DOWN:
+        base_x = x + BLOCK_SIZE//2
+        base_y = y + BLOCK_SIZE
+        pygame.draw.line(sprite, tongue_color, (base_x, base_y), 
+                       (base_x, base_y + tongue_length), 3)
+        pygame.draw.line(sprite, tongue_color, (base_x, base_y + tongue_length),
+                       (base_x - fork_size, base_y + tongue_length + fork_size), 2)
+        pygame.draw.line(sprite, tongue_color, (base_x, base_y + tongue_length),
+                       (base_x + fork_size, base_y + tongue_length + fork_size), 2)
+    return sprite
+
+class SnakeRenderer:
+    """Draws the game by repainting only what changed since the last frame.
+
+    The head sprites and the body/food tiles are baked once. Each frame the
+    old and new head, the vacated tail cell, the old and new food and the
+    score are repainted and only those rectangles are presented, so the
+    cost of a frame does not depend on the snake's length. Between ticks
+    the head slides towards its new cell and the tail out of its old one.
+    """
+
+    def __init__(self, screen, game, game_ui):
+        self.screen = screen
+        self.game = game
+        self.game_ui = game_ui
+        self.heads = {d: bake_head(d) for d in (UP, DOWN, LEFT, RIGHT)}
+        self.body_tile = pygame.Surface((BLOCK_SIZE, BLOCK_SIZE))
+        self.body_tile.fill(SNAKE_COLOR)
+        self.food_tile = pygame.Surface((BLOCK_SIZE, BLOCK_SIZE))
+        self.food_tile.fill(FOOD_COLOR)
+        self.ticks = -1
+        self.previous = None  # Head and vacated tail cell before the last tick
+        self.invalidate()
+
+    def invalidate(self):
+        # Repaint the whole window on the next frame
+        self.full_redraw = True
+
+    def _cell_rect(self, cell):
+        return pygame.Rect(cell[0] * BLOCK_SIZE, cell[1] * BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE)
+
+    def _head_rect(self, cell):
+        return self._cell_rect(cell).inflate(2 * HEAD_MARGIN, 2 * HEAD_MARGIN)
+
+    def _interpolate(self, alpha):
+        # Head sprite rect and the part of the old tail cell still covered
+        snake = self.game.snake
+        head = snake.get_head_position()
+        head_rect = self._head_rect(head)
+        if self.previous is None or alpha >= 1:
+            return head_rect, None
+        old_head, old_tail = self.previous
+        behind = round((1 - alpha) * BLOCK_SIZE)
+        head_rect.move_ip((old_head[0] - head[0]) * behind, (old_head[1] - head[1]) * behind)
+        tail_piece = None
+        if old_tail is not None:
+            tail = snake.positions[-1]
+            cell = self._cell_rect(old_tail)
+            ahead = BLOCK_SIZE - behind
+            tail_piece = cell.move((tail[0] - old_tail[0]) * ahead,
+                                   (tail[1] - old_tail[1]) * ahead).clip(cell)
+            if not tail_piece:
+                tail_piece = None
+        return head_rect, tail_piece
+
+    def _paint(self, rect):
+        # Redraw everything overlapping rect, in the same order as a full frame
+        screen = self.screen
+        snake = self.game.snake
+        head = snake.get_head_position()
+        food = self.game.food.position
+        screen.set_clip(rect)
+        screen.fill(BLACK, rect)
+
         # Draw body
-        for p in self.positions[1:]:
-            pygame.draw.rect(screen, self.color, (p[0], p[1], BLOCK_SIZE, BLOCK_SIZE))
-        
-        # Draw head with special shape
-        head_pos = self.positions[0]
-        x, y = head_pos
-        
-        # Draw base head square (slightly larger than body)
-        head_size = BLOCK_SIZE + 2
-        head_offset = 1
-        pygame.draw.rect(screen, self.head_color, 
-                        (x - head_offset, y - head_offset, head_size, head_size))
-        
-        # Draw eyes based on direction (larger and more visible)
-        eye_color = WHITE  # 白色眼睛
-        eye_size = 6
-        pupil_color = (0, 0, 0)  # 黑色瞳孔
-        pupil_size = 3
-        
-        if self.direction == RIGHT:
-            # Right facing eyes
-            pygame.draw.circle(screen, eye_color, (x + BLOCK_SIZE - 6, y + 6), eye_size)
-            pygame.draw.circle(screen, eye_color, (x + BLOCK_SIZE - 6, y + BLOCK_SIZE - 6), eye_size)
-            pygame.draw.circle(screen, pupil_color, (x + BLOCK_SIZE - 4, y + 6), pupil_size)
-            pygame.draw.circle(screen, pupil_color, (x + BLOCK_SIZE - 4, y + BLOCK_SIZE - 6), pupil_size)
-        elif self.direction == LEFT:
-            # Left facing eyes
-            pygame.draw.circle(screen, eye_color, (x + 6, y + 6), eye_size)
-            pygame.draw.circle(screen, eye_color, (x + 6, y + BLOCK_SIZE - 6), eye_size)
-            pygame.draw.circle(screen, pupil_color, (x + 4, y + 6), pupil_size)
-            pygame.draw.circle(screen, pupil_color, (x + 4, y + BLOCK_SIZE - 6), pupil_size)
-        elif self.direction == UP:
-            # Up facing eyes
-            pygame.draw.circle(screen, eye_color, (x + 6, y + 6), eye_size)
-            pygame.draw.circle(screen, eye_color, (x + BLOCK_SIZE - 6, y + 6), eye_size)
-            pygame.draw.circle(screen, pupil_color, (x + 6, y + 4), pupil_size)
-            pygame.draw.circle(screen, pupil_color, (x + BLOCK_SIZE - 6, y + 4), pupil_size)
-        elif self.direction == DOWN:
-            # Down facing eyes
-            pygame.draw.circle(screen, eye_color, (x + 6, y + BLOCK_SIZE - 6), eye_size)
-            pygame.draw.circle(screen, eye_color, (x + BLOCK_SIZE - 6, y + BLOCK_SIZE - 6), eye_size)
-            pygame.draw.circle(screen, pupil_color, (x + 6, y + BLOCK_SIZE - 4), pupil_size)
-            pygame.draw.circle(screen, pupil_color, (x + BLOCK_SIZE - 6, y + BLOCK_SIZE - 4), pupil_size)
-        
-        # Draw tongue (longer and forked)
-        tongue_color = (255, 0, 0)  # 更鲜艳的红色
-        tongue_length = 8
-        fork_size = 3
-        
-        if self.direction == RIGHT:
-            base_x = x + BLOCK_SIZE
-            base_y = y + BLOCK_SIZE//2
-            pygame.draw.line(screen, tongue_color, (base_x, base_y), 
-                           (base_x + tongue_length, base_y), 3)
-            pygame.draw.line(screen, tongue_color, (base_x + tongue_length, base_y),
-                           (base_x + tongue_length + fork_size, base_y - fork_size), 2)
-            pygame.draw.line(screen, tongue_color, (base_x + tongue_length, base_y),
-                           (base_x + tongue_length + fork_size, base_y + fork_size), 2)
-        elif self.direction == LEFT:
-            base_x = x
-            base_y = y + BLOCK_SIZE//2
-            pygame.draw.line(screen, tongue_color, (base_x, base_y), 
-                           (base_x - tongue_length, base_y), 3)
-            pygame.draw.line(screen, tongue_color, (base_x - tongue_length, base_y),
-                           (base_x - tongue_length - fork_size, base_y - fork_size), 2)
-            pygame.draw.line(screen, tongue_color, (base_x - tongue_length, base_y),
-                           (base_x - tongue_length - fork_size, base_y + fork_size), 2)
-        elif self.direction == UP:
-            base_x = x + BLOCK_SIZE//2
-            base_y = y
-            pygame.draw.line(screen, tongue_color, (base_x, base_y), 
-                           (base_x, base_y - tongue_length), 3)
-            pygame.draw.line(screen, tongue_color, (base_x, base_y - tongue_length),
-                           (base_x - fork_size, base_y - tongue_length - fork_size), 2)
-            pygame.draw.line(screen, tongue_color, (base_x, base_y - tongue_length),
-                           (base_x + fork_size, base_y - tongue_length - fork_size), 2)
-        elif self.direction == DOWN:
-            base_x = x + BLOCK_SIZE//2
-            base_y = y + BLOCK_SIZE
-            pygame.draw.line(screen, tongue_color, (base_x, base_y), 
-                           (base_x, base_y + tongue_length), 3)
-            pygame.draw.line(screen, tongue_color, (base_x, base_y + tongue_length),
-                           (base_x - fork_size, base_y + tongue_length + fork_size), 2)
-            pygame.draw.line(screen, tongue_color, (base_x, base_y + tongue_length),
-                           (base_x + fork_size, base_y + tongue_length + fork_size), 2)
-
-class Food:
-    def __init__(self):
-        self.position = (0, 0)
-        self.color = RED
-        self.randomize_position()
-
-    def randomize_position(self):
-        self.position = (random.randint(0, (WINDOW_WIDTH-BLOCK_SIZE)//BLOCK_SIZE) * BLOCK_SIZE,
-                        random.randint(0, (WINDOW_HEIGHT-BLOCK_SIZE)//BLOCK_SIZE) * BLOCK_SIZE)
-
-    def render(self):
-        pygame.draw.rect(screen, self.color, (self.position[0], self.position[1], BLOCK_SIZE, BLOCK_SIZE))
-
-# Define directions
-UP = (0, -1)
-DOWN = (0, 1)
-LEFT = (-1, 0)
-RIGHT = (1, 0)
-
-def main():
-    snake = Snake()
-    food = Food()
-    game_active = True
+        width, height = snake.width, snake.height
+        left = max(rect.left // BLOCK_SIZE, 0)
+        right = min((rect.right - 1) // BLOCK_SIZE, width - 1)
+        top = max(rect.top // BLOCK_SIZE, 0)
+        bottom = min((rect.bottom - 1) // BLOCK_SIZE, height - 1)
+        for cy in range(top, bottom + 1):
+            for cx in range(left, right + 1):
+                if snake.occupied[cy * width + cx] and (cx, cy) != head:
+                    screen.blit(self.body_tile, (cx * BLOCK_SIZE, cy * BLOCK_SIZE))
+        if self.tail_piece is not None and self.tail_piece.colliderect(rect):
+            screen.fill(SNAKE_COLOR, self.tail_piece)
+
+        # Draw head, food and score on top
+        if self.head_rect.colliderect(rect):
+            screen.blit(self.heads[snake.direction], self.head_rect)
+        if food is not None and self._cell_rect(food).colliderect(rect):
+            screen.blit(self.food_tile, self._cell_rect(food))
+        if self.score_rect.colliderect(rect):
+            self.game_ui.draw_score(screen, snake.score)
+        screen.set_clip(None)
+
+    def draw(self, alpha=1.0):
+        # alpha is how far real time has got from the last tick to the next
+        snake = self.game.snake
+        head = snake.get_head_position()
+        state = (head, snake.direction, snake.positions[-1], self.game.food.position, snake.score)
+
+        if self.game.ticks != self.ticks:
+            if self.game.ticks == self.ticks + 1 and not self.full_redraw:
+                old_head, _, old_tail, _, _ = self.state
+                moved = old_tail != snake.positions[-1] and len(snake.positions) > 1
+                self.previous = (old_head, old_tail if moved else None)
+            else:
+                # More than one tick since the last frame, repaint everything
+                self.previous = None
+                self.invalidate()
+            self.ticks = self.game.ticks
+        old_head_rect, old_tail_piece = (None, None) if self.full_redraw else (self.head_rect, self.tail_piece)
+        self.head_rect, self.tail_piece = self._interpolate(alpha)
+
+        if self.full_redraw:
+            self.full_redraw = False
+            self.screen.fill(BLACK)
+            for cell in islice(snake.positions, 1, None):
+                self.screen.blit(self.body_tile, self._cell_rect(cell))
+            if self.tail_piece is not None:
+                self.screen.fill(SNAKE_COLOR, self.tail_piece)
+            self.screen.blit(self.heads[snake.direction], self.head_rect)
+            if self.game.food.position is not None:
+                self.screen.blit(self.food_tile, self._cell_rect(self.game.food.position))
+            self.score_rect = self.game_ui.draw_score(self.screen, snake.score)
+            self.state = state
+            pygame.display.update()
+            return
+
+        if state == self.state and self.head_rect == old_head_rect and self.tail_piece == old_tail_piece:
+            return
+        old_head, old_direction, old_tail, old_food, old_score = self.state
+        dirty = [old_head_rect, self.head_rect]
+        if old_head != head:
+            dirty.append(self._head_rect(old_head))
+        if old_tail != snake.positions[-1]:
+            dirty.append(self._cell_rect(old_tail))
+        dirty.extend(piece for piece in (old_tail_piece, self.tail_piece) if piece is not None)
+        if old_food != self.game.food.position:
+            if old_food is not None:
+                dirty.append(self._cell_rect(old_food))
+            if self.game.food.position is not None:
+                dirty.append(self._cell_rect(self.game.food.position))
+        if old_score != snake.score:
+            dirty.append(self.score_rect)
+            self.score_rect = self.game_ui.score_rect(snake.score)
+            dirty.append(self.score_rect)
+        for rect in dirty:
+            self._paint(rect)
+        self.state = state
+        pygame.display.update(dirty)
+
+def main(tick_rate=GAME_SPEED, frame_rate=FRAME_RATE):
+    # snake_game.py [--record DIR] saves a replay of every game into DIR
+    # snake_game.py [--profile FILE] profiles from the start, writing a
+    # Chrome trace to FILE on F4 and on quitting
+    replay_dir, args = record_option(sys.argv[1:])
+    profile_path, _ = profile_option(args)
+
+    # Initialize Pygame
+    pygame.init()
+
+    # Create game window
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    pygame.display.set_caption('Snake Game')
+
+    # Initialize UI
+    game_ui = GameUI(WINDOW_WIDTH, WINDOW_HEIGHT)
+
+    game = SnakeGame(WINDOW_WIDTH // BLOCK_SIZE, WINDOW_HEIGHT // BLOCK_SIZE)
+    snake = game.snake
+    autopilot = Autopilot(game)
+    autopilot_on = False  # Toggle with A, arrow keys take back control
+    renderer = SnakeRenderer(screen, game, game_ui)
+    loop = FixedStepLoop(tick_rate, frame_rate)
+    recorder = Recorder(game)
+    snapshots = Snapshots(game, int(tick_rate * REWIND_SECONDS))
+    checkpoints = deque(maxlen=snapshots.capacity)  # Recorder position per snapshot
+
+    # F3 shows the profiler overlay and turns profiling on, F4 saves a trace
+    profiler = Profiler()
+    profiler.watch(Autopilot, 'drive', 'autopilot')
+    profiler.watch(Snapshots, 'push', 'snapshot')
+    profiler.watch(Snake, 'update', 'snake.update')
+    profiler.watch(Food, 'randomize_position', 'food')
+    profiler.watch(SnakeRenderer, '_paint', 'paint')
+    profiler.watch(pygame.display, 'update', 'display.update')
+    overlay = ProfileOverlay(profiler)
+    if profile_path:
+        profiler.enable()
 
     while True:
-        for event in pygame.event.get():
+        # Nothing moves on the game over screen, sleep until an event comes
+        events = [pygame.event.wait()] if game_ui.game_over else pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
+                if profile_path:
+                    profiler.export(profile_path)
                 pygame.quit()
                 sys.exit()
-            elif event.type == pygame.KEYDOWN and game_active:
-                if event.key == pygame.K_UP and snake.direction != DOWN:
-                    snake.direction = UP
-                elif event.key == pygame.K_DOWN and snake.direction != UP:
-                    snake.direction = DOWN
-                elif event.key == pygame.K_LEFT and snake.direction != RIGHT:
-                    snake.direction = LEFT
-                elif event.key == pygame.K_RIGHT and snake.direction != LEFT:
-                    snake.direction = RIGHT
-
-        if game_active:
-            # Update snake position
-            if not snake.update():
-                game_active = False
-                game_ui.show_game_over_screen(screen, snake.score)
-                # Restart game
-                snake.reset()
-                food.randomize_position()
-                game_active = True
-                continue
+            elif event.type == pygame.VIDEOEXPOSE:
+                if game_ui.game_over:
+                    game_ui.draw_game_over(screen)
+                renderer.invalidate()
+            elif game_ui.game_over:
+                if game_ui.handle_event(event):
+                    # Restart game
+                    game.reset()
+                    autopilot.reset()
+                    renderer.invalidate()
+                    loop.reset()
+                    profiler.skip()
+                    recorder = Recorder(game)
+                    snapshots.clear()
+                    checkpoints.clear()
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F3:
+                    if not profiler.toggle():
+                        renderer.invalidate()
+                elif event.key == pygame.K_F4:
+                    print('wrote', profiler.export(profile_path or 'snake-trace.json'))
+                elif event.key == pygame.K_a:
+                    autopilot_on = not autopilot_on
+                    autopilot.reset()
+                elif event.key in (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT):
+                    autopilot_on = False
+                if event.key == pygame.K_UP:
+                    snake.turn(UP)
+                elif event.key == pygame.K_DOWN:
+                    snake.turn(DOWN)
+                elif event.key == pygame.K_LEFT:
+                    snake.turn(LEFT)
+                elif event.key == pygame.K_RIGHT:
+                    snake.turn(RIGHT)
 
-            # Check if food is eaten
-            if snake.get_head_position() == food.position:
-                snake.length += 1
-                snake.score += 1
-                food.randomize_position()
+        if game_ui.game_over:
+            continue
+        profiler.lap('input')
 
-            # Draw game screen
-            screen.fill(BLACK)
-            snake.render()
-            food.render()
-            
-            # Display score
-            game_ui.draw_score(screen, snake.score)
+        # Run the ticks that are due, however long the last frame took.
+        # Holding Backspace runs time backwards instead.
+        rewinding = pygame.key.get_pressed()[pygame.K_BACKSPACE]
+        for _ in range(loop.advance()):
+            if rewinding:
+                if snapshots.rewind():
+                    recorder.rollback(checkpoints.pop())
+                    autopilot.reset()
+                    renderer.invalidate()
+                continue
+            if autopilot_on:
+                autopilot.drive()
+            snapshots.push()
+            checkpoints.append(recorder.checkpoint())
 
-            pygame.display.update()
-            clock.tick(GAME_SPEED)
+            # Update snake position and check if food is eaten
+            recorder.record()
+            if not game.step():
+                if replay_dir:
+                    recorder.save(replay_dir)
+                game_ui.show_game_over_screen(screen, snake.score)
+                break
+        if game_ui.game_over:
+            continue
+        profiler.lap('tick')
+
+        # Draw what changed and present only those areas
+        renderer.draw(loop.alpha)
+        if profiler.enabled:
+            overlay.draw(screen)
+        profiler.lap('draw')
+        loop.wait()
+        profiler.lap('wait')
+        profiler.frame()
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
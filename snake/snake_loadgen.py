@@ -0,0 +1,99 @@
+import asyncio
+import random
+import sys
+import time
+from array import array
+from snake_core import DIRECTIONS
+from snake_server import JOIN, TURN, PORT, RoomView, frame, read_frame
+from options import option
+
+# Load generator for snake_server.py: opens rooms x players connections to
+# a local server, keeps a RoomView per connection from the deltas and
+# turns at random now and then. At the end it prints how much came
+# through and the latency from a delta leaving the server to it being
+# applied here (both ends use time.monotonic, so only on one machine).
+#
+#   python snake_loadgen.py [PORT] [--rooms 100] [--players 2] [--seconds 10]
+#                           [--turn-chance 0.1]
+
+CONNECT_AT_ONCE = 200  # Connections being opened at the same time
+
+
+class Metrics:
+    def __init__(self):
+        self.latencies = array('d')
+        self.deltas = 0
+        self.bytes = 0
+        self.gaps = 0  # Deltas that did not follow on from the previous tick
+        self.errors = 0
+
+    def report(self, clients, seconds):
+        latencies = sorted(self.latencies)
+        lines = [f'{clients} clients, {self.deltas} deltas in {seconds:.1f}s '
+                 f'({self.deltas / seconds:.0f}/s, {self.bytes / seconds / 1024:.0f} KiB/s), '
+                 f'{self.gaps} gaps, {self.errors} errors']
+        if latencies:
+            n = len(latencies)
+            lines.append('latency ms: ' + ', '.join(
+                f'p{p} {latencies[min(n * p // 100, n - 1)] * 1000:.2f}' for p in (50, 90, 99))
+                + f', max {latencies[-1] * 1000:.2f}')
+        return lines
+
+
+async def client(room, port, turn_chance, metrics, connecting, stop):
+    rng = random.Random()
+    try:
+        async with connecting:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    except OSError:
+        metrics.errors += 1
+        return
+    try:
+        writer.write(frame(JOIN.pack(b'J', room)))
+        view = RoomView(await read_frame(reader))
+        while not stop.is_set():
+            message = await read_frame(reader)
+            now = time.monotonic()
+            tick = view.tick
+            sent = view.apply(message)
+            metrics.latencies.append(now - sent)
+            metrics.deltas += 1
+            metrics.bytes += len(message) + 4
+            if view.tick != tick + 1:
+                metrics.gaps += 1
+            if rng.random() < turn_chance:
+                writer.write(frame(TURN.pack(b'T', rng.randrange(len(DIRECTIONS)))))
+    except (asyncio.IncompleteReadError, ConnectionError, KeyError):
+        metrics.errors += 1
+    finally:
+        writer.close()
+
+
+async def run(port, rooms, players, seconds, turn_chance):
+    metrics = Metrics()
+    connecting = asyncio.Semaphore(CONNECT_AT_ONCE)
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(client(room, port, turn_chance, metrics, connecting, stop))
+             for room in range(rooms) for _ in range(players)]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.wait(tasks, timeout=5)
+    for task in tasks:
+        task.cancel()
+    return metrics
+
+
+def main():
+    rooms, args = option(sys.argv[1:], '--rooms', '100')
+    players, args = option(args, '--players', '2')
+    seconds, args = option(args, '--seconds', '10')
+    turn_chance, args = option(args, '--turn-chance', '0.1')
+    port = int(args[0]) if args else PORT
+    rooms, players, seconds = int(rooms), int(players), float(seconds)
+    metrics = asyncio.run(run(port, rooms, players, seconds, float(turn_chance)))
+    for line in metrics.report(rooms * players, seconds):
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,356 @@
+import asyncio
+import random
+import struct
+import sys
+import time
+from array import array
+from collections import deque
+from snake_core import Snake, Food, FreeCells, DIRECTIONS
+from loop import FixedStepLoop
+from options import option
+
+# Authoritative multiplayer Snake on asyncio. The server hosts any number of
+# rooms, each a board where every player has a snake and all of them chase
+# one food item under the usual Snake and Food rules; snakes share the
+# board's occupied grid, so running into another snake kills like running
+# into yourself. Collisions are judged for all snakes at once against the
+# board as it was before the tick: heads meeting in one cell all die, and
+# a tail still counts as there on the tick it moves away. One task steps
+# every room at a fixed tick rate.
+#
+# Clients only send direction changes. After joining they get the whole
+# room once, then one delta per tick: each snake's new head and whether its
+# tail moved, the snakes that died or (re)spawned, and the food cell. A
+# delta's size depends on the number of players, never on snake lengths,
+# and it is encoded once per room and the same bytes written to everyone.
+#
+# Every message is a little-endian u32 size and then the payload, whose
+# first byte is its type. Cells are y * width + x.
+#
+#   client: b'J' room          join (first message only)
+#           b'T' direction     turn, an index into DIRECTIONS
+#   server: b'S' STATE, then per snake STATE_SNAKE and its cells head first
+#           b'D' DELTA, then the SPAWN, MOVE and DEATH records it counts,
+#                to be applied in that order
+#
+# python snake_server.py [PORT] [--size 40x30] [--rate 15]
+
+FRAME = struct.Struct('<I')
+JOIN = struct.Struct('<cI')
+TURN = struct.Struct('<cB')
+# type, your id, tick, width, height, food cell (-1 for none), snakes
+STATE = struct.Struct('<cHIHHiH')
+# id, direction, body cells
+STATE_SNAKE = struct.Struct('<HBI')
+# type, tick, server time (time.monotonic), spawns, moves, deaths, food cell
+DELTA = struct.Struct('<cIdHHHi')
+SPAWN = struct.Struct('<HIB')  # id, head cell, direction
+MOVE = struct.Struct('<HIB')  # id, new head cell, 1 if the tail moved up
+DEATH = struct.Struct('<H')  # id; its body leaves the board
+
+PORT = 7878
+TICK_RATE = 15
+BOARD_SIZE = (40, 30)
+RESPAWN_TICKS = 15  # How long a dead snake waits to come back
+MAX_PLAYERS = 0x10000  # Ids are u16
+MAX_BUFFERED = 1 << 16  # Bytes queued for a client before it is dropped as too slow
+METRICS_INTERVAL = 5.0  # Seconds between metrics lines
+TICK_SAMPLES = 1000  # Tick times kept for percentiles
+
+
+def cell_of(position, width):
+    return -1 if position is None else position[1] * width + position[0]
+
+
+class Room:
+    def __init__(self, room_id, width, height, seed=None):
+        self.room_id = room_id
+        self.width = width
+        self.height = height
+        self.rng = random.Random(seed)
+        self.occupied = bytearray(width * height)
+        self.free = FreeCells(width * height)
+        self.food = Food(width, height, self.rng, self.free)
+        self.tick = 0
+        self.snakes = {}  # Id -> Snake, living snakes only
+        self.writers = {}  # Id -> StreamWriter
+        self.joining = []  # (id, writer) to add at the next tick
+        self.leaving = []
+        self.respawns = {}  # Id -> tick to spawn at
+        self.turns = {}  # Id -> direction, the last one sent this tick
+        self.ids = set()
+
+    def join(self, writer):
+        # Returns the new player's id; it appears on the next tick
+        if len(self.ids) >= MAX_PLAYERS:
+            raise ValueError('room is full')
+        player = next(i for i in range(MAX_PLAYERS) if i not in self.ids)
+        self.ids.add(player)
+        self.joining.append((player, writer))
+        return player
+
+    def leave(self, player):
+        self.leaving.append(player)
+
+    @property
+    def empty(self):
+        return not self.ids
+
+    def state(self, player):
+        # The whole room for a client that just joined
+        width = self.width
+        out = bytearray(STATE.pack(b'S', player, self.tick, width, self.height,
+                                   cell_of(self.food.position, width), len(self.snakes)))
+        for other, snake in self.snakes.items():
+            out += STATE_SNAKE.pack(other, DIRECTIONS.index(snake.direction), len(snake.positions))
+            out += array('I', [y * width + x for x, y in snake.positions]).tobytes()
+        return bytes(out)
+
+    def _spawn(self, player, spawns):
+        # On a free cell, heading for whichever wall is furthest away
+        if not self.free:
+            self.respawns[player] = self.tick + 1
+            return
+        width, height = self.width, self.height
+        cell = self.free.choice(self.rng)
+        if cell == cell_of(self.food.position, width) and len(self.free) > 1:
+            while cell == cell_of(self.food.position, width):
+                cell = self.free.choice(self.rng)
+        x, y = cell % width, cell // width
+        direction = max(DIRECTIONS, key=lambda d: (width - 1 - x if d[0] > 0 else x if d[0] < 0 else 0)
+                        + (height - 1 - y if d[1] > 0 else y if d[1] < 0 else 0))
+        self.snakes[player] = Snake(width, height, self.rng, self.occupied, self.free, (x, y), direction)
+        spawns += SPAWN.pack(player, cell, DIRECTIONS.index(direction))
+
+    def _kill(self, player, deaths):
+        self.snakes.pop(player).remove()
+        deaths += DEATH.pack(player)
+
+    def step(self):
+        # One tick; returns the framed delta to send to everyone in the room
+        moves = bytearray()
+        deaths = bytearray()
+        spawns = bytearray()
+
+        # Newcomers get the room as it was before this tick, then its delta
+        joining, self.joining = self.joining, []
+        for player, writer in joining:
+            writer.write(frame(self.state(player)))
+            self.writers[player] = writer
+        for player in self.leaving:
+            self.ids.discard(player)
+            self.writers.pop(player, None)
+            self.respawns.pop(player, None)
+            self.turns.pop(player, None)
+            if player in self.snakes:
+                self._kill(player, deaths)
+        self.leaving = []
+        for player, writer in joining:
+            if player in self.ids:
+                self._spawn(player, spawns)
+        for player, tick in list(self.respawns.items()):
+            if tick <= self.tick:
+                del self.respawns[player]
+                self._spawn(player, spawns)
+
+        for player, direction in self.turns.items():
+            snake = self.snakes.get(player)
+            if snake is not None:
+                snake.turn(DIRECTIONS[direction])
+        self.turns.clear()
+
+        # Every collision is judged against the board as it was at the start
+        # of the tick, as in snake_arena.py: walls, any body (tails included,
+        # even one about to move on) and other heads entering the same cell
+        # kill. Nothing depends on the order the snakes are stepped in.
+        width, height = self.width, self.height
+        occupied = self.occupied
+        targets = {}  # Cell -> players heading into it
+        crashed = []
+        for player, snake in self.snakes.items():
+            x, y = snake.positions[0]
+            x += snake.direction[0]
+            y += snake.direction[1]
+            if 0 <= x < width and 0 <= y < height and not occupied[y * width + x]:
+                targets.setdefault(y * width + x, []).append(player)
+            else:
+                crashed.append(player)
+        for players in targets.values():
+            if len(players) > 1:
+                crashed.extend(players)
+        for player in crashed:
+            self._kill(player, deaths)
+            self.respawns[player] = self.tick + RESPAWN_TICKS
+
+        # Only then move the rest, onto cells nobody else is taking
+        food = self.food
+        if food.position is None:
+            food.randomize_position()  # The board was full, try again
+        eaten = False
+        for player, snake in self.snakes.items():
+            before = len(snake.positions)
+            snake.update()
+            head = snake.positions[0]
+            moves += MOVE.pack(player, head[1] * width + head[0], len(snake.positions) == before)
+            if head == food.position:
+                snake.length += 1
+                snake.score += 1
+                eaten = True
+        if eaten:
+            food.randomize_position()
+
+        self.tick += 1
+        payload = DELTA.pack(b'D', self.tick, time.monotonic(), len(spawns) // SPAWN.size,
+                             len(moves) // MOVE.size, len(deaths) // DEATH.size,
+                             cell_of(food.position, width))
+        return frame(payload + spawns + moves + deaths)
+
+
+class RoomView:
+    """A client's copy of a room, built from the STATE message and kept up
+    to date by applying every DELTA after it."""
+
+    def __init__(self, state):
+        (_, self.player, self.tick, self.width, self.height,
+         self.food, count) = STATE.unpack_from(state)
+        self.snakes = {}  # Id -> deque of cells, head first
+        pos = STATE.size
+        for _ in range(count):
+            player, _, length = STATE_SNAKE.unpack_from(state, pos)
+            pos += STATE_SNAKE.size
+            cells = array('I')
+            cells.frombytes(state[pos:pos + 4 * length])
+            pos += 4 * length
+            self.snakes[player] = deque(cells)
+
+    def apply(self, delta):
+        # Returns the server time the delta was sent at
+        _, self.tick, sent, spawns, moves, deaths, self.food = DELTA.unpack_from(delta)
+        view = memoryview(delta)
+        pos = DELTA.size
+        end = pos + spawns * SPAWN.size
+        for player, cell, _ in SPAWN.iter_unpack(view[pos:end]):
+            self.snakes[player] = deque([cell])
+        pos, end = end, end + moves * MOVE.size
+        for player, cell, tail_moved in MOVE.iter_unpack(view[pos:end]):
+            body = self.snakes[player]
+            body.appendleft(cell)
+            if tail_moved:
+                body.pop()
+        pos, end = end, end + deaths * DEATH.size
+        for player, in DEATH.iter_unpack(view[pos:end]):
+            del self.snakes[player]
+        return sent
+
+
+def frame(payload):
+    return FRAME.pack(len(payload)) + payload
+
+
+async def read_frame(reader):
+    size = FRAME.unpack(await reader.readexactly(FRAME.size))[0]
+    return await reader.readexactly(size)
+
+
+class Server:
+    def __init__(self, width, height, tick_rate=TICK_RATE):
+        self.width = width
+        self.height = height
+        self.tick_rate = tick_rate
+        self.rooms = {}
+        self.tick_times = deque(maxlen=TICK_SAMPLES)
+        self.bytes_sent = 0
+        self.messages_sent = 0
+        self.dropped = 0  # Clients cut off for not keeping up
+
+    async def handle(self, reader, writer):
+        room = player = None
+        try:
+            message = await read_frame(reader)
+            if message[:1] != b'J' or len(message) != JOIN.size:
+                return
+            room_id = JOIN.unpack(message)[1]
+            room = self.rooms.get(room_id)
+            if room is None:
+                room = self.rooms[room_id] = Room(room_id, self.width, self.height)
+            player = room.join(writer)
+            while True:
+                message = await read_frame(reader)
+                if message[:1] == b'T' and len(message) == TURN.size:
+                    direction = message[1]
+                    if direction < len(DIRECTIONS):
+                        room.turns[player] = direction
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            if player is not None:
+                room.leave(player)
+            writer.close()
+
+    def step(self):
+        # Tick every room and send out the deltas
+        for room_id, room in list(self.rooms.items()):
+            if room.empty and not room.leaving:
+                del self.rooms[room_id]
+                continue
+            delta = room.step()
+            for player, writer in list(room.writers.items()):
+                if writer.transport.is_closing():
+                    continue
+                if writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+                    # Its handler sees the connection close and leaves the room
+                    self.dropped += 1
+                    del room.writers[player]
+                    writer.close()
+                    continue
+                writer.write(delta)
+                self.bytes_sent += len(delta)
+                self.messages_sent += 1
+
+    async def run(self):
+        # Fixed timestep, sleeping until the next tick is due
+        loop = FixedStepLoop(self.tick_rate, max_ticks=int(self.tick_rate))
+        clock = time.perf_counter
+        while True:
+            for _ in range(loop.advance()):
+                start = clock()
+                self.step()
+                self.tick_times.append(clock() - start)
+            await asyncio.sleep(loop.tick_time - loop.accumulator)
+
+    async def report(self):
+        last_bytes = last_messages = 0
+        while True:
+            await asyncio.sleep(METRICS_INTERVAL)
+            times = sorted(self.tick_times)
+            p50 = times[len(times) // 2] * 1000 if times else 0
+            p99 = times[len(times) * 99 // 100] * 1000 if times else 0
+            players = sum(len(room.writers) for room in self.rooms.values())
+            print(f'{len(self.rooms)} rooms, {players} players, tick p50 {p50:.2f} ms p99 {p99:.2f} ms, '
+                  f'{(self.bytes_sent - last_bytes) / METRICS_INTERVAL / 1024:.0f} KiB/s, '
+                  f'{(self.messages_sent - last_messages) / METRICS_INTERVAL:.0f} msgs/s, '
+                  f'{self.dropped} dropped')
+            last_bytes, last_messages = self.bytes_sent, self.messages_sent
+
+
+async def serve(port=PORT, size=BOARD_SIZE, tick_rate=TICK_RATE, host='127.0.0.1'):
+    server = Server(size[0], size[1], tick_rate)
+    listener = await asyncio.start_server(server.handle, host, port, backlog=4096)
+    print(f'serving on {host}:{port}, {size[0]}x{size[1]} boards at {tick_rate} ticks/s')
+    async with listener:
+        await asyncio.gather(server.run(), server.report())
+
+
+def main():
+    size, args = option(sys.argv[1:], '--size', '%dx%d' % BOARD_SIZE)
+    rate, args = option(args, '--rate', str(TICK_RATE))
+    port = int(args[0]) if args else PORT
+    width, height = (int(n) for n in size.split('x'))
+    try:
+        asyncio.run(serve(port, (width, height), float(rate)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import struct
+from array import array
+from collections import deque
+from snake_core import DIRECTIONS
+
+# Whole-game snapshots as fixed-size binary records in a ring buffer that
+# is allocated once. A record is the header below, the random generator's
+# state and one index per board cell: the body head first, then the free
+# cells in FreeCells order, so food lands where it would have landed had
+# the game never been rewound. Used for rewinding in the UI, rolling back
+# and trying moves out from the same position.
+
+# ticks, length, score, body cells, food cell (-1 for none), direction, won
+HEADER = struct.Struct('<IIIIiBB')
+RNG_STATE = struct.Struct('<625I')
+
+
+class Snapshots:
+    def __init__(self, game, capacity):
+        self.game = game
+        self.capacity = capacity
+        size = game.width * game.height
+        self.cell_type = 'H' if size <= 0xffff else 'I'
+        self.cells_at = HEADER.size + RNG_STATE.size
+        self.record_size = self.cells_at + size * array(self.cell_type).itemsize
+        self.buffer = bytearray(self.record_size * capacity)
+        self.view = memoryview(self.buffer)
+        self.clear()
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.newest = -1
+        self.count = 0
+
+    def _record(self, i):
+        start = i * self.record_size
+        return self.view[start:start + self.record_size]
+
+    def push(self):
+        # Save the game as it is now, over the oldest record when full
+        self.newest = (self.newest + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.save(self._record(self.newest))
+
+    def rewind(self, ticks=1):
+        # Go back to the record pushed ticks pushes ago, dropping it and
+        # everything newer; returns how far back it went
+        ticks = min(ticks, self.count)
+        if ticks:
+            self.newest = (self.newest - ticks + 1) % self.capacity
+            self.load(self._record(self.newest))
+            self.newest = (self.newest - 1) % self.capacity
+            self.count -= ticks
+        return ticks
+
+    def save(self, record):
+        game = self.game
+        snake = game.snake
+        width = game.width
+        food = game.food.position
+        HEADER.pack_into(record, 0, game.ticks, snake.length, snake.score, len(snake.positions),
+                         -1 if food is None else food[1] * width + food[0],
+                         DIRECTIONS.index(snake.direction), game.won)
+        RNG_STATE.pack_into(record, HEADER.size, *game.rng.getstate()[1])
+        cells = array(self.cell_type, [y * width + x for x, y in snake.positions])
+        cells.extend(array(self.cell_type, snake.free.cells))
+        record[self.cells_at:] = memoryview(cells).cast('B')
+
+    def load(self, record):
+        game = self.game
+        snake = game.snake
+        width = game.width
+        ticks, length, score, body, food, direction, won = HEADER.unpack_from(record, 0)
+        game.rng.setstate((3, RNG_STATE.unpack_from(record, HEADER.size), None))
+        cells = array(self.cell_type)
+        cells.frombytes(record[self.cells_at:])
+
+        # Swap the body in place; Food shares the free cell index
+        occupied = snake.occupied
+        for x, y in snake.positions:
+            occupied[y * width + x] = 0
+        snake.positions = deque((cell % width, cell // width) for cell in cells[:body])
+        for cell in cells[:body]:
+            occupied[cell] += 1
+        free = snake.free
+        free.cells = array('i', cells[body:])
+        free.slot = array('i', [-1]) * len(free.slot)
+        for i, cell in enumerate(free.cells):
+            free.slot[cell] = i
+
+        snake.length = length
+        snake.score = score
+        snake.direction = DIRECTIONS[direction]
+        game.food.position = None if food < 0 else (food % width, food // width)
+        game.ticks = ticks
+        game.won = bool(won)
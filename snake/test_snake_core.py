@@ -0,0 +1,45 @@
+import unittest
+from snake_core import SnakeGame, UP, DOWN, LEFT, RIGHT
+from snapshot import Snapshots
+
+# python -m unittest test_snake_core
+
+
+def game_with(cells, direction):
+    # A game whose snake lies on cells, head first, heading direction
+    game = SnakeGame(10, 10, seed=0)
+    snake = game.snake
+    snake.reset(cells[0], direction)
+    for x, y in cells[1:]:
+        snake.positions.append((x, y))
+        snake.occupied[y * game.width + x] += 1
+        snake.free.remove(y * game.width + x)
+    snake.length = len(cells)
+    game.food.position = (0, 0)
+    return game
+
+
+class TurnTest(unittest.TestCase):
+    def test_quick_double_turn_cannot_reverse(self):
+        # UP then RIGHT within one tick, while still moving LEFT
+        game = game_with([(5, 5), (6, 5), (7, 5), (8, 5)], LEFT)
+        snapshots = Snapshots(game, 4)
+        game.snake.turn(UP)
+        game.snake.turn(RIGHT)
+        self.assertTrue(game.step())
+        snapshots.push()
+        positions = list(game.snake.positions)
+        self.assertEqual(positions, [(5, 4), (5, 5), (6, 5), (7, 5)])
+        self.assertEqual(len(set(positions)), len(positions))
+
+    def test_turn_checks_the_way_the_head_last_moved(self):
+        # A pending UP can still be changed to DOWN, but never to RIGHT
+        game = game_with([(5, 5), (6, 5)], LEFT)
+        game.snake.turn(UP)
+        game.snake.turn(RIGHT)
+        self.assertEqual(game.snake.direction, UP)
+        game.snake.turn(DOWN)
+        self.assertEqual(game.snake.direction, DOWN)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from snake_core import Snake, UP, LEFT, RIGHT
+from snake_server import Room, RoomView
+
+# python -m unittest test_snake_server
+
+
+def place(room, player, cells, direction):
+    # Put a snake on cells, head first, as if it had grown there
+    snake = Snake(room.width, room.height, room.rng, room.occupied, room.free, cells[0], direction)
+    for x, y in cells[1:]:
+        snake.positions.append((x, y))
+        room.occupied[y * room.width + x] += 1
+        room.free.remove(y * room.width + x)
+    snake.length = len(cells)
+    room.snakes[player] = snake
+    room.ids.add(player)
+
+
+def room_with(*snakes):
+    room = Room(0, 10, 10, seed=0)
+    room.food.position = (9, 9)
+    for player, cells, direction in snakes:
+        place(room, player, cells, direction)
+    return room
+
+
+class CollisionTest(unittest.TestCase):
+    def both_orders(self, a, b):
+        # The same two snakes added to a room in either order
+        return [room_with(a, b), room_with(b, a)]
+
+    def test_heads_into_same_cell_both_die(self):
+        for room in self.both_orders((0, [(2, 5)], RIGHT), (1, [(4, 5)], LEFT)):
+            room.step()
+            self.assertEqual(room.snakes, {})
+            self.assertEqual(set(room.respawns), {0, 1})
+
+    def test_heads_swapping_cells_both_die(self):
+        for room in self.both_orders((0, [(2, 5)], RIGHT), (1, [(3, 5)], LEFT)):
+            room.step()
+            self.assertEqual(room.snakes, {})
+
+    def test_tail_that_moves_away_still_kills(self):
+        # Snake 1 heads into the cell snake 0's tail leaves this tick
+        chased = (0, [(5, 5), (4, 5), (3, 5)], RIGHT)
+        chaser = (1, [(3, 6)], UP)
+        for room in self.both_orders(chased, chaser):
+            room.step()
+            self.assertEqual(list(room.snakes), [0])
+            self.assertEqual(list(room.snakes[0].positions), [(6, 5), (5, 5), (4, 5)])
+            self.assertEqual(room.occupied[5 * 10 + 3], 0)
+            self.assertEqual(room.occupied[6 * 10 + 3], 0)
+
+    def test_view_follows_collisions(self):
+        room = room_with((0, [(2, 5)], RIGHT), (1, [(4, 5)], LEFT), (2, [(7, 2), (7, 3)], UP))
+        view = RoomView(room.state(0))
+        view.apply(room.step()[4:])
+        width = room.width
+        self.assertEqual({player: list(cells) for player, cells in view.snakes.items()},
+                         {player: [y * width + x for x, y in snake.positions]
+                          for player, snake in room.snakes.items()})
+        self.assertEqual(list(view.snakes), [2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,226 @@
+import json
+import os
+import random
+import struct
+import sys
+import time
+from collections import Counter
+from multiprocessing import Pool
+from snake_core import SnakeGame, DIRECTIONS
+from autopilot import Autopilot
+from options import option
+
+# Plays many seeded headless games across a process pool, one worker per
+# core, for tournaments between controllers and for soak tests:
+#
+#   python tournament.py GAMES [--controller autopilot|random] [--size 20x20]
+#                        [--out DIR] [--workers N] [--batch 64] [--max-ticks N]
+#                        [--first-seed 0]
+#
+# Each task plays a batch of seeds on one reused game and sends back its
+# results as packed RESULT records, so IPC is a few bytes per game. The
+# main process appends every batch to DIR/results.bin as it arrives and
+# rewrites DIR/stats.json now and then. Running the same command again
+# resumes: seeds already in results.bin are skipped, and the statistics are
+# rebuilt from it. DIR/run.json holds the settings, which must match.
+
+# seed, score, length, ticks, cause. length is the cells the snake covered
+# when the game ended, not Snake.length, which is already one more on the
+# tick it eats.
+RESULT = struct.Struct('<IIIIB')
+CAUSES = ['wall', 'self', 'won', 'timeout']
+WALL, SELF, WON, TIMEOUT = range(len(CAUSES))
+STATS_INTERVAL = 1.0  # Seconds between stats.json rewrites
+TURN_CHANCE = 0.1  # How often the random controller turns
+
+
+class RandomController:
+    # Turns at random now and then, and whenever going on would kill it,
+    # onto any cell that is free right now
+    def __init__(self, game):
+        self.game = game
+        self.rng = random.Random()
+
+    def reset(self):
+        self.rng.seed(self.game.seed)
+
+    def drive(self):
+        game = self.game
+        snake = game.snake
+        x, y = snake.get_head_position()
+        back = (-snake.direction[0], -snake.direction[1])
+        safe = [(dx, dy) for dx, dy in DIRECTIONS
+                if (dx, dy) != back and 0 <= x + dx < game.width and 0 <= y + dy < game.height
+                and not snake.occupied[(y + dy) * game.width + x + dx]]
+        if safe and (snake.direction not in safe or self.rng.random() < TURN_CHANCE):
+            snake.turn(self.rng.choice(safe))
+
+
+CONTROLLERS = {'autopilot': Autopilot, 'random': RandomController}
+
+
+def death_cause(game):
+    # Why the last step() returned False
+    if game.won:
+        return WON
+    x, y = game.snake.get_head_position()
+    dx, dy = game.snake.direction
+    if 0 <= x + dx < game.width and 0 <= y + dy < game.height:
+        return SELF
+    return WALL
+
+
+def play_batch(task):
+    # Worker: play every seed in the batch, returning their packed results
+    (width, height, controller, max_ticks), seeds = task
+    game = SnakeGame(width, height, seed=seeds[0])
+    driver = CONTROLLERS[controller](game)
+    out = bytearray()
+    for seed in seeds:
+        game.reset(seed)
+        driver.reset()
+        cause = TIMEOUT
+        while game.ticks < max_ticks:
+            driver.drive()
+            if not game.step():
+                cause = death_cause(game)
+                break
+        snake = game.snake
+        out += RESULT.pack(seed, snake.score, len(snake.positions), game.ticks, cause)
+    return bytes(out)
+
+
+class Stats:
+    """Totals over every game played so far, for stats.json."""
+
+    def __init__(self):
+        self.games = 0
+        self.ticks = 0
+        self.causes = Counter()
+        self.scores = Counter()
+        self.lengths = Counter()
+
+    def add(self, records):
+        # records: packed RESULT records
+        for seed, score, length, ticks, cause in RESULT.iter_unpack(records):
+            self.games += 1
+            self.ticks += ticks
+            self.causes[CAUSES[cause]] += 1
+            self.scores[score] += 1
+            self.lengths[length] += 1
+
+    def to_dict(self):
+        return {'games': self.games, 'ticks': self.ticks, 'causes': dict(self.causes),
+                'score': summarize(self.scores), 'length': summarize(self.lengths)}
+
+
+def summarize(counts):
+    # Mean, extremes and percentiles of values given as value -> count
+    total = sum(counts.values())
+    if not total:
+        return {}
+    values = sorted(counts)
+    result = {'mean': sum(v * n for v, n in counts.items()) / total,
+              'min': values[0], 'max': values[-1]}
+    for p in (50, 90, 99):
+        rank = min(total * p // 100, total - 1)
+        seen = 0
+        for value in values:
+            seen += counts[value]
+            if seen > rank:
+                result[f'p{p}'] = value
+                break
+    return result
+
+
+def write_json(path, data):
+    # Replace path in one step so a crash never leaves half a file
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def load_results(path):
+    # Whole records from an earlier run, dropping any half-written tail
+    if not os.path.exists(path):
+        return b''
+    with open(path, 'rb') as f:
+        data = f.read()
+    whole = len(data) - len(data) % RESULT.size
+    if whole != len(data):
+        with open(path, 'r+b') as f:
+            f.truncate(whole)
+    return data[:whole]
+
+
+def run(games, settings, out, first_seed=0, workers=None, batch=64):
+    # Play seeds first_seed .. first_seed + games - 1 not already in out
+    os.makedirs(out, exist_ok=True)
+    run_path = os.path.join(out, 'run.json')
+    config = dict(zip(('width', 'height', 'controller', 'max_ticks'), settings))
+    if os.path.exists(run_path):
+        with open(run_path) as f:
+            if json.load(f) != config:
+                raise ValueError(f'{out} holds a run with other settings')
+    else:
+        write_json(run_path, config)
+
+    results_path = os.path.join(out, 'results.bin')
+    stats_path = os.path.join(out, 'stats.json')
+    done = load_results(results_path)
+    stats = Stats()
+    stats.add(done)
+    finished = {record[0] for record in RESULT.iter_unpack(done)}
+    seeds = [seed for seed in range(first_seed, first_seed + games) if seed not in finished]
+    tasks = [(settings, seeds[i:i + batch]) for i in range(0, len(seeds), batch)]
+    if finished:
+        print(f'resuming: {len(finished)} games already played, {len(seeds)} to go')
+
+    start = last_write = time.perf_counter()
+    played = ticks = 0
+    with open(results_path, 'ab') as results, Pool(workers) as pool:
+        for records in pool.imap_unordered(play_batch, tasks):
+            results.write(records)
+            results.flush()
+            stats.add(records)
+            played += len(records) // RESULT.size
+            ticks += sum(record[3] for record in RESULT.iter_unpack(records))
+            now = time.perf_counter()
+            if now - last_write >= STATS_INTERVAL:
+                write_json(stats_path, stats.to_dict())
+                last_write = now
+                print(f'{played}/{len(seeds)} games, {played / (now - start):.0f} games/s, '
+                      f'{ticks / (now - start):.0f} ticks/s')
+    write_json(stats_path, stats.to_dict())
+    elapsed = time.perf_counter() - start
+    if played:
+        print(f'{played} games, {ticks} ticks in {elapsed:.2f}s '
+              f'({played / elapsed:.0f} games/s, {ticks / elapsed:.0f} ticks/s)')
+    return stats
+
+
+def main():
+    controller, args = option(sys.argv[1:], '--controller', 'autopilot')
+    size, args = option(args, '--size', '20x20')
+    out, args = option(args, '--out', 'tournament')
+    workers, args = option(args, '--workers')
+    batch, args = option(args, '--batch', '64')
+    max_ticks, args = option(args, '--max-ticks', '1000000')
+    first_seed, args = option(args, '--first-seed', '0')
+    if len(args) != 1 or controller not in CONTROLLERS:
+        print('usage: tournament.py GAMES [--controller autopilot|random] [--size WxH] [--out DIR]\n'
+              '                     [--workers N] [--batch N] [--max-ticks N] [--first-seed N]')
+        sys.exit(2)
+    width, height = (int(n) for n in size.split('x'))
+    settings = (width, height, controller, int(max_ticks))
+    try:
+        stats = run(int(args[0]), settings, out, int(first_seed),
+                    int(workers) if workers else None, int(batch))
+    except ValueError as e:
+        print(e)
+        sys.exit(2)
+    print(json.dumps(stats.to_dict(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,47 +1,73 @@
 import pygame
 import sys
 
+WHITE = (255, 255, 255)
+
 class GameUI:
+    """Score display and game over screen.
+
+    Text is rendered once per value and reused. The game over screen does
+    not block: show_game_over_screen draws it and sets game_over, then the
+    main loop waits on pygame.event.wait and passes events to
+    handle_event until the player restarts.
+    """
+
     def __init__(self, screen_width, screen_height):
         self.screen_width = screen_width
         self.screen_height = screen_height
         self.font_big = pygame.font.Font(None, 72)
         self.font_small = pygame.font.Font(None, 36)
-        
+        self.score_text = None
+        self.score_value = None
+        self.game_over_text = self.font_big.render('GAME OVER', True, WHITE)
+        self.restart_text = self.font_small.render('Press SPACE to Restart', True, WHITE)
+        self.game_over = False
+        self.final_score = None
+        self.final_score_text = None
+
+    def _score_text(self, score):
+        # Only render again when the score has changed
+        if score != self.score_value:
+            self.score_text = self.font_small.render(f'Score: {score}', True, WHITE)
+            self.score_value = score
+        return self.score_text
+
     def draw_score(self, screen, score):
-        score_text = self.font_small.render(f'Score: {score}', True, (255, 255, 255))
-        screen.blit(score_text, (10, 10))
-    
+        return screen.blit(self._score_text(score), (10, 10))
+
+    def score_rect(self, score):
+        # Area draw_score will cover, without rendering the text
+        if score == self.score_value:
+            return self.score_text.get_rect(topleft=(10, 10))
+        return pygame.Rect((10, 10), self.font_small.size(f'Score: {score}'))
+
     def show_game_over_screen(self, screen, score):
-        # Game over text
-        game_over_text = self.font_big.render('GAME OVER', True, (255, 255, 255))
-        game_over_rect = game_over_text.get_rect(center=(self.screen_width/2, self.screen_height/2 - 50))
-        
-        # Final score text
-        final_score_text = self.font_small.render(f'Final Score: {score}', True, (255, 255, 255))
-        final_score_rect = final_score_text.get_rect(center=(self.screen_width/2, self.screen_height/2 + 20))
-        
-        # Restart prompt text
-        restart_text = self.font_small.render('Press SPACE to Restart', True, (255, 255, 255))
-        restart_rect = restart_text.get_rect(center=(self.screen_width/2, self.screen_height/2 + 70))
-        
+        # Enter the game over state; the main loop keeps handling events
+        if score != self.final_score:
+            self.final_score_text = self.font_small.render(f'Final Score: {score}', True, WHITE)
+            self.final_score = score
+        self.game_over = True
+        self.draw_game_over(screen)
+
+    def draw_game_over(self, screen):
+        game_over_rect = self.game_over_text.get_rect(center=(self.screen_width/2, self.screen_height/2 - 50))
+        final_score_rect = self.final_score_text.get_rect(center=(self.screen_width/2, self.screen_height/2 + 20))
+        restart_rect = self.restart_text.get_rect(center=(self.screen_width/2, self.screen_height/2 + 70))
+
         # Draw all text
         screen.fill((0, 0, 0))
-        screen.blit(game_over_text, game_over_rect)
-        screen.blit(final_score_text, final_score_rect)
-        screen.blit(restart_text, restart_rect)
+        screen.blit(self.game_over_text, game_over_rect)
+        screen.blit(self.final_score_text, final_score_rect)
+        screen.blit(self.restart_text, restart_rect)
         pygame.display.update()
-        
-        # Wait for player to press space to restart
-        waiting = True
-        while waiting:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_SPACE:
-                        waiting = False
-                    elif event.key == pygame.K_q:
-                        pygame.quit()
-                        sys.exit() 
\ No newline at end of file
+
+    def handle_event(self, event):
+        # While game over: True once SPACE asks for a restart, Q quits
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_SPACE:
+                self.game_over = False
+                return True
+            elif event.key == pygame.K_q:
+                pygame.quit()
+                sys.exit()
+        return False